@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'NLA.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from betting.events import warn_if_events_stay_local  # noqa: E402
+from betting.sse import STREAM_PATH, draw_stream  # noqa: E402
+
+warn_if_events_stay_local()
+
+
+async def application(scope, receive, send):
+    # Long-lived draw event streams bypass the Django request cycle
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await draw_stream(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
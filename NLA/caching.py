@@ -0,0 +1,33 @@
+"""
+Helpers for data that each process keeps its own copy of.
+
+Per-process copies (the payout table, the game catalog) are rebuilt when a
+version number in the default cache moves. That only reaches other processes
+when the cache is shared between them, as Redis is. With a process-local
+backend (local memory, dummy) a bump in one process is invisible to the rest,
+so their copies instead expire after LOCAL_CACHE_TTL_SECONDS.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def cache_is_shared(alias='default'):
+    """True if every process sees the same entries in this cache"""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+def local_copy_expired(built_at):
+    """
+    True if a per-process copy built at built_at (time.monotonic()) should be
+    rebuilt because no shared cache can tell this process it changed.
+    """
+    if cache_is_shared():
+        return False
+    return time.monotonic() - built_at >= settings.LOCAL_CACHE_TTL_SECONDS
@@ -0,0 +1,87 @@
+"""
+Per-request query instrumentation.
+
+Records the number of SQL statements a request ran and how long they took by
+wrapping the database connections' execute path; nothing extra is sent to
+the database. A request is instrumented when it is sampled
+(QUERY_INSTRUMENTATION_SAMPLE_RATE) or when it carries the
+X-Instrument-Queries header and DEBUG is on or the session user is staff.
+Results go to the 'NLA.instrumentation' logger and, for requests that asked
+via the header, to X-Query-Count / X-Query-Time-Ms response headers.
+"""
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENT_HEADER = 'HTTP_X_INSTRUMENT_QUERIES'
+
+
+class QueryStats:
+    """Counts and times the statements executed while installed on a connection"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            self.slowest = max(self.slowest, elapsed)
+
+    def as_dict(self):
+        return {
+            'queries': self.count,
+            'query_ms': round(self.total * 1000, 2),
+            'slowest_query_ms': round(self.slowest * 1000, 2),
+        }
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def requested(self, request):
+        if not request.META.get(INSTRUMENT_HEADER):
+            return False
+        user = getattr(request, 'user', None)
+        return settings.DEBUG or bool(user and user.is_staff)
+
+    def __call__(self, request):
+        requested = self.requested(request)
+        sample_rate = getattr(settings, 'QUERY_INSTRUMENTATION_SAMPLE_RATE', 0.0)
+        if not requested and (sample_rate <= 0 or random.random() >= sample_rate):
+            return self.get_response(request)
+
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        record = stats.as_dict()
+        record.update({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+        })
+        logger.info('request queries', extra={'instrumentation': record})
+
+        if requested:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time-Ms'] = str(record['query_ms'])
+        return response
@@ -0,0 +1,90 @@
+"""
+Time-ordered unique references for bet numbers and transaction references.
+
+An id is 104 bits: milliseconds since REFERENCE_EPOCH (48), a random worker
+id drawn once per process (32) and a per-worker sequence (24). Ids from one
+process are strictly increasing; across processes they are ordered to the
+millisecond, so new rows land at the right edge of the unique index instead
+of at random pages. Two processes collide only if they draw the same worker
+id and then issue the same sequence number in the same millisecond.
+
+References are a prefix plus the id in Crockford base32, fixed width, so
+string order is id order. allocate() reserves a run of ids under one lock
+for batched inserts.
+"""
+import os
+import secrets
+import threading
+import time
+
+
+REFERENCE_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+WORKER_BITS = 32
+SEQUENCE_BITS = 24
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ENCODED_LENGTH = 21  # ceil(104 / 5)
+
+
+def encode(value):
+    """Fixed-width Crockford base32"""
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class ReferenceGenerator:
+    """Monotonic id source for one process"""
+
+    def __init__(self, worker_id=None, clock=None):
+        self.worker_id = secrets.randbits(WORKER_BITS) if worker_id is None else worker_id
+        self.clock = clock or (lambda: time.time_ns() // 1_000_000)
+        self.lock = threading.Lock()
+        self.last_ms = 0
+        self.sequence = -1
+
+    def allocate(self, count):
+        """count consecutive ids, all greater than any issued before"""
+        ids = []
+        with self.lock:
+            # Never step back, even if the wall clock does
+            now = max(self.clock() - REFERENCE_EPOCH_MS, self.last_ms)
+            if now > self.last_ms:
+                self.last_ms, self.sequence = now, -1
+
+            while count:
+                if self.sequence == MAX_SEQUENCE:
+                    # Sequence exhausted: borrow the next millisecond
+                    self.last_ms, self.sequence = self.last_ms + 1, -1
+                taken = min(count, MAX_SEQUENCE - self.sequence)
+                base = ((self.last_ms << WORKER_BITS | self.worker_id) << SEQUENCE_BITS)
+                ids.extend(range(base + self.sequence + 1, base + self.sequence + 1 + taken))
+                self.sequence += taken
+                count -= taken
+        return ids
+
+
+_generator = ReferenceGenerator()
+
+
+def _reseed_after_fork():
+    # Forked workers (celery prefork, gunicorn) must not share a worker id
+    global _generator
+    _generator = ReferenceGenerator()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
+
+
+def new_reference(prefix=''):
+    return f'{prefix}{encode(_generator.allocate(1)[0])}'
+
+
+def new_references(prefix, count):
+    """count references from one allocation, in increasing order"""
+    return [f'{prefix}{encode(value)}' for value in _generator.allocate(count)]
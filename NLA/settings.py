@@ -83,9 +83,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'NLA.instrumentation.QueryInstrumentationMiddleware',
 ]
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Fraction of requests whose SQL count/timing is logged (see NLA/instrumentation.py)
+QUERY_INSTRUMENTATION_SAMPLE_RATE = config('QUERY_INSTRUMENTATION_SAMPLE_RATE', default=0.0, cast=float)
+
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -217,6 +221,27 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Cache: Redis when REDIS_URL is set, per-process memory otherwise
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Without a shared cache, per-process copies (payout table, catalog) cannot
+# hear about edits made in other processes and are rebuilt this often instead;
+# unread notification counters expire this often too
+LOCAL_CACHE_TTL_SECONDS = 30
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'  # Use Redis as message broker
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -226,6 +251,21 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)  # Run tasks inline (no Redis)
+
+# Bet settlement
+SETTLEMENT_SHARD_SIZE = 50000  # Active bets per settlement shard
+SETTLEMENT_EXECUTOR = config('SETTLEMENT_EXECUTOR', default='celery')  # 'celery' (chord) or 'local'
+DRAW_STATUS_POLL_SECONDS = 300  # Beat fallback for check_draw_status between exact wakeups
+DRAW_COUNTER_MODE = config('DRAW_COUNTER_MODE', default='buffered')  # 'buffered' (deltas folded by beat) or 'direct'
+DRAW_CALENDAR_HORIZON_DAYS = 14  # Days of future draws kept generated from GameType schedules
+DRAW_BETTING_OPENS_HOURS = 24  # Betting opens this long before the draw time
+DRAW_BETTING_CLOSES_MINUTES = 15  # Betting closes this long before the draw time
+WALLET_SNAPSHOT_LAG_SECONDS = 300  # Backends other than PostgreSQL/SQLite: ledger entries younger than this are left out of new snapshots
+LEDGER_TRANSACTION_TIMEOUT_SECONDS = 120  # Longest a ledger-writing transaction may stay open (PostgreSQL); snapshots wait this long for writers
+BALANCE_CACHE_SECONDS = 60  # How long a displayed account balance may trail the ledger
+WITHDRAWAL_PAYOUT_PROVIDER = config('WITHDRAWAL_PAYOUT_PROVIDER', default='')  # Dotted path, e.g. 'wallet.payouts.FakePayoutProvider' locally
+WITHDRAWAL_BATCH_SIZE = 500  # Withdrawals debited and submitted per provider call
 
 # Payment Gateway Settings
 PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY', 'sk_test_a47aea89e3d03cde5af7d7094df3a6514122c70b')
@@ -236,26 +276,50 @@ from celery.schedules import crontab
 
     
 CELERY_BEAT_SCHEDULE = {
-    'check-draw-status-every-minute': {
-        'task': 'betting.tasks.check_draw_status',
-        'schedule': 60.0,  # Every minute
+    'check-draw-status': {
+        'task': 'betting.task.check_draw_status',
+        'schedule': float(DRAW_STATUS_POLL_SECONDS),  # Safety net; runs also wake at each boundary
+    },
+    'generate-draw-calendar-hourly': {
+        'task': 'betting.task.generate_draw_calendar',
+        'schedule': crontab(minute=5),  # Every hour at :05
     },
     'process-completed-draws-every-5-minutes': {
-        'task': 'betting.tasks.process_completed_draws',
+        'task': 'betting.task.process_completed_draws',
         'schedule': 300.0,  # Every 5 minutes
     },
     'send-daily-digest-at-8pm': {
-        'task': 'betting.tasks.send_daily_digest',
+        'task': 'betting.task.send_daily_digest',
         'schedule': crontab(hour=20, minute=0),  # 8 PM daily
     },
     'cleanup-old-data-daily': {
-        'task': 'betting.tasks.cleanup_old_data',
+        'task': 'betting.task.cleanup_old_data',
         'schedule': crontab(hour=2, minute=0),  # 2 AM daily
     },
     'check-winning-bets-every-10-minutes': {
-        'task': 'betting.tasks.check_winning_bets',
+        'task': 'betting.task.check_winning_bets',
+        'schedule': 600.0,  # Every 10 minutes
+    },
+    'fold-draw-counters-every-minute': {
+        'task': 'betting.task.fold_draw_counters',
+        'schedule': 60.0,  # Every minute
+    },
+    'reconcile-unread-notifications-every-10-minutes': {
+        'task': 'betting.task.reconcile_unread_notifications',
+        'schedule': 600.0,  # Every 10 minutes
+    },
+    'snapshot-wallet-balances-every-10-minutes': {
+        'task': 'wallet.task.snapshot_wallet_balances',
         'schedule': 600.0,  # Every 10 minutes
     },
+    'process-withdrawals-every-minute': {
+        'task': 'wallet.task.process_withdrawal_batches',
+        'schedule': 60.0,  # Every minute
+    },
+    'reconcile-withdrawals-every-2-minutes': {
+        'task': 'wallet.task.reconcile_withdrawal_payouts',
+        'schedule': 120.0,  # Every 2 minutes
+    },
 
     'verify-pending-payments': {
         'task': 'payments.tasks.verify_pending_payments',
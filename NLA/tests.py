@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase
+
+from .references import (
+    MAX_SEQUENCE, REFERENCE_EPOCH_MS, SEQUENCE_BITS, WORKER_BITS, ReferenceGenerator, encode
+)
+
+
+class Clock:
+    """A wall clock the test sets by hand, in epoch milliseconds"""
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms
+
+
+def split(value):
+    """(milliseconds since REFERENCE_EPOCH_MS, worker id, sequence) of an id"""
+    return (
+        value >> (WORKER_BITS + SEQUENCE_BITS),
+        value >> SEQUENCE_BITS & ((1 << WORKER_BITS) - 1),
+        value & MAX_SEQUENCE,
+    )
+
+
+class ReferenceGeneratorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = Clock(REFERENCE_EPOCH_MS + 1000)
+        self.generator = ReferenceGenerator(worker_id=7, clock=self.clock)
+
+    def test_ids_strictly_increase(self):
+        ids = []
+        for step in range(5):
+            ids += self.generator.allocate(1)
+            ids += self.generator.allocate(1)
+            self.clock.ms += step % 2
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual(split(ids[0]), (1000, 7, 0))
+        self.assertEqual(split(ids[-1]), (1002, 7, 1))
+
+    def test_clock_going_backwards_does_not_step_back(self):
+        first, = self.generator.allocate(1)
+        self.clock.ms -= 500
+        second, = self.generator.allocate(1)
+
+        self.assertGreater(second, first)
+        self.assertEqual(split(second), (1000, 7, 1))
+
+    def test_sequence_rolls_into_next_millisecond(self):
+        self.generator.allocate(1)
+        self.generator.sequence = MAX_SEQUENCE - 1
+
+        ids = self.generator.allocate(3)
+        self.assertEqual([split(value) for value in ids], [(1000, 7, MAX_SEQUENCE), (1001, 7, 0), (1001, 7, 1)])
+
+        # The clock catching up to the borrowed millisecond keeps counting on
+        self.clock.ms += 1
+        self.assertEqual(split(self.generator.allocate(1)[0]), (1001, 7, 2))
+
+    def test_allocate_returns_consecutive_ids(self):
+        self.generator.allocate(1)
+        ids = self.generator.allocate(50)
+        self.assertEqual(ids, list(range(ids[0], ids[0] + 50)))
+        self.assertEqual(split(ids[0]), (1000, 7, 1))
+
+    def test_encoding_keeps_id_order(self):
+        ids = [0, 1, 31, 32, 1 << 60, (1 << 104) - 1]
+        ids += self.generator.allocate(3)
+        self.clock.ms += 1
+        ids += self.generator.allocate(3)
+        encoded = [encode(value) for value in ids]
+
+        self.assertEqual(sorted(encoded), [encode(value) for value in sorted(ids)])
+        self.assertEqual({len(value) for value in encoded}, {21})
+        self.assertEqual(encode(1), '000000000000000000001')
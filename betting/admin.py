@@ -3,6 +3,13 @@ from .models import *
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
+from django.db import transaction
+from django.db.models import Count
+from .settlement import finalize_draw_totals, settle_bets, settle_draw
+from .stats import rebuild_user_statistics, record_bets_cancelled
+from .unread import forget_unread
+from .events import publish_draw_events
+from users.services import BalanceService
 
 # Define ModelAdmin classes FIRST, then register
 
@@ -122,7 +129,7 @@ class DrawAdmin(admin.ModelAdmin):
     search_fields = ['draw_number', 'game_type__name']
     readonly_fields = [
         'total_bets', 'total_stake_amount', 'total_payout_amount',
-        'created_at', 'updated_at'
+        'total_winners', 'created_at', 'updated_at'
     ]
     date_hierarchy = 'draw_date'
     
@@ -139,7 +146,8 @@ class DrawAdmin(admin.ModelAdmin):
         }),
         ('Statistics', {
             'fields': (
-                'total_bets', 'total_stake_amount', 'total_payout_amount'
+                'total_bets', 'total_stake_amount', 'total_payout_amount',
+                'total_winners'
             ),
             'classes': ('collapse',)
         }),
@@ -181,25 +189,39 @@ class DrawAdmin(admin.ModelAdmin):
     betting_status.short_description = 'Betting'
     
     def open_betting(self, request, queryset):
+        draws = list(queryset.filter(status='scheduled'))
         updated = queryset.filter(status='scheduled').update(status='open')
+        for draw in draws:
+            draw.status = 'open'
+        publish_draw_events(draws)
         self.message_user(request, f'{updated} draws opened for betting')
     open_betting.short_description = 'Open betting for selected draws'
     
     def close_betting(self, request, queryset):
+        draws = list(queryset.filter(status='open'))
         updated = queryset.filter(status='open').update(status='closed')
+        for draw in draws:
+            draw.status = 'closed'
+        publish_draw_events(draws)
         self.message_user(request, f'{updated} draws closed for betting')
     close_betting.short_description = 'Close betting for selected draws'
     
     def cancel_draw(self, request, queryset):
         for draw in queryset:
-            bets = draw.bets.filter(status='active')
-            for bet in bets:
-                bet.user.account_balance += bet.stake_amount
-                bet.user.save()
-                bet.status = 'cancelled'
-                bet.save()
+            with transaction.atomic():
+                bets = list(draw.bets.filter(status='active'))
+                BalanceService.bulk_credit([
+                    (
+                        bet.user_id, bet.stake_amount, f"REFUND-{bet.bet_number}",
+                        {'bet_id': bet.pk, 'description': f"Refund for bet {bet.bet_number}"}
+                    )
+                    for bet in bets
+                ], transaction_type='refund')
+                draw.bets.filter(pk__in=[bet.pk for bet in bets]).update(status='cancelled')
+                record_bets_cancelled(bets)
         
         queryset.update(status='cancelled')
+        publish_draw_events(queryset.all())
         self.message_user(request, f'Draws cancelled and bets refunded')
     cancel_draw.short_description = 'Cancel selected draws (refund bets)'
     
@@ -207,9 +229,8 @@ class DrawAdmin(admin.ModelAdmin):
         processed = 0
         for draw in queryset.filter(status='completed'):
             if draw.winning_numbers:
-                bets = draw.bets.filter(status='active')
-                for bet in bets:
-                    bet.check_win()
+                settle_draw(draw)
+                finalize_draw_totals(draw)
                 processed += 1
         
         self.message_user(request, f'{processed} draws processed')
@@ -295,10 +316,22 @@ class BetAdmin(admin.ModelAdmin):
     
     def check_results(self, request, queryset):
         checked = 0
-        for bet in queryset.filter(status='active'):
-            if bet.draw.status == 'completed' and bet.draw.winning_numbers:
-                bet.check_win()
-                checked += 1
+        bets = queryset.filter(
+            status='active',
+            draw__status='completed',
+            draw__winning_numbers__isnull=False
+        ).select_related('draw')
+        
+        bets_by_draw = {}
+        for bet in bets:
+            bets_by_draw.setdefault(bet.draw_id, []).append(bet)
+        
+        for draw_bets in bets_by_draw.values():
+            draw = draw_bets[0].draw
+            if draw.winning_numbers:
+                settle_bets(draw, draw_bets)
+                finalize_draw_totals(draw)
+                checked += len(draw_bets)
         
         self.message_user(request, f'{checked} bets checked')
     check_results.short_description = 'Check results for selected bets'
@@ -393,18 +426,21 @@ class UserSubscriptionAdmin(admin.ModelAdmin):
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = [
-        'title', 'user_link', 'notification_type',
+        'title_display', 'user_link', 'type_display',
         'read_badge', 'created_at'
     ]
     list_filter = ['notification_type', 'is_read', 'created_at']
-    search_fields = ['title', 'message', 'user__username']
+    list_select_related = ['user', 'event']
+    search_fields = ['title', 'message', 'event__title', 'user__username']
     readonly_fields = ['created_at', 'read_at']
+    raw_id_fields = ['event']
     date_hierarchy = 'created_at'
     
     fields = (
         'user',
         'game_type',
         'bet',
+        'event',
         'notification_type',
         'title',
         'message',
@@ -420,6 +456,14 @@ class NotificationAdmin(admin.ModelAdmin):
         return format_html('<a href="{}">{}</a>', url, obj.user.username)
     user_link.short_description = 'User'
     
+    def title_display(self, obj):
+        return obj.display_title
+    title_display.short_description = 'Title'
+    
+    def type_display(self, obj):
+        return obj.display_type
+    type_display.short_description = 'Type'
+    
     def read_badge(self, obj):
         if obj.is_read:
             return format_html('<span style="color: green;">✓ Read</span>')
@@ -427,19 +471,69 @@ class NotificationAdmin(admin.ModelAdmin):
     read_badge.short_description = 'Status'
     
     def mark_as_read(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
         updated = queryset.filter(is_read=False).update(
             is_read=True,
             read_at=timezone.now()
         )
+        forget_unread(user_ids)
         self.message_user(request, f'{updated} notifications marked as read')
     mark_as_read.short_description = 'Mark as read'
     
     def mark_as_unread(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_read=False, read_at=None)
+        forget_unread(user_ids)
         self.message_user(request, f'{updated} notifications marked as unread')
     mark_as_unread.short_description = 'Mark as unread'
 
 
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ['title', 'notification_type', 'game_type', 'recipients', 'created_at']
+    list_filter = ['notification_type', 'created_at']
+    search_fields = ['title', 'message']
+    readonly_fields = ['created_at']
+    date_hierarchy = 'created_at'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(recipient_count=Count('notifications'))
+    
+    def recipients(self, obj):
+        return obj.recipient_count
+    recipients.short_description = 'Recipients'
+    recipients.admin_order_field = 'recipient_count'
+
+
+@admin.register(UserStatistics)
+class UserStatisticsAdmin(admin.ModelAdmin):
+    list_display = [
+        'user_link', 'total_bets', 'total_staked', 'total_won',
+        'total_winnings', 'active_bets', 'updated_at'
+    ]
+    search_fields = ['user__username']
+    readonly_fields = [
+        'user', 'total_bets', 'total_staked', 'total_won',
+        'total_winnings', 'active_bets', 'updated_at'
+    ]
+    
+    actions = ['rebuild']
+    
+    # Rows are maintained by placement and settlement
+    def has_add_permission(self, request):
+        return False
+    
+    def user_link(self, obj):
+        url = reverse('admin:users_user_change', args=[obj.user.id])
+        return format_html('<a href="{}">{}</a>', url, obj.user.username)
+    user_link.short_description = 'User'
+    
+    def rebuild(self, request, queryset):
+        rebuilt = rebuild_user_statistics(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{rebuilt} statistics rows rebuilt from bets')
+    rebuild.short_description = 'Rebuild from bets'
+
+
 
 admin.site.site_header = "NLA Betting System Administration"
 admin.site.site_title = "NLA Admin"
@@ -0,0 +1,110 @@
+"""
+Cached game catalog: active game types, their categories and their odds.
+
+The catalog is serialized once per process and rebuilt only after a game type,
+bet type or odds change (see betting/signals.py), or after
+LOCAL_CACHE_TTL_SECONDS when the default cache is process-local, the same way
+the payout table is. Each resource carries a strong ETag derived from its
+content, so clients that already hold it get a 304 with no body and no queries.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import parse_etags, quote_etag
+
+from NLA.caching import local_copy_expired
+from .models import GameOdds, GameType
+from .serializers import GameOddsSerializer, GameTypeSerializer
+
+
+CATALOG_VERSION_KEY = 'betting:catalog:version'
+
+
+def content_etag(data):
+    """Strong ETag for data as the JSON renderer would emit it"""
+    encoded = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(encoded.encode('utf-8')).hexdigest())
+
+
+class Catalog:
+    """Serialized catalog resources and their ETags, keyed like the API routes"""
+
+    def __init__(self, game_types, odds, version=0):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.game_types = game_types
+        self.by_id = {game['id']: game for game in game_types}
+        self.categories = {'categories': sorted({game['category'] for game in game_types})}
+        self.odds = {game_id: odds.get(game_id, []) for game_id in self.by_id}
+
+        self.etags = {('list',): content_etag(self.game_types), ('categories',): content_etag(self.categories)}
+        for game_id, game in self.by_id.items():
+            self.etags[('detail', game_id)] = content_etag(game)
+            self.etags[('odds', game_id)] = content_etag(self.odds[game_id])
+
+    @classmethod
+    def build(cls, version=0):
+        """Serialize the catalog with one query for game types and one for odds"""
+        game_types = GameTypeSerializer(GameType.objects.filter(is_active=True), many=True).data
+        odds = {}
+        for row in GameOddsSerializer(
+            GameOdds.objects.filter(game_type__is_active=True).select_related('game_type', 'bet_type').order_by('id'),
+            many=True
+        ).data:
+            odds.setdefault(row['game_type'], []).append(row)
+        return cls(game_types, odds, version)
+
+    def get(self, *key):
+        """(data, etag) for a resource, or None if it is not in the catalog"""
+        if key[0] == 'list':
+            data = self.game_types
+        elif key[0] == 'categories':
+            data = self.categories
+        elif key[1] not in self.by_id:
+            return None
+        elif key[0] == 'detail':
+            data = self.by_id[key[1]]
+        else:
+            data = self.odds[key[1]]
+        return data, self.etags[key]
+
+
+_catalog = None
+
+
+def get_catalog():
+    """Return this process's catalog, rebuilding it if the catalog changed"""
+    global _catalog
+
+    version = cache.get(CATALOG_VERSION_KEY, 0)
+    catalog = _catalog
+    if catalog is None or catalog.version != version or local_copy_expired(catalog.built_at):
+        catalog = Catalog.build(version)
+        _catalog = catalog
+    return catalog
+
+
+def invalidate_catalog():
+    """Drop the serialized catalog here and tell other processes to rebuild theirs"""
+    global _catalog
+
+    _catalog = None
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 1, None)
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match already names etag (weak comparison, per RFC 9110)"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    if tags == ['*']:
+        return True
+    strip = lambda tag: tag[2:] if tag.startswith('W/') else tag
+    return strip(etag) in {strip(tag) for tag in tags}
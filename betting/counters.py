@@ -0,0 +1,105 @@
+"""
+Draw bet counters.
+
+In 'buffered' mode bet placement appends a DrawCounterDelta row instead of
+updating the draw, so a popular draw's row is not locked by every bet.
+fold_draw_counters() periodically folds the deltas into Draw.total_bets and
+Draw.total_stake_amount; with_pending_totals() adds the not-yet-folded
+deltas to reads. 'direct' mode updates the draw row in place.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Draw, DrawCounterDelta
+
+
+FOLD_BATCH_SIZE = 10000
+
+
+def record_draw_bets(draw_totals):
+    """
+    Count placed bets against their draws. draw_totals maps
+    draw_id -> (bets, stake_amount); call inside the placement transaction.
+    """
+    if getattr(settings, 'DRAW_COUNTER_MODE', 'buffered') == 'buffered':
+        DrawCounterDelta.objects.bulk_create([
+            DrawCounterDelta(draw_id=draw_id, bets=bets, stake_amount=stake)
+            for draw_id, (bets, stake) in draw_totals.items()
+        ])
+        return
+
+    # One UPDATE per draw in a fixed order so concurrent slips cannot deadlock
+    for draw_id in sorted(draw_totals):
+        bets, stake = draw_totals[draw_id]
+        Draw.objects.filter(pk=draw_id).update(
+            total_bets=F('total_bets') + bets,
+            total_stake_amount=F('total_stake_amount') + stake
+        )
+
+
+def fold_draw_counters(batch_size=FOLD_BATCH_SIZE):
+    """Fold buffered deltas into the draw counters; returns the number of deltas folded"""
+    folded = 0
+    while True:
+        with transaction.atomic():
+            deltas = list(
+                DrawCounterDelta.objects.select_for_update(skip_locked=True)
+                .order_by('id')
+                .values_list('id', 'draw_id', 'bets', 'stake_amount')[:batch_size]
+            )
+            if not deltas:
+                break
+
+            totals = {}
+            for _, draw_id, bets, stake in deltas:
+                count, amount = totals.get(draw_id, (0, Decimal('0.00')))
+                totals[draw_id] = (count + bets, amount + stake)
+
+            for draw_id in sorted(totals):
+                bets, stake = totals[draw_id]
+                Draw.objects.filter(pk=draw_id).update(
+                    total_bets=F('total_bets') + bets,
+                    total_stake_amount=F('total_stake_amount') + stake
+                )
+            DrawCounterDelta.objects.filter(id__in=[d[0] for d in deltas]).delete()
+
+        folded += len(deltas)
+        if len(deltas) < batch_size:
+            break
+
+    return folded
+
+
+def with_pending_totals(queryset):
+    """Annotate draws with pending_bets / pending_stake from unfolded deltas"""
+    pending = DrawCounterDelta.objects.filter(
+        draw=OuterRef('pk')
+    ).order_by().values('draw')
+
+    return queryset.annotate(
+        pending_bets=Coalesce(
+            Subquery(pending.annotate(total=Sum('bets')).values('total')),
+            0,
+            output_field=IntegerField()
+        ),
+        pending_stake=Coalesce(
+            Subquery(pending.annotate(total=Sum('stake_amount')).values('total')),
+            Decimal('0.00'),
+            output_field=DecimalField(max_digits=15, decimal_places=2)
+        ),
+    )
+
+
+def current_totals(draw):
+    """(total_bets, total_stake_amount) for a draw including unfolded deltas"""
+    pending = DrawCounterDelta.objects.filter(draw=draw).aggregate(
+        bets=Sum('bets'), stake=Sum('stake_amount')
+    )
+    return (
+        draw.total_bets + (pending['bets'] or 0),
+        draw.total_stake_amount + (pending['stake'] or Decimal('0.00'))
+    )
@@ -0,0 +1,133 @@
+"""
+Draw calendar.
+
+Each GameType's draw_days / draw_time is parsed once into a DrawSchedule and
+future Draw rows for a rolling horizon are generated from it in bulk. Games
+differ only in their schedule data, so no game type needs code of its own.
+"""
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Draw, GameType
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+EVERY_DAY = {'daily', 'everyday', 'every day'}
+
+
+@lru_cache(maxsize=None)
+def parse_draw_days(draw_days):
+    """'Monday, wed,Friday' -> frozenset of weekday numbers (Monday == 0)"""
+    days = set()
+    for token in (draw_days or '').split(','):
+        token = token.strip().lower()
+        if not token:
+            continue
+        if token in EVERY_DAY:
+            return frozenset(range(7))
+        matches = [n for n, name in enumerate(WEEKDAYS) if len(token) >= 3 and name.startswith(token)]
+        if len(matches) != 1:
+            raise ValueError(f"Unknown draw day {token!r}")
+        days.add(matches[0])
+    if not days:
+        raise ValueError("No draw days")
+    return frozenset(days)
+
+
+class DrawSchedule:
+    """One game type's parsed schedule and the draws it produces"""
+
+    def __init__(self, game_type, tz=None):
+        self.game_type_id = game_type.pk
+        self.code = game_type.code
+        self.weekdays = parse_draw_days(game_type.draw_days)
+        self.draw_time = game_type.draw_time
+        self.tz = tz or timezone.get_current_timezone()
+
+    def dates(self, start, end):
+        """Draw dates from start to end inclusive"""
+        day = start
+        while day <= end:
+            if day.weekday() in self.weekdays:
+                yield day
+            day += timedelta(days=1)
+
+    def draw_number(self, draw_date):
+        number = f"{self.code}-{draw_date:%Y%m%d}"
+        if len(number) > Draw._meta.get_field('draw_number').max_length:
+            number = f"G{self.game_type_id}-{draw_date:%Y%m%d}"
+        return number
+
+    def build(self, draw_date):
+        draw_at = timezone.make_aware(datetime.combine(draw_date, self.draw_time), self.tz)
+        return Draw(
+            game_type_id=self.game_type_id,
+            draw_number=self.draw_number(draw_date),
+            draw_date=draw_date,
+            draw_time=self.draw_time,
+            status='scheduled',
+            betting_opens_at=draw_at - timedelta(hours=settings.DRAW_BETTING_OPENS_HOURS),
+            betting_closes_at=draw_at - timedelta(minutes=settings.DRAW_BETTING_CLOSES_MINUTES),
+        )
+
+
+def load_schedules(game_types=None):
+    """DrawSchedules for active game types with a draw time; unparseable schedules are logged and skipped"""
+    if game_types is None:
+        game_types = GameType.objects.filter(is_active=True, draw_time__isnull=False).only(
+            'id', 'code', 'draw_days', 'draw_time'
+        )
+
+    schedules = []
+    for game_type in game_types:
+        try:
+            schedules.append(DrawSchedule(game_type))
+        except ValueError as e:
+            logger.warning(f"Skipping {game_type.code}: bad draw_days {game_type.draw_days!r} ({e})")
+    return schedules
+
+
+def generate_draws(days=None, now=None, schedules=None, batch_size=1000):
+    """
+    Create the missing draws for the next `days` days; returns the number inserted
+    Safe to run repeatedly: existing (game type, date) pairs are skipped and
+    draw numbers are deterministic, so overlapping runs cannot duplicate a draw
+    """
+    now = now or timezone.now()
+    days = settings.DRAW_CALENDAR_HORIZON_DAYS if days is None else days
+    schedules = load_schedules() if schedules is None else schedules
+    if not schedules:
+        return 0
+
+    start = timezone.localdate(now)
+    end = start + timedelta(days=days)
+    existing = set(Draw.objects.filter(
+        game_type_id__in=[s.game_type_id for s in schedules],
+        draw_date__range=(start, end)
+    ).values_list('game_type_id', 'draw_date'))
+
+    draws = []
+    for schedule in schedules:
+        for draw_date in schedule.dates(start, end):
+            if (schedule.game_type_id, draw_date) in existing:
+                continue
+            draw = schedule.build(draw_date)
+            # Never create a draw whose betting window has already closed
+            if draw.betting_closes_at > now:
+                draws.append(draw)
+
+    # ignore_conflicts hands back every object, inserted or not, so count
+    # the batch's draw numbers either side of the insert
+    created = 0
+    for i in range(0, len(draws), batch_size):
+        batch = draws[i:i + batch_size]
+        present = Draw.objects.filter(draw_number__in=[draw.draw_number for draw in batch])
+        before = present.count()
+        Draw.objects.bulk_create(batch, ignore_conflicts=True)
+        created += present.count() - before
+    return created
@@ -0,0 +1,157 @@
+"""
+Draw event pub/sub.
+
+publish_draw_event() is called wherever a draw changes state. With REDIS_URL
+set, events go out on a Redis channel and every ASGI worker's hub receives
+them; without Redis they are delivered only to the hub in the publishing
+process (enough for a single-process deployment or eager Celery). Events
+published by a separate Celery worker need Redis to reach the stream;
+warn_if_events_stay_local() says so when the ASGI app starts.
+
+DrawEventHub fans each event out to the per-connection queues of the SSE
+stream (betting.sse). One hub runs per process, on the ASGI event loop.
+"""
+import asyncio
+import itertools
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DRAW_EVENTS_CHANNEL = 'betting:draw-events'
+SUBSCRIBER_QUEUE_SIZE = 64
+REDIS_RETRY_SECONDS = 2
+HEARTBEAT_SECONDS = 20
+HEARTBEAT_FRAME = (None, b': keep-alive\n\n')
+
+_redis_client = None
+
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def draw_event(draw, event_type=None):
+    """The payload pushed to clients for a draw's current state"""
+    payload = {
+        'type': event_type or 'draw.status',
+        'draw_id': draw.id,
+        'draw_number': draw.draw_number,
+        'game_type': draw.game_type_id,
+        'status': draw.status,
+        'betting_opens_at': draw.betting_opens_at.isoformat() if draw.betting_opens_at else None,
+        'betting_closes_at': draw.betting_closes_at.isoformat() if draw.betting_closes_at else None,
+    }
+    if draw.status == 'completed':
+        payload['type'] = 'draw.results'
+        payload['winning_numbers'] = draw.winning_numbers
+        payload['machine_number'] = draw.machine_number
+    return payload
+
+
+def publish_draw_event(draw):
+    """Announce a draw's new state once the current transaction commits"""
+    message = json.dumps(draw_event(draw))
+    transaction.on_commit(lambda: _publish(message))
+
+
+def publish_draw_events(draws):
+    for draw in draws:
+        publish_draw_event(draw)
+
+
+def warn_if_events_stay_local():
+    """Log a warning if Celery workers publish events this process will never see"""
+    if getattr(settings, 'REDIS_URL', '') or settings.CELERY_TASK_ALWAYS_EAGER:
+        return
+    logger.warning(
+        'REDIS_URL is not set and Celery tasks run in separate workers: '
+        'draw events they publish will not reach the draw stream'
+    )
+
+
+def _publish(message):
+    if getattr(settings, 'REDIS_URL', ''):
+        try:
+            _redis().publish(DRAW_EVENTS_CHANNEL, message)
+        except Exception:
+            logger.exception('Could not publish draw event')
+        return
+    hub.dispatch_threadsafe(message)
+
+
+class DrawEventHub:
+    """Fans draw events out to connected stream subscribers in this process"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+        self.listener = None
+        self.heartbeat = None
+        self.event_ids = itertools.count(1)
+
+    def subscribe(self):
+        """Register a new connection; call from the event loop"""
+        self.loop = asyncio.get_running_loop()
+        if self.heartbeat is None:
+            self.heartbeat = self.loop.create_task(self.beat())
+        if self.listener is None and getattr(settings, 'REDIS_URL', ''):
+            self.listener = self.loop.create_task(self.listen_redis())
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def dispatch(self, message):
+        """Queue a message for every subscriber; slow ones lose their oldest event"""
+        payload = json.loads(message)
+        event_id = next(self.event_ids)
+        # Formatted once and shared by every connection
+        frame = f"id: {event_id}\nevent: {payload['type']}\ndata: {message}\n\n".encode()
+        self.broadcast((payload.get('game_type'), frame))
+
+    def broadcast(self, event):
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def dispatch_threadsafe(self, message):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.dispatch, message)
+
+    async def beat(self):
+        """One timer for all connections: a comment frame keeps idle streams open through proxies"""
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            self.broadcast(HEARTBEAT_FRAME)
+
+    async def listen_redis(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            try:
+                client = aioredis.Redis.from_url(settings.REDIS_URL)
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(DRAW_EVENTS_CHANNEL)
+                    async for item in pubsub.listen():
+                        if item['type'] == 'message':
+                            self.dispatch(item['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Draw event listener lost Redis; retrying')
+                await asyncio.sleep(REDIS_RETRY_SECONDS)
+
+
+hub = DrawEventHub()
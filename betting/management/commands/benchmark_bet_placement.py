@@ -0,0 +1,191 @@
+import random
+import time as clock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from betting.counters import current_totals
+from betting.models import BetType, Draw, GameType
+from betting.serializers import PlaceBetSerializer
+from users.models import User
+from users.services import BalanceService
+from wallet.ledger import wallet_balance
+from wallet.models import WalletTransaction
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent bet placement against one shared account and check for balance drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=str,
+            default='1,2,4,8',
+            help='Comma-separated parallel client counts to run',
+        )
+        parser.add_argument(
+            '--bets-per-client',
+            type=int,
+            default=50,
+            help='Bets each client attempts',
+        )
+        parser.add_argument(
+            '--funded-ratio',
+            type=float,
+            default=0.75,
+            help='Fraction of attempted stakes the account can cover',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark draw, account and bets afterwards',
+        )
+
+    def handle(self, *args, **options):
+        client_counts = [int(c) for c in options['clients'].split(',') if c]
+        bets_per_client = options['bets_per_client']
+        stake = Decimal('1.00')
+
+        game_type, bet_type, draw = self.setup_draw()
+        failed = False
+        total_placed = 0
+
+        self.stdout.write(f"{'clients':>8} {'placed':>8} {'rejected':>9} {'errors':>7} {'bets/s':>9}  balance")
+        try:
+            for clients in client_counts:
+                attempts = clients * bets_per_client
+                funded = int(attempts * options['funded_ratio'])
+                initial_balance = stake * funded
+                account = self.setup_account(initial_balance)
+
+                started = clock.perf_counter()
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    results = list(pool.map(
+                        lambda seed: self.run_client(account.pk, draw, bet_type, stake, bets_per_client, seed),
+                        range(clients)
+                    ))
+                elapsed = clock.perf_counter() - started
+
+                placed = sum(r['placed'] for r in results)
+                rejected = sum(r['rejected'] for r in results)
+                errors = sum(r['errors'] for r in results)
+
+                total_placed += placed
+                ok = (
+                    self.check_balances(account, initial_balance, placed, stake)
+                    and self.check_draw(draw, total_placed, stake)
+                )
+                failed = failed or not ok
+                self.stdout.write(
+                    f"{clients:>8} {placed:>8} {rejected:>9} {errors:>7} {placed / elapsed:>9.1f}  "
+                    + (self.style.SUCCESS('consistent') if ok else self.style.ERROR('DRIFT'))
+                )
+
+                if not options['keep']:
+                    account.delete()
+        finally:
+            if not options['keep']:
+                draw.delete()
+                game_type.delete()
+
+        if failed:
+            self.stdout.write(self.style.ERROR('Balance drift detected'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No balance drift across runs'))
+        self.stdout.write('Note: SQLite serializes writers; run against PostgreSQL to measure scaling')
+
+    def setup_draw(self):
+        now = timezone.now()
+        suffix = now.strftime('%Y%m%d%H%M%S%f')
+
+        game_type = GameType.objects.create(
+            name='Quick 5/11',
+            code=f'BENCH_{suffix}',
+            category='other_games',
+            description='Bet placement benchmark',
+            min_stake=Decimal('1.00'),
+            max_stake=Decimal('100.00'),
+            draw_time=time(hour=12),
+            draw_days='Monday'
+        )
+        bet_type, _ = BetType.objects.get_or_create(
+            name='direct_one',
+            defaults={
+                'display_name': 'Direct One',
+                'description': 'First number drawn',
+                'base_odds': Decimal('40.00'),
+                'min_numbers_required': 1,
+                'max_numbers_allowed': 1,
+            }
+        )
+        draw = Draw.objects.create(
+            game_type=game_type,
+            draw_number=f'BENCH-{suffix}',
+            draw_date=now.date(),
+            draw_time=time(hour=12),
+            status='open',
+            betting_opens_at=now - timedelta(hours=1),
+            betting_closes_at=now + timedelta(hours=1)
+        )
+        return game_type, bet_type, draw
+
+    def setup_account(self, balance):
+        suffix = timezone.now().strftime('%Y%m%d%H%M%S%f')
+        user = User.objects.create(username=f'bench_agent_{suffix}', user_type='agent')
+        BalanceService.credit(user.pk, balance, 'deposit', description='Benchmark float')
+        return user
+
+    def run_client(self, user_id, draw, bet_type, stake, bets, seed):
+        rng = random.Random(seed)
+        placed = rejected = errors = 0
+        try:
+            user = User.objects.get(pk=user_id)
+            request = SimpleNamespace(user=user)
+            for _ in range(bets):
+                serializer = PlaceBetSerializer(
+                    data={
+                        'draw_id': draw.id,
+                        'bet_type_id': bet_type.id,
+                        'selected_numbers': rng.sample(range(1, 91), bet_type.min_numbers_required),
+                        'stake_amount': str(stake),
+                    },
+                    context={'request': request}
+                )
+                try:
+                    if serializer.is_valid():
+                        serializer.save()
+                        placed += 1
+                    else:
+                        rejected += 1
+                except Exception as e:
+                    if 'stake_amount' in getattr(e, 'detail', {}):
+                        rejected += 1
+                    else:
+                        errors += 1
+        finally:
+            connections.close_all()
+        return {'placed': placed, 'rejected': rejected, 'errors': errors}
+
+    def check_balances(self, account, initial_balance, placed, stake):
+        wallet_id = BalanceService.wallet_id(account.pk)
+        balance = wallet_balance(wallet_id)
+        stakes = WalletTransaction.objects.filter(
+            wallet_id=wallet_id, transaction_type='stake'
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+
+        return (
+            balance >= 0
+            and balance == initial_balance - placed * stake
+            and stakes == placed * stake
+        )
+
+    def check_draw(self, draw, placed, stake):
+        draw.refresh_from_db()
+        total_bets, total_stake = current_totals(draw)
+        return total_bets == placed and total_stake == placed * stake
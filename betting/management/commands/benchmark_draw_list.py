@@ -0,0 +1,119 @@
+import time as clock
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from betting.counters import with_pending_totals
+from betting.models import Draw, GameType
+from betting.schedule import with_betting_window
+from betting.serializers import DrawListSerializer, DrawRowSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark draw list serialization: DrawListSerializer on instances vs DrawRowSerializer on values() rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--draws',
+            type=int,
+            default=1000,
+            help='Draws to create and serialize',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per serializer; the best run is reported',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark game type and draws afterwards',
+        )
+
+    def handle(self, *args, **options):
+        count = options['draws']
+        game_type = self.setup_draws(count)
+        try:
+            now = timezone.now()
+            queryset = with_betting_window(
+                with_pending_totals(Draw.objects.select_related('game_type').filter(game_type=game_type)),
+                now
+            ).order_by('-draw_date', '-draw_time', '-id')
+
+            model_fetch, model_serialize, model_queries, model_data = self.measure(
+                options['repeat'],
+                lambda: list(queryset.all()),
+                lambda draws: DrawListSerializer(draws, many=True).data
+            )
+            row_fetch, row_serialize, row_queries, row_data = self.measure(
+                options['repeat'],
+                lambda: list(DrawRowSerializer.rows(queryset.all())),
+                lambda rows: DrawRowSerializer(rows, many=True).data
+            )
+        finally:
+            if not options['keep']:
+                game_type.delete()
+
+        per_thousand = 1000 / count
+        self.stdout.write(f"{'serializer':<20} {'queries':>8} {'fetch ms/1k':>12} {'serialize ms/1k':>16}")
+        for name, queries, fetch, serialize in (
+            ('DrawListSerializer', model_queries, model_fetch, model_serialize),
+            ('DrawRowSerializer', row_queries, row_fetch, row_serialize),
+        ):
+            self.stdout.write(
+                f"{name:<20} {queries:>8} {fetch * 1000 * per_thousand:>12.2f} {serialize * 1000 * per_thousand:>16.2f}"
+            )
+        self.stdout.write(f'Serialization speedup: {model_serialize / row_serialize:.1f}x')
+
+        if [dict(item) for item in model_data] == [dict(item) for item in row_data]:
+            self.stdout.write(self.style.SUCCESS(f'Outputs identical for {count} draws'))
+        else:
+            self.stdout.write(self.style.ERROR('Outputs differ'))
+
+    def measure(self, repeat, fetch, serialize):
+        """Best fetch and serialize times over repeat runs, queries per run and the last output"""
+        best_fetch = best_serialize = float('inf')
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = clock.perf_counter()
+                items = fetch()
+                fetched = clock.perf_counter()
+                data = serialize(items)
+                finished = clock.perf_counter()
+            best_fetch = min(best_fetch, fetched - started)
+            best_serialize = min(best_serialize, finished - fetched)
+        return best_fetch, best_serialize, len(queries.captured_queries), data
+
+    def setup_draws(self, count):
+        now = timezone.now()
+        suffix = now.strftime('%Y%m%d%H%M%S%f')
+
+        game_type = GameType.objects.create(
+            name='Quick 5/11',
+            code=f'BENCH_{suffix}',
+            category='other_games',
+            description='Draw list benchmark',
+            draw_time=time(hour=19),
+            draw_days='Daily'
+        )
+        statuses = ['scheduled', 'open', 'closed', 'completed']
+        Draw.objects.bulk_create([
+            Draw(
+                game_type=game_type,
+                draw_number=f'BENCH-{suffix}-{i}',
+                draw_date=(now + timedelta(days=i // 4)).date(),
+                draw_time=time(hour=19),
+                status=statuses[i % 4],
+                betting_opens_at=now - timedelta(hours=1),
+                betting_closes_at=now + timedelta(minutes=7 * i),
+                total_bets=i,
+                total_stake_amount=Decimal(i) / 4,
+            )
+            for i in range(count)
+        ], batch_size=500)
+        return game_type
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+
+from betting.models import Notification, NotificationEvent
+
+
+class Command(BaseCommand):
+    help = 'Move repeated broadcast notification text into shared NotificationEvent rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-recipients',
+            type=int,
+            default=2,
+            help='Only compact messages sent to at least this many rows',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be compacted without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        # Per-bet notifications stay as they are; broadcasts have no bet
+        groups = Notification.objects.filter(
+            event__isnull=True,
+            bet__isnull=True
+        ).exclude(title='').values(
+            'game_type_id', 'notification_type', 'title', 'message'
+        ).annotate(
+            rows=Count('id'), first_sent=Min('created_at')
+        ).filter(rows__gte=options['min_recipients']).order_by('first_sent')
+
+        events = 0
+        rows = 0
+        for group in list(groups):
+            if options['dry_run']:
+                events += 1
+                rows += group['rows']
+                continue
+
+            with transaction.atomic():
+                event = NotificationEvent.objects.create(
+                    game_type_id=group['game_type_id'],
+                    notification_type=group['notification_type'],
+                    title=group['title'],
+                    message=group['message'],
+                )
+                # auto_now_add ignores the value on create
+                NotificationEvent.objects.filter(pk=event.pk).update(created_at=group['first_sent'])
+
+                rows += Notification.objects.filter(
+                    event__isnull=True,
+                    bet__isnull=True,
+                    game_type_id=group['game_type_id'],
+                    notification_type=group['notification_type'],
+                    title=group['title'],
+                    message=group['message'],
+                ).update(
+                    event=event,
+                    game_type=None,
+                    notification_type='',
+                    title='',
+                    message='',
+                )
+            events += 1
+
+        verb = 'Would compact' if options['dry_run'] else 'Compacted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {rows} notifications into {events} events'))
@@ -6,10 +6,11 @@ from decimal import Decimal
 
 from betting.models import (
     GameType, BetType, GameOdds, Draw, Bet,
-    Notification, BetTransaction, generate_bet_number,
-    generate_transaction_reference
+    Notification, generate_bet_number
 )
 from users.models import User
+from users.services import BalanceService
+from wallet.models import WalletTransaction
 
 
 class Command(BaseCommand):
@@ -29,8 +30,8 @@ class Command(BaseCommand):
             )
             if created:
                 user.set_password('password')
-                user.account_balance = Decimal('100.00')
                 user.save()
+                BalanceService.credit(user.pk, Decimal('100.00'), 'deposit', description='Test funds')
 
             # GameType - pick an existing choice name from model choices
             game_type, _ = GameType.objects.get_or_create(
@@ -121,19 +122,14 @@ class Command(BaseCommand):
                 }
             )
 
-            # Transaction - a sample stake transaction record
-            BetTransaction.objects.get_or_create(
-                bet=bet,
-                user=user,
-                reference=generate_transaction_reference(),
-                defaults={
-                    'transaction_type': 'stake',
-                    'amount': bet.stake_amount,
-                    'balance_before': user.account_balance - bet.stake_amount,
-                    'balance_after': user.account_balance,
-                    'description': 'Test stake transaction'
-                }
-            )
+            # Transaction - a sample stake ledger entry
+            if not WalletTransaction.objects.filter(bet=bet, transaction_type='stake').exists():
+                BalanceService.debit(
+                    user.pk, bet.stake_amount,
+                    reference=f"STAKE-{bet.bet_number}",
+                    description='Test stake transaction',
+                    bet=bet
+                )
 
         # Summary output
         self.stdout.write(self.style.SUCCESS('Test data creation complete'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from betting.draw_calendar import generate_draws, load_schedules
+from betting.models import GameType
+
+
+class Command(BaseCommand):
+    help = 'Generate future draws for every active game type from its draw days and draw time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Days ahead to generate (defaults to DRAW_CALENDAR_HORIZON_DAYS)',
+        )
+        parser.add_argument(
+            '--game',
+            action='append',
+            dest='codes',
+            help='Only generate for this game type code (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        game_types = GameType.objects.filter(is_active=True, draw_time__isnull=False)
+        if options['codes']:
+            game_types = game_types.filter(code__in=options['codes'])
+
+        schedules = load_schedules(game_types)
+        if options['codes'] and not schedules:
+            raise CommandError('No active game type with a valid schedule matches --game')
+
+        created = generate_draws(days=options['days'], schedules=schedules)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {created} draws for {len(schedules)} game types'
+        ))
@@ -0,0 +1,342 @@
+import random
+import time as clock
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from betting.draw_calendar import DrawSchedule
+from betting.models import Bet, BetType, Draw, GameType, UserSubscription
+from betting.payouts import get_payout_table
+from betting.settlement import DrawScorer
+from betting.stats import rebuild_user_statistics
+from users.models import User
+from users.services import BalanceService
+
+
+# name -> (display name, min numbers, max numbers, base odds, share of bets)
+BET_TYPES = {
+    'direct_one': ('Direct One', 1, 1, Decimal('40.00'), 10),
+    'direct_two': ('Direct Two', 2, 2, Decimal('240.00'), 30),
+    'direct_three': ('Direct Three', 3, 3, Decimal('2100.00'), 15),
+    'direct_four': ('Direct Four', 4, 4, Decimal('6000.00'), 5),
+    'direct_five': ('Direct Five', 5, 5, Decimal('44000.00'), 3),
+    'perm_two': ('Perm Two', 3, 8, Decimal('240.00'), 20),
+    'perm_three': ('Perm Three', 4, 8, Decimal('2100.00'), 8),
+    'banker': ('Banker', 1, 1, Decimal('100.00'), 5),
+    'against': ('Against', 1, 5, Decimal('10.00'), 4),
+}
+
+# Game names that do not carry their draw day
+DRAW_DAYS = {
+    'Midweek': 'Wednesday',
+    'National Weekly': 'Saturday',
+    'Quick 5/11': 'Daily',
+}
+
+# Stakes players actually use, most popular first
+STAKES = [Decimal(s) for s in ('1', '2', '5', '10', '20', '50', '100')]
+STAKE_WEIGHTS = [35, 25, 18, 10, 6, 4, 2]
+
+WIN_PAID_RATIO = 0.7
+ACTIVITY_CAP = 150
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a reproducible production-sized data set of users, subscriptions, draws and bets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Players to create')
+        parser.add_argument('--bets', type=int, default=1000000, help='Bets to create')
+        parser.add_argument(
+            '--subscriptions-per-user',
+            type=float,
+            default=2.0,
+            help='Average game subscriptions per player',
+        )
+        parser.add_argument('--days-back', type=int, default=90, help='Days of completed draws')
+        parser.add_argument('--days-ahead', type=int, default=7, help='Days of open and scheduled draws')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument(
+            '--prefix',
+            default='load',
+            help='Prefix for generated usernames, game codes and bet numbers',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete data previously generated with this prefix first',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.now = timezone.now()
+
+        users = User.objects.filter(username__startswith=f'{self.prefix}_')
+        game_types = GameType.objects.filter(code__startswith=f'{self.prefix.upper()}_')
+        if options['clear']:
+            self.stdout.write('Deleting previous load data...')
+            game_types.delete()
+            users.delete()
+        elif users.exists() or game_types.exists():
+            raise CommandError(f"Data with prefix '{self.prefix}' exists; pass --clear or another --prefix")
+
+        started = clock.perf_counter()
+        games = self.create_game_types()
+        bet_types = self.create_bet_types()
+        user_ids = self.create_users(options['users'])
+        self.create_subscriptions(user_ids, games, options['subscriptions_per_user'])
+        draws = self.create_draws(games, options['days_back'], options['days_ahead'])
+        self.create_bets(options['bets'], user_ids, games, draws, bet_types)
+        self.rebuild_statistics(user_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated load data in {clock.perf_counter() - started:.1f}s (prefix {self.prefix}, seed {options["seed"]})'
+        ))
+
+    def progress(self, label, done, total, started):
+        elapsed = clock.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f'  {label}: {done}/{total} ({rate:,.0f} rows/s)')
+
+    def create_game_types(self):
+        """One game type per GameType.GAME_TYPES entry, with a schedule derived from its name"""
+        games = []
+        for i, (name, _) in enumerate(GameType.GAME_TYPES):
+            if name.startswith('VAG'):
+                category, draw_time = 'vag_games', time(20, 30)
+            elif name.startswith('Noon'):
+                category, draw_time = 'noon_rush', time(13, 30)
+            elif DRAW_DAYS.get(name) == 'Daily':
+                category, draw_time = 'other_games', time(10, 0)
+            else:
+                category, draw_time = 'nla_590', time(19, 0)
+
+            draw_days = DRAW_DAYS.get(name) or next(
+                day for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+                if day in name
+            )
+            games.append(GameType(
+                name=name,
+                code=f'{self.prefix.upper()}_{i}',
+                category=category,
+                description=f'{name} (generated load)',
+                number_range_end=11 if name == 'Quick 5/11' else 90,
+                draw_time=draw_time,
+                draw_days=draw_days,
+            ))
+        games = GameType.objects.bulk_create(games)
+        games = list(GameType.objects.filter(code__in=[g.code for g in games]).order_by('id'))
+
+        # Popularity falls off with rank, in a seeded order
+        ranks = list(range(len(games)))
+        self.rng.shuffle(ranks)
+        self.game_weights = [1 / (rank + 1) ** 0.8 for rank in ranks]
+        self.stdout.write(f'  game types: {len(games)}')
+        return games
+
+    def create_bet_types(self):
+        bet_types = []
+        for name, (display_name, min_numbers, max_numbers, base_odds, _) in BET_TYPES.items():
+            bet_type, _ = BetType.objects.get_or_create(name=name, defaults={
+                'display_name': display_name,
+                'description': f'{display_name} (generated load)',
+                'base_odds': base_odds,
+                'min_numbers_required': min_numbers,
+                'max_numbers_allowed': max_numbers,
+            })
+            bet_types.append(bet_type)
+        self.bet_type_weights = [BET_TYPES[bt.name][4] for bt in bet_types]
+        self.stdout.write(f'  bet types: {len(bet_types)}')
+        return bet_types
+
+    def create_users(self, count):
+        """Players with a long-tailed balance and activity level; returns ids in creation order"""
+        started = clock.perf_counter()
+        password = make_password(None)
+        regions = [code for code, _ in User.REGION_CHOICES]
+        self.activity = []
+
+        for offset in range(0, count, self.batch_size):
+            batch = []
+            balances = {}
+            for i in range(offset, min(offset + self.batch_size, count)):
+                batch.append(User(
+                    username=f'{self.prefix}_{i:08d}',
+                    password=password,
+                    user_type='agent' if self.rng.random() < 0.02 else 'player',
+                    region=self.rng.choice(regions),
+                    date_of_birth=date(1960, 1, 1) + timedelta(days=self.rng.randrange(16000)),
+                ))
+                balances[batch[-1].username] = Decimal(int(self.rng.lognormvariate(3.5, 1.2) * 100)) / 100
+                # A few heavy bettors place most bets, none more than ~100x the median
+                self.activity.append(min(self.rng.paretovariate(1.5), ACTIVITY_CAP))
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+                ids = dict(User.objects.filter(username__in=balances).values_list('username', 'id'))
+                BalanceService.bulk_credit([
+                    (ids[username], balance, f'FLOAT-{username}')
+                    for username, balance in balances.items() if balance > 0
+                ], 'deposit', 'Opening balance')
+            self.progress('users', min(offset + self.batch_size, count), count, started)
+
+        return list(
+            User.objects.filter(username__startswith=f'{self.prefix}_')
+            .order_by('username').values_list('id', flat=True)
+        )
+
+    def create_subscriptions(self, user_ids, games, per_user):
+        started = clock.perf_counter()
+        created = 0
+        batch = []
+        for user_id in user_ids:
+            wanted = min(len(games), int(self.rng.expovariate(1 / per_user) + 0.5)) if per_user else 0
+            chosen = set()
+            while len(chosen) < wanted:
+                chosen.add(self.rng.choices(range(len(games)), weights=self.game_weights)[0])
+            batch.extend(
+                UserSubscription(user_id=user_id, game_type_id=games[i].id, is_active=self.rng.random() < 0.9)
+                for i in sorted(chosen)
+            )
+            if len(batch) >= self.batch_size:
+                created += self.flush(UserSubscription, batch)
+        created += self.flush(UserSubscription, batch)
+        self.progress('subscriptions', created, created, started)
+
+    def create_draws(self, games, days_back, days_ahead):
+        """Draws from each game's schedule; past draws are completed with winning numbers"""
+        start = timezone.localdate(self.now) - timedelta(days=days_back)
+        end = timezone.localdate(self.now) + timedelta(days=days_ahead)
+
+        draws = []
+        for game in games:
+            schedule = DrawSchedule(game)
+            for draw_date in schedule.dates(start, end):
+                draw = schedule.build(draw_date)
+                if draw.betting_closes_at <= self.now:
+                    draw.status = 'completed'
+                    draw.winning_numbers = self.rng.sample(
+                        range(game.number_range_start, game.number_range_end + 1), 5
+                    )
+                    draw.machine_number = f'M{self.rng.randrange(1000, 10000)}'
+                elif draw.betting_opens_at <= self.now:
+                    draw.status = 'open'
+                draws.append(draw)
+        Draw.objects.bulk_create(draws, batch_size=self.batch_size)
+
+        by_game = {}
+        for draw in Draw.objects.filter(game_type__in=games).select_related('game_type').order_by('id'):
+            by_game.setdefault(draw.game_type_id, []).append(draw)
+        self.stdout.write(f'  draws: {len(draws)}')
+        return by_game
+
+    def create_bets(self, count, user_ids, games, draws, bet_types):
+        """Bets spread by player activity, game popularity and bet type share; past draws are settled"""
+        started = clock.perf_counter()
+        payouts = get_payout_table()
+        scorers = {}
+        totals = {}
+        # Scheduled draws have not opened for betting yet
+        bettable = {
+            game_id: [draw for draw in game_draws if draw.status != 'scheduled']
+            for game_id, game_draws in draws.items()
+        }
+        games_with_draws = [(game, weight) for game, weight in zip(games, self.game_weights) if bettable.get(game.id)]
+        game_choices = [game for game, _ in games_with_draws]
+        game_weights = [weight for _, weight in games_with_draws]
+        user_cum_weights = []
+        running = 0
+        for weight in self.activity:
+            running += weight
+            user_cum_weights.append(running)
+
+        with self.placed_at_settable():
+            for offset in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - offset)
+                users = self.rng.choices(user_ids, cum_weights=user_cum_weights, k=size)
+                batch = []
+                for i, user_id in enumerate(users, start=offset):
+                    game = self.rng.choices(game_choices, weights=game_weights)[0]
+                    draw = self.rng.choice(bettable[game.id])
+                    bet_type = self.rng.choices(bet_types, weights=self.bet_type_weights)[0]
+                    batch.append(self.build_bet(i, user_id, game, draw, bet_type, payouts, scorers, totals))
+                with transaction.atomic():
+                    Bet.objects.bulk_create(batch)
+                self.progress('bets', offset + size, count, started)
+
+        for game_draws in draws.values():
+            for draw in game_draws:
+                draw.total_bets, draw.total_stake_amount, draw.total_winners, draw.total_payout_amount = (
+                    totals.get(draw.id, (0, Decimal('0.00'), 0, Decimal('0.00')))
+                )
+        Draw.objects.bulk_update(
+            [draw for game_draws in draws.values() for draw in game_draws],
+            ['total_bets', 'total_stake_amount', 'total_winners', 'total_payout_amount'],
+            batch_size=self.batch_size
+        )
+
+    def build_bet(self, i, user_id, game, draw, bet_type, payouts, scorers, totals):
+        numbers = self.rng.randint(bet_type.min_numbers_required, bet_type.max_numbers_allowed)
+        numbers = min(numbers, game.number_range_end - game.number_range_start + 1)
+        stake = self.rng.choices(STAKES, weights=STAKE_WEIGHTS)[0]
+        stake = min(max(stake, game.min_stake), game.max_stake)
+        window = (draw.betting_closes_at - draw.betting_opens_at).total_seconds()
+        placed_at = min(draw.betting_opens_at + timedelta(seconds=self.rng.random() * window), self.now)
+
+        bet = Bet(
+            user_id=user_id,
+            draw_id=draw.id,
+            bet_type_id=bet_type.id,
+            bet_number=f'{self.prefix.upper()}-{i:010d}',
+            selected_numbers=self.rng.sample(range(game.number_range_start, game.number_range_end + 1), numbers),
+            stake_amount=stake,
+            potential_winnings=stake * payouts.potential_multiplier(game.id, bet_type.id, numbers),
+            status='active',
+            placed_at=placed_at,
+        )
+
+        bets, staked, winners, payout = totals.get(draw.id, (0, Decimal('0.00'), 0, Decimal('0.00')))
+        if draw.status == 'completed':
+            scorer = scorers.get(draw.id) or scorers.setdefault(draw.id, DrawScorer(draw, payouts))
+            won, matched, multiplier = scorer.score(bet_type, bet.selected_numbers)
+            bet.processed_at = draw.betting_closes_at + timedelta(hours=1)
+            if won:
+                bet.actual_winnings = scorer.payout(bet, bet_type, matched, multiplier)
+                bet.status = 'paid' if self.rng.random() < WIN_PAID_RATIO else 'won'
+                winners += 1
+                payout += bet.actual_winnings
+            else:
+                bet.status = 'lost'
+        totals[draw.id] = (bets + 1, staked + stake, winners, payout)
+        return bet
+
+    @contextmanager
+    def placed_at_settable(self):
+        """Let bulk_create keep generated placed_at values instead of stamping now"""
+        field = Bet._meta.get_field('placed_at')
+        field.auto_now_add = False
+        try:
+            yield
+        finally:
+            field.auto_now_add = True
+
+    def rebuild_statistics(self, user_ids):
+        started = clock.perf_counter()
+        batch_size = max(1, self.batch_size // 10)
+        for offset in range(0, len(user_ids), batch_size):
+            rebuild_user_statistics(user_ids[offset:offset + batch_size])
+        self.progress('statistics', len(user_ids), len(user_ids), started)
+
+    def flush(self, model, batch):
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        created = len(batch)
+        batch.clear()
+        return created
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from betting.stats import rebuild_user_statistics
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the per-user betting statistics table from the bets table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild this user id (repeatable)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Users recomputed per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = User.objects.order_by('pk')
+        if options['user_ids']:
+            users = users.filter(pk__in=options['user_ids'])
+
+        rebuilt = 0
+        last_id = 0
+        while True:
+            batch = list(users.filter(pk__gt=last_id).values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            rebuilt += rebuild_user_statistics(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'  {rebuilt} users rebuilt')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {rebuilt} users'))
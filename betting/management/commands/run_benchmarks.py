@@ -0,0 +1,335 @@
+import json
+import math
+import platform
+import random
+import subprocess
+import time as clock
+from datetime import time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from betting.models import Bet, BetType, Draw, GameType, UserSubscription
+from betting.serializers import PlaceBetSerializer
+from betting.stats import rebuild_user_statistics
+from betting.task import check_bets_for_draw, send_draw_opened_notification
+from users.models import User
+from users.services import BalanceService
+
+
+BENCHMARKS = ['placement', 'settlement', 'fanout', 'bet_list', 'statistics']
+
+# Metrics where a larger number is better; everything else is a duration
+THROUGHPUT_METRICS = {'bets_per_second', 'rows_per_second'}
+
+# Operations run untimed to warm caches, then again to count queries per
+# bet / per request; capturing queries inside a timed loop inflates it
+QUERY_SAMPLE_SIZE = 10
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def latency_summary(samples):
+    return {
+        'requests': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the betting hot paths on the configured database and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            action='append',
+            choices=BENCHMARKS,
+            help='Run only this benchmark (repeatable)',
+        )
+        parser.add_argument('--place-bets', type=int, default=2000, help='Bets placed through PlaceBetSerializer')
+        parser.add_argument('--settle-bets', type=int, default=50000, help='Active bets settled by check_bets_for_draw')
+        parser.add_argument('--subscribers', type=int, default=20000, help='Subscribers notified when a draw opens')
+        parser.add_argument('--list-bets', type=int, default=5000, help='Bets owned by the user whose lists are timed')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Print changes against an earlier results file')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.suffix = self.now.strftime('%Y%m%d%H%M%S%f')
+        baseline = self.load(options['compare']) if options['compare'] else None
+
+        results = {}
+        self.setup()
+        try:
+            for name in options['only'] or BENCHMARKS:
+                self.stdout.write(f'Running {name}...')
+                results[name] = getattr(self, f'bench_{name}')(options)
+                self.stdout.write(f'  {json.dumps(results[name])}')
+        finally:
+            self.teardown()
+
+        report = {'meta': self.meta(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if baseline:
+            self.print_comparison(baseline, report)
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': self.now.isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'draw_counter_mode': settings.DRAW_COUNTER_MODE,
+            'seed': options['seed'],
+            'parameters': {
+                key: options[key]
+                for key in ('place_bets', 'settle_bets', 'subscribers', 'list_bets', 'requests')
+            },
+        }
+
+    # Fixtures
+
+    def setup(self):
+        self.game_type = GameType.objects.create(
+            name='Quick 5/11',
+            code=f'BENCH_{self.suffix}',
+            category='other_games',
+            description='Benchmark suite',
+            min_stake=Decimal('1.00'),
+            max_stake=Decimal('100.00'),
+            draw_time=time(hour=12),
+            draw_days='Daily'
+        )
+        self.bet_types = []
+        for name, display_name, numbers, odds in (
+            ('direct_one', 'Direct One', 1, Decimal('40.00')),
+            ('direct_two', 'Direct Two', 2, Decimal('240.00')),
+            ('direct_three', 'Direct Three', 3, Decimal('2100.00')),
+        ):
+            bet_type, _ = BetType.objects.get_or_create(name=name, defaults={
+                'display_name': display_name,
+                'description': display_name,
+                'base_odds': odds,
+                'min_numbers_required': numbers,
+                'max_numbers_allowed': numbers,
+            })
+            self.bet_types.append(bet_type)
+        self.draw_count = 0
+
+    def teardown(self):
+        self.game_type.delete()
+        User.objects.filter(username__startswith=f'bench_{self.suffix}_').delete()
+
+    def create_draw(self, status):
+        self.draw_count += 1
+        return Draw.objects.create(
+            game_type=self.game_type,
+            draw_number=f'BENCH-{self.suffix}-{self.draw_count}',
+            draw_date=self.now.date(),
+            draw_time=time(hour=12),
+            status=status,
+            betting_opens_at=self.now - timedelta(hours=1),
+            betting_closes_at=self.now + timedelta(hours=1)
+        )
+
+    def create_users(self, label, count, balance=Decimal('0.00')):
+        User.objects.bulk_create([
+            User(username=f'bench_{self.suffix}_{label}_{i}')
+            for i in range(count)
+        ], batch_size=5000)
+        user_ids = list(
+            User.objects.filter(username__startswith=f'bench_{self.suffix}_{label}_')
+            .order_by('id').values_list('id', flat=True)
+        )
+        if balance > 0:
+            BalanceService.bulk_credit(
+                [(user_id, balance, f'BENCH-{self.suffix}-{user_id}') for user_id in user_ids],
+                'deposit', 'Benchmark float'
+            )
+        return user_ids
+
+    def create_bets(self, label, user_ids, draw, count, **fields):
+        bets = []
+        for i in range(count):
+            bet_type = self.rng.choice(self.bet_types)
+            bets.append(Bet(
+                user_id=user_ids[i % len(user_ids)],
+                draw=draw,
+                bet_type=bet_type,
+                bet_number=f'BENCH-{self.suffix}-{label}-{i}',
+                selected_numbers=self.rng.sample(range(1, 91), bet_type.min_numbers_required),
+                stake_amount=Decimal('1.00'),
+                potential_winnings=bet_type.base_odds,
+                status='active',
+                **fields
+            ))
+        Bet.objects.bulk_create(bets, batch_size=5000)
+
+    # Benchmarks
+
+    def bench_placement(self, options):
+        """Sequential placement through PlaceBetSerializer, as BetViewSet.create does"""
+        count = options['place_bets']
+        sample = min(QUERY_SAMPLE_SIZE, count)
+        draw = self.create_draw('open')
+        user = User.objects.get(pk=self.create_users('place', 1, Decimal(count + 2 * sample))[0])
+        request = SimpleNamespace(user=user)
+
+        for _ in range(sample):
+            self.place_bet(draw, request)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(sample):
+                self.place_bet(draw, request)
+        query_count = len(queries)
+
+        started = clock.perf_counter()
+        for _ in range(count):
+            self.place_bet(draw, request)
+        elapsed = clock.perf_counter() - started
+
+        return {
+            'bets': count,
+            'seconds': round(elapsed, 3),
+            'bets_per_second': round(count / elapsed, 1),
+            'queries_per_bet': round(query_count / sample, 2),
+        }
+
+    def place_bet(self, draw, request):
+        bet_type = self.rng.choice(self.bet_types)
+        serializer = PlaceBetSerializer(data={
+            'draw_id': draw.id,
+            'bet_type_id': bet_type.id,
+            'selected_numbers': self.rng.sample(range(1, 91), bet_type.min_numbers_required),
+            'stake_amount': '1.00',
+        }, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def bench_settlement(self, options):
+        """check_bets_for_draw on a completed draw, settled in this process"""
+        count = options['settle_bets']
+        draw = self.create_draw('completed')
+        draw.winning_numbers = self.rng.sample(range(1, 91), 5)
+        draw.save(update_fields=['winning_numbers'])
+        user_ids = self.create_users('settle', max(1, count // 20))
+        self.create_bets('settle', user_ids, draw, count)
+        rebuild_user_statistics(user_ids)
+
+        with override_settings(SETTLEMENT_EXECUTOR='local'):
+            started = clock.perf_counter()
+            check_bets_for_draw(draw.id)
+            elapsed = clock.perf_counter() - started
+
+        draw.refresh_from_db()
+        return {
+            'bets': count,
+            'winners': draw.total_winners,
+            'seconds': round(elapsed, 3),
+            'bets_per_second': round(count / elapsed, 1),
+        }
+
+    def bench_fanout(self, options):
+        """send_draw_opened_notification to every subscriber of the draw's game"""
+        count = options['subscribers']
+        draw = self.create_draw('open')
+        UserSubscription.objects.bulk_create([
+            UserSubscription(user_id=user_id, game_type=self.game_type)
+            for user_id in self.create_users('fanout', count)
+        ], batch_size=5000)
+
+        started = clock.perf_counter()
+        send_draw_opened_notification(draw.id)
+        elapsed = clock.perf_counter() - started
+
+        return {
+            'rows': count,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(count / elapsed, 1),
+        }
+
+    def bench_bet_list(self, options):
+        """GET /api/bets/ first pages for a user with many bets"""
+        user = User.objects.get(pk=self.create_users('list', 1)[0])
+        self.create_bets('list', [user.pk], self.create_draw('open'), options['list_bets'])
+        return self.time_requests(user, '/api/bets/', options['requests'])
+
+    def bench_statistics(self, options):
+        """GET /api/statistics/ for a user with a statistics row"""
+        user = User.objects.get(pk=self.create_users('stats', 1)[0])
+        self.create_bets('stats', [user.pk], self.create_draw('open'), 100)
+        rebuild_user_statistics([user.pk])
+        return self.time_requests(user, '/api/statistics/', options['requests'])
+
+    def time_requests(self, user, url, count):
+        client = APIClient()
+        client.force_authenticate(user)
+        sample = min(QUERY_SAMPLE_SIZE, count)
+        for _ in range(sample):
+            client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(sample):
+                client.get(url)
+        # Read now: each later request resets the connection's query log
+        query_count = len(queries)
+
+        samples = []
+        for _ in range(count):
+            started = clock.perf_counter()
+            response = client.get(url)
+            samples.append(clock.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+
+        summary = latency_summary(samples)
+        summary['queries_per_request'] = round(query_count / sample, 2)
+        return summary
+
+    def print_comparison(self, baseline, report):
+        self.stdout.write(f"\nAgainst {baseline['meta'].get('commit') or 'baseline'}:")
+        for name, metrics in report['results'].items():
+            before = baseline['results'].get(name, {})
+            for metric, value in metrics.items():
+                old = before.get(metric)
+                if not isinstance(value, (int, float)) or not old or metric.endswith(('bets', 'rows', 'requests', 'winners')):
+                    continue
+                change = (value - old) / old * 100
+                better = change > 0 if metric in THROUGHPUT_METRICS else change < 0
+                style = self.style.SUCCESS if better else self.style.WARNING
+                self.stdout.write(style(f'  {name}.{metric}: {old} -> {value} ({change:+.1f}%)'))
@@ -7,6 +7,7 @@ from datetime import timedelta
 from decimal import Decimal
 from betting.models import GameType, BetType, Draw, Bet, GameOdds
 from users.models import User
+from users.services import BalanceService
 import json
 
 
@@ -110,18 +111,18 @@ Invoke-RestMethod -Uri "http://127.0.0.1:8000/api/betting/bets/" -Method GET -He
                 'last_name': 'User',
                 'date_of_birth': '2000-01-01',
                 'phone_number': '+233501234567',
-                'account_balance': Decimal('1000.00'),
                 'user_type': 'player'
             }
         )
+        top_up = Decimal('1000.00') - BalanceService.balance(user.pk)
+        if top_up > 0:
+            BalanceService.credit(user.pk, top_up, 'deposit', description='Test funds')
         if created:
             user.set_password('TestPass123!')
             user.save()
             self.stdout.write(self.style.SUCCESS(f"  ✓ Created user: {user.username}"))
         else:
-            # Update balance if user exists
-            user.account_balance = Decimal('1000.00')
-            user.save()
+            # Balance was topped up to GH₵1000 above
             self.stdout.write(self.style.WARNING(f"  ⚠ User exists: {user.username} (balance updated)"))
         
         # Create bet type
@@ -237,8 +238,10 @@ Invoke-RestMethod -Uri "http://127.0.0.1:8000/api/betting/bets/" -Method GET -He
             
             if user.account_balance < Decimal('1.00'):
                 self.stdout.write(self.style.WARNING("    ⚠ Low balance! Adding funds..."))
+                BalanceService.credit(
+                    user.pk, Decimal('1000.00') - user.account_balance, 'deposit', description='Test funds'
+                )
                 user.account_balance = Decimal('1000.00')
-                user.save()
                 self.stdout.write(self.style.SUCCESS(f"    ✓ Balance updated to GH₵{user.account_balance}"))
             
             return user
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('betting', '0005_alter_bettype_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='draw',
+            name='total_winners',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('betting', '0006_draw_total_winners'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawCounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bets', models.IntegerField(default=0)),
+                ('stake_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('draw', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_deltas', to='betting.draw')),
+            ],
+            options={
+                'db_table': 'draw_counter_deltas',
+            },
+        ),
+    ]
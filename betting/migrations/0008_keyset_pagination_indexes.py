@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('betting', '0007_draw_counter_delta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['-placed_at', '-id'], name='bets_placed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['user', '-placed_at', '-id'], name='bets_user_placed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['user', 'status', '-placed_at', '-id'], name='bets_user_status_placed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draw',
+            index=models.Index(fields=['-draw_date', '-draw_time', '-id'], name='draws_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draw',
+            index=models.Index(fields=['status', '-draw_date', '-draw_time', '-id'], name='draws_status_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='notifications_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at', '-id'], name='notifications_user_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_id_number'),
+        ('betting', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatistics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='betting_statistics', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_bets', models.IntegerField(default=0)),
+                ('total_staked', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_won', models.IntegerField(default=0)),
+                ('total_winnings', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('active_bets', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'User statistics',
+                'db_table': 'user_statistics',
+            },
+        ),
+    ]
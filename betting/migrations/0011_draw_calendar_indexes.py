@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('betting', '0010_notification_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='draw',
+            index=models.Index(fields=['status', 'betting_opens_at'], name='draws_status_opens_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draw',
+            index=models.Index(fields=['status', 'betting_closes_at', 'id'], name='draws_status_closes_idx'),
+        ),
+    ]
@@ -6,6 +6,7 @@ from decimal import Decimal
 import json
 from django.utils import timezone
 from django.db import models
+from NLA.references import new_reference, new_references
 
 
 
@@ -219,6 +220,7 @@ class Draw(models.Model):
     total_bets = models.IntegerField(default=0)
     total_stake_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     total_payout_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_winners = models.IntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -226,6 +228,12 @@ class Draw(models.Model):
     class Meta:
         db_table = 'draws'
         ordering = ['-draw_date', '-draw_time']
+        indexes = [
+            models.Index(fields=['-draw_date', '-draw_time', '-id'], name='draws_schedule_idx'),
+            models.Index(fields=['status', '-draw_date', '-draw_time', '-id'], name='draws_status_schedule_idx'),
+            models.Index(fields=['status', 'betting_opens_at'], name='draws_status_opens_idx'),
+            models.Index(fields=['status', 'betting_closes_at', 'id'], name='draws_status_closes_idx'),
+        ]
     
     def __str__(self):
         return f"{self.game_type.name} - {self.draw_number}"
@@ -239,6 +247,20 @@ class Draw(models.Model):
             self.betting_opens_at <= now <= self.betting_closes_at
         )
 
+class DrawCounterDelta(models.Model):
+    """Pending change to a draw's bet counters, folded into the draw periodically"""
+    
+    draw = models.ForeignKey(Draw, on_delete=models.CASCADE, related_name='counter_deltas')
+    bets = models.IntegerField(default=0)
+    stake_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'draw_counter_deltas'
+    
+    def __str__(self):
+        return f"{self.draw_id} +{self.bets} bets / GH₵{self.stake_amount}"
+
 class Bet(models.Model):
     """A user's bet on a specific draw"""
     
@@ -309,6 +331,9 @@ class Bet(models.Model):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['draw', 'status']),
             models.Index(fields=['bet_number']),
+            models.Index(fields=['-placed_at', '-id'], name='bets_placed_idx'),
+            models.Index(fields=['user', '-placed_at', '-id'], name='bets_user_placed_idx'),
+            models.Index(fields=['user', 'status', '-placed_at', '-id'], name='bets_user_status_placed_idx'),
         ]
     
     def __str__(self):
@@ -316,214 +341,30 @@ class Bet(models.Model):
     
     def calculate_potential_winnings(self):
         """Calculate how much the user could win"""
-        # Get the odds for this bet type and game
-        try:
-            odds = GameOdds.objects.get(
-            game_type=self.draw.game_type,
-            bet_type=self.bet_type,
-            numbers_count=len(self.selected_numbers)
-        )
-            if odds:
-                self.potential_winnings = self.stake_amount * odds.payout_multiplier
-            else:
-                self.potential_winnings = self.Stake_amount * self.bet_type.base_odds
-        except Exception as e:
-            self.potential_winnings = self.stake_amount * self.bet_type.base_odds
-
-            self.save()
-            return self.potential_winnings
-
-
+        from .payouts import get_payout_table
 
-def check_win(self):
-    """Check if this bet won after draw results are published - FIXED Direct One"""
-    if not self.draw.winning_numbers:
-        return False
-    
-    winning_numbers = self.draw.winning_numbers
-    selected_numbers = self.selected_numbers
-    
-    winning_set = set(winning_numbers)
-    selected_set = set(selected_numbers)
-    
-    print(f"[CHECK] Bet {self.bet_number}")
-    print(f"[CHECK] Bet Type: {self.bet_type.name}")
-    print(f"[CHECK] Selected: {selected_numbers}")
-    print(f"[CHECK] Winning: {winning_numbers}")
-    
-    won = False
-    numbers_matched = 0
-    payout_multiplier = Decimal('0.00')
-    
-    # DIRECT ONE LOGIC - Position-based match with 40x multiplier
-    if self.bet_type.name == 'direct_one':
-        if len(selected_numbers) == 1 and len(winning_numbers) >= 1:
-            # Check if the selected number matches the FIRST winning number
-            won = selected_numbers[0] == winning_numbers[0]
-            numbers_matched = 1 if won else 0
-            
-            # Direct One pays 40x the stake amount
-            if won:
-                payout_multiplier = Decimal('40.00')
-            
-            print(f"[CHECK] Direct One - Position match: {won}")
-            print(f"[CHECK] Selected: {selected_numbers[0]}, First Winning: {winning_numbers[0]}")
-            print(f"[CHECK] Payout multiplier: {payout_multiplier}x")
-        else:
-            print(f"[CHECK] Direct One - Invalid: need 1 selected number")
-            won = False
-    
-    # DIRECT TWO LOGIC
-    elif self.bet_type.name == 'direct_two':
-        if len(selected_numbers) == 2 and len(winning_numbers) >= 2:
-            # Check if BOTH selected numbers appear in winning numbers (any position)
-            numbers_matched = len(selected_set.intersection(winning_set))
-            won = numbers_matched == 2  # Both numbers must be present
-            
-            if won:
-                # You can set the multiplier for Direct Two here
-                payout_multiplier = Decimal('240.00')  # Example: adjust as needed
-
-            print(f"[CHECK] Direct Two - Found {numbers_matched}/2 numbers in winning set")
-            print(f"[CHECK] Selected: {selected_set}, Winning: {winning_set}")
-            print(f"[CHECK] Match: {won}")
-            print(f"[CHECK] Payout multiplier: {payout_multiplier}x")
+        multiplier = get_payout_table().potential_multiplier(
+            self.draw.game_type_id,
+            self.bet_type_id,
+            len(self.selected_numbers)
+        )
+        self.potential_winnings = self.stake_amount * multiplier
+        self.save()
+        return self.potential_winnings
 
-    # DIRECT THREE LOGIC  
-    elif self.bet_type.name == 'direct_three':
-        if len(selected_numbers) == 3 and len(winning_numbers) >= 3:
-            # Check if ALL 3 selected numbers appear in winning numbers (any position)
-            numbers_matched = len(selected_set.intersection(winning_set))
-            won = numbers_matched == 3  # All 3 numbers must be present
-            
-            if won:
-                payout_multiplier = Decimal('2100.00')  
-            
-            print(f"[CHECK] Direct Three - Found {numbers_matched}/3 numbers in winning set")
-            print(f"[CHECK] Selected: {selected_set}, Winning: {winning_set}")
-            print(f"[CHECK] Match: {won}")
-    
-    
-    # DIRECT FOUR LOGIC
-    elif self.bet_type.name == 'direct_four':
-        if len(selected_numbers) == 4 and len(winning_numbers) >= 4:
-            numbers_matched = len(selected_set.intersection(winning_set))
-            won = numbers_matched == 4  # All 4 numbers must be present
+    def check_win(self):
+        """Check if this bet won after draw results are published"""
+        from .settlement import finalize_draw_totals, settle_bets
 
-            if won:
-                payout_multiplier = Decimal('6,000.00')
-            print(f"[CHECK] Direct Four - Position match: {won}")
-            print(f"[CHECK]N Selected:{selected_set}, Winning: {winning_set}")
-            print(f"[CHECK] Match:{won}")
-                  
-    
-    # DIRECT FIVE LOGIC
-    elif self.bet_type.name == 'direct_five':
-        if len(selected_numbers) == 5 and len(winning_numbers) >= 4:
-            numbers_matched = len(selected_set.intersection(winning_set))
-            won = numbers_matched == 5  # All 4 numbers must be present
+        if not self.draw.winning_numbers or self.status != 'active':
+            return self.status == 'won'
 
-            if won:
-                payout_multiplier = Decimal('44,000.00')
-            print(f"[CHECK] Direct Five - Position match: {won}")
-            print(f"[CHECK]N Selected:{selected_set}, Winning: {winning_set}")
-            print(f"[CHECK] Match:{won}")
-             
-    # PERMUTATION LOGIC
-    elif self.bet_type.name.startswith('perm'):
-        numbers_matched = len(selected_set.intersection(winning_set))
-        
-        if self.bet_type.name == 'perm_two':
-            won = numbers_matched >= 2
-            if won:
-                payout_multiplier = Decimal('240.00')
-        elif self.bet_type.name == 'perm_three':
-            won = numbers_matched >= 3
-            if won:
-                payout_multiplier = Decimal('2,100.00')
-        else:
-            won = numbers_matched >= self.bet_type.min_numbers_required
-        
-        print(f"[CHECK] Perm - Matched {numbers_matched} numbers: {won}")
-    
-    
-    # AGAINST LOGIC
-    elif self.bet_type.name == 'against':
-        won = selected_set.isdisjoint(winning_set)
-        numbers_matched = 0
-        if won:
-            payout_multiplier = Decimal('10.00')  # Example: adjust as needed
-        print(f"[CHECK] Against - No matches: {won}")
-    
-    # BANKER LOGIC
-    elif self.bet_type.name == 'banker':
-        numbers_matched = len(selected_set.intersection(winning_set))
-        won = numbers_matched >= self.bet_type.min_numbers_required
-        if won:
-            payout_multiplier = Decimal('100.00')  # Example: adjust as needed
-        print(f"[CHECK] Banker - Matched {numbers_matched} numbers: {won}")
-    
-    # DEFAULT LOGIC
-    else:
-        numbers_matched = len(selected_set.intersection(winning_set))
-        won = numbers_matched >= self.bet_type.min_numbers_required
-        print(f"[CHECK] Default - Matched {numbers_matched} numbers: {won}")
-    
-    print(f"[CHECK] Final Result: {'WON' if won else 'LOST'}")
-    
-    # Calculate winnings based on the result
-    if won:
-        self.status = 'won'
-        
-        # Use the calculated payout_multiplier if we have one
-        if payout_multiplier > 0:
-            self.actual_winnings = self.stake_amount * payout_multiplier
-            print(f"[CHECK] Using calculated multiplier: {payout_multiplier}x")
-        else:
-            # Fallback: Try to get odds from GameOdds table
-            try:
-                odds = GameOdds.objects.get(
-                    game_type=self.draw.game_type,
-                    bet_type=self.bet_type,
-                    numbers_count=len(self.selected_numbers),
-                    numbers_matched=numbers_matched
-                )
-                self.actual_winnings = self.stake_amount * odds.payout_multiplier
-                print(f"[CHECK] Using GameOdds: {odds.payout_multiplier}x")
-            except GameOdds.DoesNotExist:
-                # Final fallback: use bet type base odds
-                self.actual_winnings = self.stake_amount * self.bet_type.base_odds
-                print(f"[CHECK] Using base odds: {self.bet_type.base_odds}x")
-        
-        # Update user balance
-        self.user.account_balance += self.actual_winnings
-        self.user.save()
-        print(f"[CHECK] Winnings: GH₵{self.actual_winnings}")
-        
-        # Create winning transaction
-        BetTransaction.objects.create(
-            bet=self,
-            user=self.user,
-            transaction_type='win',
-            amount=self.actual_winnings,
-            balance_before=self.user.account_balance - self.actual_winnings,
-            balance_after=self.user.account_balance,
-            reference=generate_transaction_reference(),
-            description=f"Winnings for bet {self.bet_number}"
-        )
-        
-    else:
-        self.status = 'lost'
-        self.actual_winnings = Decimal('0.00')
-        print(f"[CHECK] No winnings")
-    
-    self.processed_at = timezone.now()
-    self.save()
-    
-    return won
+        settle_bets(self.draw, [self])
+        finalize_draw_totals(self.draw)
+        return self.status == 'won'
 
 class BetTransaction(models.Model):
-    """Financial transaction for a bet"""
+    """Financial transaction for a bet (historical; new movements are wallet ledger entries)"""
     
     TRANSACTION_TYPES = [
         ('stake', 'Stake Payment'),
@@ -571,8 +412,34 @@ class UserSubscription(models.Model):
         return f"{self.user.username} - {self.game_type.name}"
 
 
+class NotificationEvent(models.Model):
+    """A broadcast message stored once and shared by every recipient's Notification"""
+    
+    game_type = models.ForeignKey(
+        GameType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notification_events'
+    )
+    notification_type = models.CharField(max_length=20)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'notification_events'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return self.title
+
+
 class Notification(models.Model):
-    """Notifications sent to users"""
+    """
+    Notifications sent to users. Broadcast rows point at a NotificationEvent
+    and leave type, title and message empty; the event supplies them.
+    """
     
     NOTIFICATION_TYPES = [
         ('game_update', 'Game Update'),
@@ -598,10 +465,17 @@ class Notification(models.Model):
         blank=True,
         related_name='notifications'
     )
+    event = models.ForeignKey(
+        NotificationEvent,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications'
+    )
     
-    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
-    title = models.CharField(max_length=200)
-    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES, blank=True)
+    title = models.CharField(max_length=200, blank=True)
+    message = models.TextField(blank=True)
     
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -610,31 +484,78 @@ class Notification(models.Model):
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notifications_user_recent_idx'),
+            models.Index(fields=['user', 'is_read', '-created_at', '-id'], name='notifications_user_unread_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.title} - {self.user.username}"
+        return f"{self.display_title} - {self.user.username}"
+    
+    @property
+    def display_type(self):
+        return self.event.notification_type if self.event_id else self.notification_type
+    
+    @property
+    def display_title(self):
+        return self.event.title if self.event_id else self.title
+    
+    @property
+    def display_message(self):
+        return self.event.message if self.event_id else self.message
     
     def mark_as_read(self):
         """Mark notification as read"""
+        from .unread import remove_unread
+
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
             self.save()
+            remove_unread(self.user_id)
 
 
-from django.utils import timezone
-import uuid
-
 def generate_bet_number():
     """Generate unique bet number"""
-    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-    random_part = str(uuid.uuid4().hex)[:6].upper()
-    return f"BET{timestamp}{random_part}"
+    return new_reference('BET')
+
+
+def generate_bet_numbers(count):
+    """Unique bet numbers for a batch of bets, in increasing order"""
+    return new_references('BET', count)
 
 
 def generate_transaction_reference():
     """Generate unique transaction reference"""
-    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-    random_part = str(uuid.uuid4().hex)[:8].upper()
-    return f"TXN{timestamp}{random_part}"
+    return new_reference('TXN')
 
+
+
+class UserStatistics(models.Model):
+    """Per-user betting totals, kept current at placement and settlement"""
+    
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='betting_statistics'
+    )
+    total_bets = models.IntegerField(default=0)
+    total_staked = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_won = models.IntegerField(default=0)
+    total_winnings = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    active_bets = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'user_statistics'
+        verbose_name_plural = 'User statistics'
+    
+    def __str__(self):
+        return f"Statistics for user {self.user_id}"
+    
+    @property
+    def win_rate(self):
+        if not self.total_bets:
+            return Decimal('0.00')
+        return round(Decimal(self.total_won) / self.total_bets * 100, 2)
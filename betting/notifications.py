@@ -0,0 +1,65 @@
+"""
+Bulk notification fan-out.
+
+A broadcast is stored once as a NotificationEvent. Recipient user ids are
+streamed from the database with a server-side cursor and each recipient gets
+a small Notification row (user, event, read state) written with bulk_create
+in fixed-size batches, so a broadcast to hundreds of thousands of users
+needs one INSERT per batch and constant memory.
+"""
+import time
+
+from .models import Bet, Notification, NotificationEvent, UserSubscription
+from .unread import add_unread
+
+
+FANOUT_BATCH_SIZE = 5000
+
+
+def subscriber_ids(game_type_id, chunk_size=FANOUT_BATCH_SIZE):
+    """Stream ids of users actively subscribed to a game type"""
+    return UserSubscription.objects.filter(
+        game_type_id=game_type_id,
+        is_active=True
+    ).values_list('user_id', flat=True).iterator(chunk_size=chunk_size)
+
+
+def bettor_ids(draw_id, chunk_size=FANOUT_BATCH_SIZE):
+    """Stream ids of users with at least one bet on a draw"""
+    return Bet.objects.filter(
+        draw_id=draw_id
+    ).order_by('user_id').values_list('user_id', flat=True).distinct().iterator(chunk_size=chunk_size)
+
+
+def fan_out(user_ids, batch_size=FANOUT_BATCH_SIZE, **event_fields):
+    """
+    Store one NotificationEvent from event_fields and link it to each user id.
+    Returns {'event', 'rows', 'seconds', 'rows_per_second'}.
+    """
+    started = time.perf_counter()
+    event = NotificationEvent.objects.create(**event_fields)
+    rows = 0
+    batch = []
+
+    for user_id in user_ids:
+        batch.append(Notification(user_id=user_id, event_id=event.id))
+        if len(batch) >= batch_size:
+            rows += _write_batch(batch)
+            batch = []
+
+    if batch:
+        rows += _write_batch(batch)
+
+    seconds = time.perf_counter() - started
+    return {
+        'event': event,
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds) if seconds else rows,
+    }
+
+
+def _write_batch(batch):
+    Notification.objects.bulk_create(batch)
+    add_unread([notification.user_id for notification in batch])
+    return len(batch)
@@ -0,0 +1,156 @@
+"""
+Keyset (seek) pagination.
+
+Pages are located by the ordering values of the last row served rather than
+by OFFSET, so fetching page 1,000 costs the same as fetching page 1. The
+ordering must end in a unique column (normally 'id') so positions are exact.
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """Paginate on an ordering such as ('-placed_at', '-id') using a seek condition"""
+
+    ordering = ('-id',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_position = [
+                _encode_value(self.row_value(rows[-1], field))
+                for field in self.field_names()
+            ]
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    @staticmethod
+    def row_value(row, field):
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+    def seek_filter(self, position):
+        """Rows strictly after position in the ordering, as one OR of prefix matches"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def decode_cursor(self, request, model):
+        """The position in a cursor, as values of model's ordering fields"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                self.cursor_value(model._meta.get_field(name), value)
+                for name, value in zip(self.field_names(), position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def cursor_value(field, value):
+        """Convert one decoded cursor value for field, raising ValueError if it does not fit"""
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError('cursor values must be scalars')
+        if isinstance(field, models.DateTimeField):
+            parsed = parse_datetime(value) if isinstance(value, str) else None
+            if parsed is None:
+                raise ValueError('not a datetime')
+            return parsed
+        return field.to_python(value)
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(
+            json.dumps(position, separators=(',', ':')).encode('ascii')
+        ).decode('ascii')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+
+class BetKeysetPagination(KeysetPagination):
+    ordering = ('-placed_at', '-id')
+
+
+class DrawKeysetPagination(KeysetPagination):
+    ordering = ('-draw_date', '-draw_time', '-id')
+
+
+class UpcomingDrawKeysetPagination(KeysetPagination):
+    ordering = ('betting_closes_at', 'id')
+
+
+class NotificationKeysetPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
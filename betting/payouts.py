@@ -0,0 +1,97 @@
+"""
+In-memory payout table compiled from GameOdds and BetType.base_odds.
+
+The table is built once per process and rebuilt only after an odds or bet
+type change (see betting/signals.py), so placing or settling a bet costs no
+odds queries. A version number kept in the default cache lets every process
+notice an admin edit, not just the one that saved it; when that cache is
+process-local the table is also rebuilt every LOCAL_CACHE_TTL_SECONDS, so
+Celery workers do not settle on stale odds.
+"""
+import time
+
+from django.core.cache import cache
+
+from NLA.caching import local_copy_expired
+from .models import BetType, GameOdds
+
+
+PAYOUT_TABLE_VERSION_KEY = 'betting:payout_table:version'
+
+
+class PayoutTable:
+    """Payout multipliers keyed by (game_type, bet_type, numbers_count, numbers_matched)"""
+
+    def __init__(self, odds, bet_types, version=0):
+        self.odds = odds
+        self.bet_types = bet_types
+        self.version = version
+        self.built_at = time.monotonic()
+
+        # numbers_count lookups only resolve when there is exactly one row,
+        # as GameOdds.objects.get() without numbers_matched did before
+        by_count = {}
+        for (game_type_id, bet_type_id, numbers_count, _), multiplier in odds.items():
+            by_count.setdefault((game_type_id, bet_type_id, numbers_count), []).append(multiplier)
+        self.by_count = {
+            key: multipliers[0]
+            for key, multipliers in by_count.items()
+            if len(multipliers) == 1
+        }
+
+    @classmethod
+    def build(cls, version=0):
+        """Compile the table with one query per model"""
+        odds = {
+            (game_type_id, bet_type_id, numbers_count, numbers_matched): multiplier
+            for game_type_id, bet_type_id, numbers_count, numbers_matched, multiplier
+            in GameOdds.objects.values_list(
+                'game_type_id', 'bet_type_id', 'numbers_count',
+                'numbers_matched', 'payout_multiplier'
+            )
+        }
+        bet_types = {bet_type.id: bet_type for bet_type in BetType.objects.all()}
+        return cls(odds, bet_types, version)
+
+    def base_odds(self, bet_type_id):
+        return self.bet_types[bet_type_id].base_odds
+
+    def payout_multiplier(self, game_type_id, bet_type_id, numbers_count, numbers_matched):
+        """Multiplier for a winning bet: the GameOdds row, else the bet type's base odds"""
+        key = (game_type_id, bet_type_id, numbers_count, numbers_matched)
+        if key in self.odds:
+            return self.odds[key]
+        return self.base_odds(bet_type_id)
+
+    def potential_multiplier(self, game_type_id, bet_type_id, numbers_count):
+        """Multiplier used for a bet's potential winnings at placement time"""
+        key = (game_type_id, bet_type_id, numbers_count)
+        if key in self.by_count:
+            return self.by_count[key]
+        return self.base_odds(bet_type_id)
+
+
+_payout_table = None
+
+
+def get_payout_table():
+    """Return this process's payout table, rebuilding it if odds changed"""
+    global _payout_table
+
+    version = cache.get(PAYOUT_TABLE_VERSION_KEY, 0)
+    table = _payout_table
+    if table is None or table.version != version or local_copy_expired(table.built_at):
+        table = PayoutTable.build(version)
+        _payout_table = table
+    return table
+
+
+def invalidate_payout_table():
+    """Drop the compiled table here and tell other processes to rebuild theirs"""
+    global _payout_table
+
+    _payout_table = None
+    try:
+        cache.incr(PAYOUT_TABLE_VERSION_KEY)
+    except ValueError:
+        cache.set(PAYOUT_TABLE_VERSION_KEY, 1, None)
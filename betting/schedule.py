@@ -0,0 +1,79 @@
+"""
+Draw state transitions.
+
+Transitions are single guarded UPDATE ... RETURNING statements: only draws
+still in the expected status are changed, and only their ids come back, so
+overlapping check_draw_status runs can never open or close a draw twice.
+with_betting_window() computes the same window state for reads in SQL.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import (
+    BooleanField, Case, DateTimeField, DurationField, ExpressionWrapper, F, Min, Q, Value, When
+)
+from django.utils import timezone
+
+from .models import Draw
+
+
+def transition_draws(from_status, to_status, due_field, now):
+    """Move draws whose due_field has passed from from_status to to_status; returns their ids"""
+    table = Draw._meta.db_table
+    qn = connection.ops.quote_name
+    status = qn(Draw._meta.get_field('status').column)
+    due = qn(Draw._meta.get_field(due_field).column)
+    updated_at = qn(Draw._meta.get_field('updated_at').column)
+    # Raw SQL skips the ORM's adaptation, which e.g. SQLite needs to compare
+    # against stored UTC text
+    at = connection.ops.adapt_datetimefield_value(now)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {qn(table)} SET {status} = %s, {updated_at} = %s "
+            f"WHERE {status} = %s AND {due} <= %s RETURNING {qn('id')}",
+            [to_status, at, from_status, at]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def next_transition_at(now):
+    """Earliest future betting_opens_at / betting_closes_at that will need a transition"""
+    opens = Draw.objects.filter(
+        status='scheduled', betting_opens_at__gt=now
+    ).aggregate(at=Min('betting_opens_at'))['at']
+    closes = Draw.objects.filter(
+        status='open', betting_closes_at__gt=now
+    ).aggregate(at=Min('betting_closes_at'))['at']
+    upcoming = [at for at in (opens, closes) if at is not None]
+    return min(upcoming) if upcoming else None
+
+
+def wakeup_due(now, horizon):
+    """The next transition time if it falls within horizon of now, else None"""
+    at = next_transition_at(now)
+    if at is None or at - now > horizon:
+        return None
+    return at
+
+
+def with_betting_window(queryset, now):
+    """
+    Annotate draws with betting_open and time_to_close as of one captured now
+    time_to_close is only set for open draws and is negative once betting has closed
+    """
+    return queryset.annotate(
+        betting_open=Case(
+            When(Q(status='open', betting_opens_at__lte=now, betting_closes_at__gte=now), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ),
+        time_to_close=Case(
+            When(status='open', then=ExpressionWrapper(
+                F('betting_closes_at') - Value(now, output_field=DateTimeField()),
+                output_field=DurationField()
+            )),
+            default=None,
+            output_field=DurationField()
+        ),
+    )
@@ -1,12 +1,20 @@
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from decimal import Decimal
+from datetime import timedelta
+from decimal import ROUND_HALF_EVEN, Context, Decimal
 from .models import (
     GameType, BetType, GameOdds, Draw, Bet, 
     BetTransaction, UserSubscription, Notification,
-    generate_bet_number, generate_transaction_reference
+    generate_bet_number, generate_bet_numbers
 )
+from .counters import record_draw_bets
+from .payouts import get_payout_table
+from .stats import record_bets_placed
+from .unread import add_unread
 from users.models import User
+from users.services import BalanceService, InsufficientBalance
 
 
 class GameTypeSerializer(serializers.ModelSerializer):
@@ -91,12 +99,25 @@ class GameOddsSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+def format_time_until_close(delta):
+    """'3h 20m' for an open draw, 'Closed' once its close time has passed"""
+    if delta is None:
+        return None
+    if delta < timedelta(0):
+        return "Closed"
+    hours = delta.seconds // 3600
+    minutes = (delta.seconds % 3600) // 60
+    return f"{hours}h {minutes}m"
+
+
 class DrawListSerializer(serializers.ModelSerializer):
     """List view of draws"""
     
     game_name = serializers.CharField(source='game_type.name', read_only=True)
     is_betting_open = serializers.SerializerMethodField()
     time_until_close = serializers.SerializerMethodField()
+    total_bets = serializers.SerializerMethodField()
+    total_stake_amount = serializers.SerializerMethodField()
     
     class Meta:
         model = Draw
@@ -110,18 +131,71 @@ class DrawListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
     
     def get_is_betting_open(self, obj):
+        # Annotated by schedule.with_betting_window when read through DrawViewSet
+        if hasattr(obj, 'betting_open'):
+            return obj.betting_open
         return obj.is_betting_open()
     
+    def get_total_bets(self, obj):
+        # Include counter deltas not yet folded (see betting.counters)
+        return obj.total_bets + getattr(obj, 'pending_bets', 0)
+    
+    def get_total_stake_amount(self, obj):
+        total = obj.total_stake_amount + getattr(obj, 'pending_stake', Decimal('0.00'))
+        return f"{total:.2f}"
+    
     def get_time_until_close(self, obj):
         if obj.status != 'open':
             return None
-        now = timezone.now()
-        if now > obj.betting_closes_at:
-            return "Closed"
-        delta = obj.betting_closes_at - now
-        hours = delta.seconds // 3600
-        minutes = (delta.seconds % 3600) // 60
-        return f"{hours}h {minutes}m"
+        if hasattr(obj, 'time_to_close'):
+            return format_time_until_close(obj.time_to_close)
+        return format_time_until_close(obj.betting_closes_at - timezone.now())
+
+
+def format_datetime(value, tz):
+    """A datetime as DRF's DateTimeField renders it"""
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class DrawRowSerializer(serializers.BaseSerializer):
+    """
+    DrawListSerializer's output built directly from values() rows
+    Used for list responses, where per-field DRF machinery dominates the cost
+    """
+    
+    VALUES = (
+        'id', 'game_type', 'draw_number', 'draw_date', 'draw_time', 'status',
+        'betting_opens_at', 'betting_closes_at', 'betting_open', 'time_to_close',
+        'total_bets', 'pending_bets', 'total_stake_amount', 'pending_stake'
+    )
+    
+    @classmethod
+    def rows(cls, queryset):
+        """Rows for a queryset annotated by with_pending_totals and with_betting_window"""
+        return queryset.values(*cls.VALUES, game_name=F('game_type__name'))
+    
+    def to_representation(self, row):
+        tz = timezone.get_current_timezone()
+        return {
+            'id': row['id'],
+            'game_type': row['game_type'],
+            'game_name': row['game_name'],
+            'draw_number': row['draw_number'],
+            'draw_date': row['draw_date'].isoformat(),
+            'draw_time': row['draw_time'].isoformat(),
+            'status': row['status'],
+            'betting_opens_at': format_datetime(row['betting_opens_at'], tz),
+            'betting_closes_at': format_datetime(row['betting_closes_at'], tz),
+            'is_betting_open': row['betting_open'],
+            'time_until_close': format_time_until_close(row['time_to_close']) if row['status'] == 'open' else None,
+            'total_bets': row['total_bets'] + row['pending_bets'],
+            'total_stake_amount': f"{row['total_stake_amount'] + row['pending_stake']:.2f}",
+        }
     
 class DrawDetailSerializer(DrawListSerializer):
     """Detailed view of a draw including results"""
@@ -135,8 +209,51 @@ class DrawDetailSerializer(DrawListSerializer):
             'total_payout_amount', 'created_at', 'updated_at'
         ]
 # BET SERIALIZERS
-class PlaceBetSerializer(serializers.ModelSerializer):
-    """Serializer for placing a new bet"""
+BET_SLIP_MAX_BETS = 100
+
+
+def validate_bet_selection(draw, bet_type, selected_numbers, stake_amount):
+    """Check one selection against its draw and bet type; returns an error dict or None"""
+    if not draw.is_betting_open():
+        return {"draw_id": "Betting is closed for this draw"}
+    
+    # Validate number count
+    numbers_count = len(selected_numbers)
+    if numbers_count < bet_type.min_numbers_required:
+        return {"selected_numbers": f"Minimum {bet_type.min_numbers_required} numbers required"}
+    if numbers_count > bet_type.max_numbers_allowed:
+        return {"selected_numbers": f"Maximum {bet_type.max_numbers_allowed} numbers allowed"}
+    
+    # Validate numbers are within game range
+    game = draw.game_type
+    for num in selected_numbers:
+        if num < game.number_range_start or num > game.number_range_end:
+            return {
+                "selected_numbers": f"Numbers must be between {game.number_range_start} and {game.number_range_end}"
+            }
+    
+    # Check for duplicate numbers
+    if numbers_count != len(set(selected_numbers)):
+        return {"selected_numbers": "Duplicate numbers are not allowed"}
+    
+    # Validate stake amount
+    if stake_amount < game.min_stake:
+        return {"stake_amount": f"Minimum stake is GH₵{game.min_stake}"}
+    if stake_amount > game.max_stake:
+        return {"stake_amount": f"Maximum stake is GH₵{game.max_stake}"}
+    
+    return None
+
+
+def insufficient_balance_error(user):
+    """ValidationError for a refused stake, quoting the balance from the ledger"""
+    return serializers.ValidationError({
+        "stake_amount": f"Insufficient balance. Your balance: GH₵{BalanceService.current_balance(user.pk)}"
+    })
+
+
+class BetSlipItemSerializer(serializers.Serializer):
+    """A single bet selection"""
     
     draw_id = serializers.IntegerField()
     bet_type_id = serializers.IntegerField()
@@ -150,68 +267,33 @@ class PlaceBetSerializer(serializers.ModelSerializer):
         decimal_places=2,
         min_value=Decimal('0.01')
     )
+
+
+class PlaceBetSerializer(BetSlipItemSerializer):
+    """Serializer for placing a new bet"""
     
     def validate(self, attrs):
-        # Validate draw exists and is open
+        # Validate draw exists
         try:
-            draw = Draw.objects.get(id=attrs['draw_id'])
+            draw = Draw.objects.select_related('game_type').get(id=attrs['draw_id'])
         except Draw.DoesNotExist:
             raise serializers.ValidationError({"draw_id": "Draw not found"})
         
-        if not draw.is_betting_open():
-            raise serializers.ValidationError({"draw_id": "Betting is closed for this draw"})
-        
         # Validate bet type
         try:
             bet_type = BetType.objects.get(id=attrs['bet_type_id'])
         except BetType.DoesNotExist:
             raise serializers.ValidationError({"bet_type_id": "Bet type not found"})
         
-        # Validate number count
-        numbers_count = len(attrs['selected_numbers'])
-        if numbers_count < bet_type.min_numbers_required:
-            raise serializers.ValidationError({
-                "selected_numbers": f"Minimum {bet_type.min_numbers_required} numbers required"
-            })
-        if numbers_count > bet_type.max_numbers_allowed:
-            raise serializers.ValidationError({
-                "selected_numbers": f"Maximum {bet_type.max_numbers_allowed} numbers allowed"
-            })
-        
-        # Validate numbers are within game range
-        game = draw.game_type
-        for num in attrs['selected_numbers']:
-            if num < game.number_range_start or num > game.number_range_end:
-                raise serializers.ValidationError({
-                    "selected_numbers": f"Numbers must be between {game.number_range_start} and {game.number_range_end}"
-                })
-        
-        # Check for duplicate numbers
-        if len(attrs['selected_numbers']) != len(set(attrs['selected_numbers'])):
-            raise serializers.ValidationError({
-                "selected_numbers": "Duplicate numbers are not allowed"
-            })
-        
-        # Validate stake amount
-        if attrs['stake_amount'] < game.min_stake:
-            raise serializers.ValidationError({
-                "stake_amount": f"Minimum stake is GH₵{game.min_stake}"
-            })
-        if attrs['stake_amount'] > game.max_stake:
-            raise serializers.ValidationError({
-                "stake_amount": f"Maximum stake is GH₵{game.max_stake}"
-            })
-        
-        # Check user has sufficient balance
-        user = self.context['request'].user
-        if user.account_balance < attrs['stake_amount']:
-            raise serializers.ValidationError({
-                "stake_amount": f"Insufficient balance. Your balance: GH₵{user.account_balance}"
-            })
+        error = validate_bet_selection(
+            draw, bet_type, attrs['selected_numbers'], attrs['stake_amount']
+        )
+        if error:
+            raise serializers.ValidationError(error)
         
         attrs['draw'] = draw
         attrs['bet_type'] = bet_type
-        attrs['game'] = game
+        attrs['game'] = draw.game_type
         
         return attrs
     
@@ -222,52 +304,157 @@ class PlaceBetSerializer(serializers.ModelSerializer):
         stake_amount = validated_data['stake_amount']
         selected_numbers = validated_data['selected_numbers']
         
-        # Create bet
-        bet = Bet.objects.create(
-            user=user,
-            draw=draw,
-            bet_type=bet_type,
-            bet_number=generate_bet_number(),
-            selected_numbers=selected_numbers,
-            stake_amount=stake_amount,
-            status='active'
+        # Calculate potential winnings from the compiled payout table
+        multiplier = get_payout_table().potential_multiplier(
+            draw.game_type_id, bet_type.id, len(selected_numbers)
         )
         
-        # Calculate potential winnings
-        bet.calculate_potential_winnings()
-        
-        # Deduct stake from user balance
-        user.account_balance -= stake_amount
-        user.save()
+        with transaction.atomic():
+            # Create bet
+            bet = Bet.objects.create(
+                user=user,
+                draw=draw,
+                bet_type=bet_type,
+                bet_number=generate_bet_number(),
+                selected_numbers=selected_numbers,
+                stake_amount=stake_amount,
+                potential_winnings=stake_amount * multiplier,
+                status='active'
+            )
+            
+            # Send notification
+            Notification.objects.create(
+                user=user,
+                game_type=draw.game_type,
+                bet=bet,
+                notification_type='game_update',
+                title='Bet Placed Successfully',
+                message=f'Your bet {bet.bet_number} for {draw.game_type.name} has been placed. Good luck!'
+            )
+            
+            # Deduct stake with one ledger entry; the debit lock is taken
+            # last so it is held only until the commit below
+            try:
+                debit = BalanceService.debit(
+                    user.pk, stake_amount,
+                    reference=f"STAKE-{bet.bet_number}",
+                    description=f"Stake for bet {bet.bet_number}",
+                    bet=bet
+                )
+            except InsufficientBalance:
+                raise insufficient_balance_error(user)
+            
+            # Update draw and user statistics
+            record_draw_bets({draw.pk: (1, stake_amount)})
+            record_bets_placed(user.pk, 1, stake_amount)
         
-        # Create transaction record
-        BetTransaction.objects.create(
-            bet=bet,
-            user=user,
-            transaction_type='stake',
-            amount=stake_amount,
-            balance_before=user.account_balance + stake_amount,
-            balance_after=user.account_balance,
-            reference=generate_transaction_reference(),
-            description=f"Stake for bet {bet.bet_number}"
+        user.account_balance = debit.balance_after
+        return bet
+
+
+class BetSlipSerializer(serializers.Serializer):
+    """
+    Place several bets in one request. The slip is all-or-nothing: every
+    bet is validated up front, the total stake is debited once and the rows
+    are bulk-inserted in a single transaction.
+    """
+    
+    bets = serializers.ListField(
+        child=BetSlipItemSerializer(),
+        min_length=1,
+        max_length=BET_SLIP_MAX_BETS
+    )
+    
+    def validate(self, attrs):
+        items = attrs['bets']
+        draws = Draw.objects.select_related('game_type').in_bulk(
+            {item['draw_id'] for item in items}
         )
+        bet_types = get_payout_table().bet_types
         
-        # Update draw statistics
-        draw.total_bets += 1
-        draw.total_stake_amount += stake_amount
-        draw.save()
+        errors = []
+        for item in items:
+            draw = draws.get(item['draw_id'])
+            bet_type = bet_types.get(item['bet_type_id'])
+            if draw is None:
+                error = {"draw_id": "Draw not found"}
+            elif bet_type is None:
+                error = {"bet_type_id": "Bet type not found"}
+            else:
+                error = validate_bet_selection(
+                    draw, bet_type, item['selected_numbers'], item['stake_amount']
+                )
+                item['draw'] = draw
+                item['bet_type'] = bet_type
+            errors.append(error or {})
         
-        # Send notification
-        Notification.objects.create(
-            user=user,
-            game_type=draw.game_type,
-            bet=bet,
-            notification_type='game_update',
-            title='Bet Placed Successfully',
-            message=f'Your bet {bet.bet_number} for {draw.game_type.name} has been placed. Good luck!'
-        )
+        if any(errors):
+            raise serializers.ValidationError({"bets": errors})
         
-        return bet
+        # Funds are checked by the locked ledger debit in create()
+        attrs['total_stake'] = sum(item['stake_amount'] for item in items)
+        return attrs
+    
+    def create(self, validated_data):
+        user = self.context['request'].user
+        items = validated_data['bets']
+        total_stake = validated_data['total_stake']
+        payouts = get_payout_table()
+        
+        bet_numbers = generate_bet_numbers(len(items))
+        bets = [
+            Bet(
+                user=user,
+                draw=item['draw'],
+                bet_type=item['bet_type'],
+                bet_number=bet_number,
+                selected_numbers=item['selected_numbers'],
+                stake_amount=item['stake_amount'],
+                potential_winnings=item['stake_amount'] * payouts.potential_multiplier(
+                    item['draw'].game_type_id, item['bet_type'].id, len(item['selected_numbers'])
+                ),
+                status='active'
+            )
+            for item, bet_number in zip(items, bet_numbers)
+        ]
+        
+        with transaction.atomic():
+            Bet.objects.bulk_create(bets)
+            
+            Notification.objects.bulk_create([
+                Notification(
+                    user=user,
+                    game_type=bet.draw.game_type,
+                    bet=bet,
+                    notification_type='game_update',
+                    title='Bet Placed Successfully',
+                    message=f'Your bet {bet.bet_number} for {bet.draw.game_type.name} has been placed. Good luck!'
+                )
+                for bet in bets
+            ])
+            
+            # One ledger entry for the whole slip, taken after the inserts
+            try:
+                debit = BalanceService.debit(
+                    user.pk, total_stake,
+                    reference=f"STAKE-{bets[0].bet_number}",
+                    description=f"Stake for {len(bets)} bets",
+                    metadata={'bets': [bet.bet_number for bet in bets]}
+                )
+            except InsufficientBalance:
+                raise insufficient_balance_error(user)
+            
+            # Update draw and user statistics
+            draw_totals = {}
+            for bet in bets:
+                count, stake = draw_totals.get(bet.draw_id, (0, Decimal('0.00')))
+                draw_totals[bet.draw_id] = (count + 1, stake + bet.stake_amount)
+            record_draw_bets(draw_totals)
+            record_bets_placed(user.pk, len(bets), total_stake)
+            transaction.on_commit(lambda: add_unread([user.pk], len(bets)))
+        
+        user.account_balance = debit.balance_after
+        return bets
 
 class BetSerializer(serializers.ModelSerializer):
     """Serializer for bet list - FIXED VERSION"""
@@ -317,6 +504,59 @@ class BetSerializer(serializers.ModelSerializer):
             return None
 
 
+def decimal_formatter(model_field):
+    """Render a model DecimalField's values as DRF's DecimalField does"""
+    quantum = Decimal(1).scaleb(-model_field.decimal_places)
+    context = Context(prec=model_field.max_digits, rounding=ROUND_HALF_EVEN)
+    
+    def format_decimal(value):
+        return None if value is None else f"{value.quantize(quantum, context=context):f}"
+    return format_decimal
+
+
+class BetRowSerializer(serializers.BaseSerializer):
+    """
+    BetSerializer's output built directly from values() rows
+    Used for bet list pages, where related-object access dominates the cost
+    """
+    
+    VALUES = (
+        'id', 'bet_number', 'selected_numbers', 'stake_amount', 'potential_winnings',
+        'actual_winnings', 'status', 'placed_at', 'processed_at'
+    )
+    format_stake = staticmethod(decimal_formatter(Bet._meta.get_field('stake_amount')))
+    format_winnings = staticmethod(decimal_formatter(Bet._meta.get_field('potential_winnings')))
+    
+    @classmethod
+    def rows(cls, queryset):
+        return queryset.values(
+            *cls.VALUES,
+            game_name=F('draw__game_type__name'),
+            bet_type_name=F('bet_type__display_name'),
+            draw_number=F('draw__draw_number'),
+            draw_date=F('draw__draw_date'),
+        )
+    
+    def to_representation(self, row):
+        tz = timezone.get_current_timezone()
+        draw_date = row['draw_date']
+        return {
+            'id': row['id'],
+            'bet_number': row['bet_number'],
+            'game_name': row['game_name'],
+            'bet_type_name': row['bet_type_name'],
+            'draw_number': row['draw_number'],
+            'draw_date': draw_date.isoformat() if draw_date is not None else None,
+            'selected_numbers': row['selected_numbers'],
+            'stake_amount': self.format_stake(row['stake_amount']),
+            'potential_winnings': self.format_winnings(row['potential_winnings']),
+            'actual_winnings': self.format_winnings(row['actual_winnings']),
+            'status': row['status'],
+            'placed_at': format_datetime(row['placed_at'], tz),
+            'processed_at': format_datetime(row['processed_at'], tz),
+        }
+
+
 
 class BetDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for single bet retrieval"""
@@ -411,6 +651,29 @@ class NotificationSerializer(serializers.ModelSerializer):
             'game_name', 'is_read', 'created_at', 'read_at'
         ]
         read_only_fields = ['id', 'created_at']
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        
+        # Broadcast rows take their text from the shared event
+        event = instance.event
+        if event is None:
+            return data
+        
+        rendered = {
+            'notification_type': event.notification_type,
+            'title': event.title,
+            'message': event.message,
+        }
+        if event.game_type is not None:
+            rendered['game_name'] = event.game_type.name
+        
+        # Keep the declared field order so output matches per-row notifications
+        data.update(rendered)
+        for name in self.fields:
+            if name in data:
+                data.move_to_end(name)
+        return data
 
 # STATISTICS SERIALIZERS
 
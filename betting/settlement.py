@@ -0,0 +1,246 @@
+"""
+Bulk settlement engine for completed draws.
+
+Bets are loaded in id-ordered chunks, scored against the draw's winning
+numbers using integer bitsets over the game's number range (1..90), and
+written back with bulk_update/bulk_create in one short transaction per chunk.
+The scoring rules are the ones Bet.check_win has always applied.
+"""
+from decimal import Decimal
+
+from math import ceil
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from users.services import BalanceService
+from .models import Bet, Draw
+from .payouts import get_payout_table
+from .stats import record_bets_settled
+
+
+SETTLEMENT_CHUNK_SIZE = 2000
+SETTLEMENT_SHARD_SIZE = 50000
+
+# Position-based rule: the single selected number must be the first drawn
+DIRECT_ONE_MULTIPLIER = Decimal('40.00')
+
+# bet type name -> (numbers selected, minimum winning numbers, multiplier)
+DIRECT_RULES = {
+    'direct_two': (2, 2, Decimal('240.00')),
+    'direct_three': (3, 3, Decimal('2100.00')),
+    'direct_four': (4, 4, Decimal('6000.00')),
+    'direct_five': (5, 4, Decimal('44000.00')),
+}
+
+# bet type name -> (numbers that must match, multiplier)
+PERM_RULES = {
+    'perm_two': (2, Decimal('240.00')),
+    'perm_three': (3, Decimal('2100.00')),
+}
+
+AGAINST_MULTIPLIER = Decimal('10.00')
+BANKER_MULTIPLIER = Decimal('100.00')
+NO_MULTIPLIER = Decimal('0.00')
+
+
+def number_mask(numbers):
+    """Pack a list of lotto numbers into an integer bitset"""
+    mask = 0
+    for number in numbers:
+        mask |= 1 << number
+    return mask
+
+
+class DrawScorer:
+    """Scores bets for one draw against its winning numbers"""
+
+    def __init__(self, draw, payout_table=None):
+        self.draw = draw
+        self.winning_numbers = list(draw.winning_numbers or [])
+        self.winning_mask = number_mask(self.winning_numbers)
+        self.payouts = payout_table or get_payout_table()
+        self.bet_types = self.payouts.bet_types
+
+    def score(self, bet_type, selected):
+        """Return (won, numbers_matched, payout_multiplier) for a selection"""
+        winning = self.winning_numbers
+        name = bet_type.name
+        matched = (number_mask(selected) & self.winning_mask).bit_count()
+
+        if name == 'direct_one':
+            if len(selected) == 1 and len(winning) >= 1:
+                won = selected[0] == winning[0]
+                return won, int(won), DIRECT_ONE_MULTIPLIER if won else NO_MULTIPLIER
+            return False, 0, NO_MULTIPLIER
+
+        if name in DIRECT_RULES:
+            count, min_winning, multiplier = DIRECT_RULES[name]
+            if len(selected) == count and len(winning) >= min_winning:
+                won = matched == count
+                return won, matched, multiplier if won else NO_MULTIPLIER
+            return False, 0, NO_MULTIPLIER
+
+        if name.startswith('perm'):
+            if name in PERM_RULES:
+                required, multiplier = PERM_RULES[name]
+                won = matched >= required
+                return won, matched, multiplier if won else NO_MULTIPLIER
+            return matched >= bet_type.min_numbers_required, matched, NO_MULTIPLIER
+
+        if name == 'against':
+            won = matched == 0
+            return won, 0, AGAINST_MULTIPLIER if won else NO_MULTIPLIER
+
+        if name == 'banker':
+            won = matched >= bet_type.min_numbers_required
+            return won, matched, BANKER_MULTIPLIER if won else NO_MULTIPLIER
+
+        return matched >= bet_type.min_numbers_required, matched, NO_MULTIPLIER
+
+    def payout(self, bet, bet_type, numbers_matched, multiplier):
+        """Winnings for a winning bet, falling back to GameOdds then base odds"""
+        if multiplier > 0:
+            return bet.stake_amount * multiplier
+
+        return bet.stake_amount * self.payouts.payout_multiplier(
+            self.draw.game_type_id, bet_type.id,
+            len(bet.selected_numbers), numbers_matched
+        )
+
+
+def _credit_winners(winners):
+    """Credit winnings to account balances, one ledger entry per winning bet"""
+    BalanceService.bulk_credit([
+        (
+            bet.user_id, bet.actual_winnings, f"WIN-{bet.bet_number}",
+            {'bet_id': bet.pk, 'description': f"Winnings for bet {bet.bet_number}"}
+        )
+        for bet in winners if bet.actual_winnings > 0
+    ], transaction_type='winnings')
+
+
+def settle_bets(draw, bets, scorer=None):
+    """
+    Score and persist a batch of active bets for a completed draw.
+    Must be given bets that are still 'active'; returns (winners, payout).
+    Draw totals are left alone, so parallel shards never queue on the draw
+    row; call finalize_draw_totals() once the bets are settled.
+    """
+    if not draw.winning_numbers or not bets:
+        return 0, Decimal('0.00')
+
+    scorer = scorer or DrawScorer(draw)
+    now = timezone.now()
+    winners = []
+    total_payout = Decimal('0.00')
+
+    for bet in bets:
+        bet_type = scorer.bet_types.get(bet.bet_type_id) or bet.bet_type
+        won, numbers_matched, multiplier = scorer.score(bet_type, bet.selected_numbers)
+
+        if won:
+            bet.status = 'won'
+            bet.actual_winnings = scorer.payout(bet, bet_type, numbers_matched, multiplier)
+            total_payout += bet.actual_winnings
+            winners.append(bet)
+        else:
+            bet.status = 'lost'
+            bet.actual_winnings = Decimal('0.00')
+        bet.processed_at = now
+
+    with transaction.atomic():
+        Bet.objects.bulk_update(bets, ['status', 'actual_winnings', 'processed_at'])
+        if winners:
+            _credit_winners(winners)
+        record_bets_settled(bets)
+
+    return len(winners), total_payout
+
+
+def settle_draw(draw, chunk_size=SETTLEMENT_CHUNK_SIZE, min_id=None, max_id=None):
+    """
+    Settle every active bet on a completed draw, chunk by chunk.
+    min_id/max_id restrict the run to one shard of the draw's bets.
+    Safe to re-run: only bets still 'active' are picked up.
+    """
+    scorer = DrawScorer(draw)
+    checked = 0
+    winners = 0
+    total_payout = Decimal('0.00')
+    last_id = min_id - 1 if min_id is not None else 0
+
+    bets = Bet.objects.filter(draw=draw, status='active')
+    if max_id is not None:
+        bets = bets.filter(id__lte=max_id)
+
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                bets.select_for_update()
+                .filter(id__gt=last_id)
+                .only('id', 'user_id', 'bet_type_id', 'bet_number',
+                      'selected_numbers', 'stake_amount', 'status')
+                .order_by('id')[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            chunk_winners, chunk_payout = settle_bets(draw, chunk, scorer)
+
+        checked += len(chunk)
+        winners += chunk_winners
+        total_payout += chunk_payout
+        last_id = chunk[-1].id
+
+    return {
+        'checked': checked,
+        'winners': winners,
+        'total_payout': total_payout,
+    }
+
+
+def plan_shards(draw, shard_size=SETTLEMENT_SHARD_SIZE):
+    """Split a draw's active bets into contiguous (min_id, max_id) ranges"""
+    bounds = Bet.objects.filter(draw=draw, status='active').aggregate(
+        count=Count('id'), min_id=Min('id'), max_id=Max('id')
+    )
+    if not bounds['count']:
+        return []
+
+    shard_count = ceil(bounds['count'] / shard_size)
+    width = ceil((bounds['max_id'] - bounds['min_id'] + 1) / shard_count)
+    return [
+        (start, min(start + width - 1, bounds['max_id']))
+        for start in range(bounds['min_id'], bounds['max_id'] + 1, width)
+    ]
+
+
+def finalize_draw_totals(draw):
+    """
+    Recompute a draw's winner count and payout total from its settled bets.
+    Run once all shards are done; exact even if a shard was retried.
+    """
+    totals = Bet.objects.filter(draw=draw, status__in=['won', 'paid']).aggregate(
+        winners=Count('id'), total_payout=Sum('actual_winnings')
+    )
+    winners = totals['winners']
+    total_payout = totals['total_payout'] or Decimal('0.00')
+
+    Draw.objects.filter(pk=draw.pk).update(
+        total_winners=winners,
+        total_payout_amount=total_payout
+    )
+    return {'winners': winners, 'total_payout': total_payout}
+
+
+def run_shards_locally(draw, shards, chunk_size=SETTLEMENT_CHUNK_SIZE):
+    """Settle shards one after another in this process (no Celery/Redis needed)"""
+    checked = 0
+    for min_id, max_id in shards:
+        checked += settle_draw(draw, chunk_size, min_id, max_id)['checked']
+
+    totals = finalize_draw_totals(draw)
+    totals['checked'] = checked
+    return totals
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .models import BetType, GameOdds, GameType, Notification
+from .payouts import invalidate_payout_table
+from .unread import add_unread
+
+
+@receiver([post_save, post_delete], sender=GameOdds)
+@receiver([post_save, post_delete], sender=BetType)
+def invalidate_odds(sender, **kwargs):
+    """Rebuild the payout table once an odds edit is committed"""
+    transaction.on_commit(invalidate_payout_table)
+
+
+@receiver([post_save, post_delete], sender=GameType)
+@receiver([post_save, post_delete], sender=GameOdds)
+@receiver([post_save, post_delete], sender=BetType)
+def invalidate_game_catalog(sender, **kwargs):
+    """Reserialize the game catalog once a catalog edit is committed"""
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=Notification)
+def count_unread(sender, instance, created, **kwargs):
+    """Bump the recipient's unread counter once the notification is committed"""
+    if created and not instance.is_read:
+        transaction.on_commit(lambda: add_unread([instance.user_id]))
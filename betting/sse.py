@@ -0,0 +1,85 @@
+"""
+Server-sent events stream of draw state changes: GET /api/draws/stream/
+
+A plain ASGI app mounted in front of Django (see NLA/asgi.py), so an idle
+connection costs one coroutine and a small queue rather than a thread or a
+pass through the middleware stack. Optional ?game_type=<id> filters events.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+from .events import hub
+
+STREAM_PATH = '/api/draws/stream/'
+RETRY_MILLISECONDS = 3000
+
+
+def _headers():
+    headers = [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]
+    if getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False):
+        headers.append((b'access-control-allow-origin', b'*'))
+    return headers
+
+
+async def _respond(send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(body).encode()})
+
+
+async def draw_stream(scope, receive, send):
+    if scope['method'] != 'GET':
+        await _respond(send, 405, {'detail': f'Method "{scope["method"]}" not allowed.'})
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    game_type = None
+    if 'game_type' in query:
+        try:
+            game_type = int(query['game_type'][0])
+        except ValueError:
+            await _respond(send, 400, {'game_type': 'Must be an integer'})
+            return
+
+    queue = hub.subscribe()
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': _headers()})
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {RETRY_MILLISECONDS}\n\n'.encode(),
+            'more_body': True,
+        })
+
+        pump = asyncio.ensure_future(_pump(queue, send, game_type))
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        done, pending = await asyncio.wait({pump, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+    finally:
+        hub.unsubscribe(queue)
+
+
+async def _pump(queue, send, game_type):
+    while True:
+        event_game_type, frame = await queue.get()
+        # Heartbeats carry no game type and go to everyone
+        if game_type is not None and event_game_type not in (None, game_type):
+            continue
+        await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
@@ -0,0 +1,139 @@
+"""
+Incremental per-user betting statistics.
+
+UserStatistics rows are adjusted inside the same transaction that places,
+settles or cancels bets, so reads are a single primary-key lookup.
+rebuild_user_statistics() recomputes rows from the bets table and is used by
+the rebuild_user_statistics command and as a fallback for users whose row is
+missing.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Bet, UserStatistics
+
+
+WINNING_STATUSES = ['won', 'paid']
+STATISTICS_FIELDS = ['total_bets', 'total_staked', 'total_won', 'total_winnings', 'active_bets']
+
+
+def record_bets_placed(user_id, count, stake):
+    """Count newly placed active bets; call inside the placement transaction"""
+    updated = UserStatistics.objects.filter(pk=user_id).update(
+        total_bets=F('total_bets') + count,
+        total_staked=F('total_staked') + stake,
+        active_bets=F('active_bets') + count,
+        updated_at=timezone.now()
+    )
+    if updated:
+        return
+
+    # First bet for this user (or a row lost to a reset): build it from the
+    # bets table, which already includes the bets just inserted
+    try:
+        with transaction.atomic():
+            UserStatistics.objects.create(user_id=user_id, **user_totals(user_id))
+    except IntegrityError:
+        # Created concurrently; that row predates our bets, so apply them now
+        record_bets_placed(user_id, count, stake)
+
+
+def record_bets_settled(bets):
+    """
+    Move settled bets out of the active count and add their winnings.
+    Takes bets whose status was just changed from 'active'.
+    """
+    deltas = {}
+    for bet in bets:
+        delta = deltas.setdefault(bet.user_id, {
+            'active_bets': 0, 'total_won': 0, 'total_winnings': Decimal('0.00')
+        })
+        delta['active_bets'] -= 1
+        if bet.status in WINNING_STATUSES:
+            delta['total_won'] += 1
+            delta['total_winnings'] += bet.actual_winnings
+    _apply(deltas)
+
+
+def record_bets_cancelled(bets):
+    """Drop cancelled bets from the active count"""
+    deltas = {}
+    for bet in bets:
+        delta = deltas.setdefault(bet.user_id, {'active_bets': 0})
+        delta['active_bets'] -= 1
+    _apply(deltas)
+
+
+def _apply(deltas):
+    """Add each user's field deltas to their locked statistics row"""
+    if not deltas:
+        return
+
+    rows = UserStatistics.objects.select_for_update().in_bulk(sorted(deltas))
+    now = timezone.now()
+    for user_id, row in rows.items():
+        for field, change in deltas[user_id].items():
+            setattr(row, field, getattr(row, field) + change)
+        row.updated_at = now
+    UserStatistics.objects.bulk_update(rows.values(), STATISTICS_FIELDS + ['updated_at'])
+
+    missing = [user_id for user_id in deltas if user_id not in rows]
+    if missing:
+        rebuild_user_statistics(missing)
+
+
+def _empty_totals():
+    return {
+        'total_bets': 0,
+        'total_staked': Decimal('0.00'),
+        'total_won': 0,
+        'total_winnings': Decimal('0.00'),
+        'active_bets': 0,
+    }
+
+
+def _totals_query(user_ids):
+    return Bet.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        total_bets=Count('id'),
+        total_staked=Coalesce(Sum('stake_amount'), Decimal('0.00')),
+        total_won=Count('id', filter=Q(status__in=WINNING_STATUSES)),
+        total_winnings=Coalesce(
+            Sum('actual_winnings', filter=Q(status__in=WINNING_STATUSES)), Decimal('0.00')
+        ),
+        active_bets=Count('id', filter=Q(status='active')),
+    ).order_by()
+
+
+def user_totals(user_id):
+    """Statistics for one user computed from the bets table"""
+    for row in _totals_query([user_id]):
+        row.pop('user_id')
+        return row
+    return _empty_totals()
+
+
+def rebuild_user_statistics(user_ids):
+    """Recompute statistics rows for the given users from their bets"""
+    user_ids = sorted(user_ids)
+    with transaction.atomic():
+        # Placement, settlement and cancellation apply their deltas under
+        # these row locks, so none can land between the recount and the write
+        list(UserStatistics.objects.select_for_update().filter(pk__in=user_ids).values_list('pk', flat=True))
+
+        totals = {row.pop('user_id'): row for row in _totals_query(user_ids)}
+        now = timezone.now()
+        rows = [
+            UserStatistics(user_id=user_id, updated_at=now, **totals.get(user_id, _empty_totals()))
+            for user_id in user_ids
+        ]
+        UserStatistics.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=STATISTICS_FIELDS + ['updated_at']
+        )
+    return len(rows)
@@ -1,13 +1,26 @@
-from celery import shared_task
+from celery import chord, group, shared_task
 from celery.utils.log import get_task_logger
 from django.utils import timezone
 from django.db.models import Q, Count, Sum
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import DatabaseError
+from django.core.cache import cache
+from datetime import timedelta
 from decimal import Decimal
 import json
 
-from .models import Draw, Bet, GameType, UserSubscription, Notification
+from .counters import fold_draw_counters as fold_draw_counter_deltas
+from .draw_calendar import generate_draws
+from .models import Draw, Bet, GameType, UserSubscription, Notification, UserStatistics
+from .events import publish_draw_event
+from .schedule import transition_draws, wakeup_due
+from .notifications import bettor_ids, fan_out, subscriber_ids
+from .stats import rebuild_user_statistics
+from .unread import reconcile_unread_counts
+from .settlement import (
+    finalize_draw_totals, plan_shards, run_shards_locally, settle_draw
+)
 from users.models import User
 
 logger = get_task_logger(__name__)
@@ -15,50 +28,55 @@ logger = get_task_logger(__name__)
 @shared_task
 def check_draw_status():
     """
-    Check and update draw statuses automatically
-    Runs every minute
+    Open and close draws whose betting window boundary has passed
+    Runs from beat as a safety net and is re-armed for the next boundary
     """
     logger.info("Checking draw statuses...")
     
     now = timezone.now()
-    updated_count = 0
     
-    # Check for draws that should open betting
-    scheduled_draws = Draw.objects.filter(
-        status='scheduled',
-        betting_opens_at__lte=now
-    )
+    # Guarded set-based transitions: only rows that actually changed come back
+    opened = transition_draws('scheduled', 'open', 'betting_opens_at', now)
+    closed = transition_draws('open', 'closed', 'betting_closes_at', now)
     
-    for draw in scheduled_draws:
-        draw.status = 'open'
-        draw.save()
-        updated_count += 1
-        logger.info(f"Draw {draw.draw_number} opened for betting")
-        
-        # Send notifications to subscribers
-        send_draw_opened_notification.delay(draw.id)
+    changed = Draw.objects.filter(id__in=opened + closed)
+    for draw in changed:
+        publish_draw_event(draw)
+        logger.info(f"Draw {draw.draw_number} {'opened for betting' if draw.status == 'open' else 'closed for betting'}")
     
-    # Check for draws that should close betting
-    open_draws = Draw.objects.filter(
-        status='open',
-        betting_closes_at__lte=now
-    )
+    # Notify subscribers and start the draw process 5 minutes after closing
+    follow_ups = [send_draw_opened_notification.s(draw_id) for draw_id in opened]
+    follow_ups += [process_draw_results.s(draw_id).set(countdown=300) for draw_id in closed]
+    if follow_ups:
+        group(follow_ups).apply_async()
     
-    for draw in open_draws:
-        draw.status = 'closed'
-        draw.save()
-        updated_count += 1
-        logger.info(f"Draw {draw.draw_number} closed for betting")
-        
-        # Start draw process after a short delay
-        process_draw_results.apply_async(
-            args=[draw.id], 
-            countdown=300  # 5 minutes after closing
-        )
+    schedule_draw_status_wakeup(now)
     
+    updated_count = len(opened) + len(closed)
     logger.info(f"Updated {updated_count} draw statuses")
     return f"Updated {updated_count} draw statuses"
 
+def schedule_draw_status_wakeup(now):
+    """Run check_draw_status exactly at the next boundary if it comes before the next beat run"""
+    wake_at = wakeup_due(now, timedelta(seconds=settings.DRAW_STATUS_POLL_SECONDS))
+    if wake_at is None:
+        return
+    
+    # One wakeup per boundary however many runs see it
+    if cache.add(f'betting:draw-status-wakeup:{wake_at.timestamp()}', True, settings.DRAW_STATUS_POLL_SECONDS * 2):
+        check_draw_status.apply_async(eta=wake_at)
+
+@shared_task
+def generate_draw_calendar(days=None):
+    """Keep the rolling horizon of future draws generated from every game type's schedule"""
+    now = timezone.now()
+    created = generate_draws(days=days, now=now)
+    if created:
+        schedule_draw_status_wakeup(now)
+    
+    logger.info(f"Generated {created} draws")
+    return f"Generated {created} draws"
+
 @shared_task
 def process_draw_results(draw_id):
     """
@@ -72,6 +90,7 @@ def process_draw_results(draw_id):
         # Simulate draw process
         draw.status = 'drawing'
         draw.save()
+        publish_draw_event(draw)
         
         # TODO: Integrate with actual draw system API
         # For now, generate random winning numbers
@@ -86,6 +105,7 @@ def process_draw_results(draw_id):
         draw.machine_number = f"M{random.randint(1000, 9999)}"
         draw.status = 'completed'
         draw.save()
+        publish_draw_event(draw)
         
         logger.info(f"Draw {draw.draw_number} completed. Winning numbers: {winning_numbers}")
         
@@ -105,6 +125,8 @@ def process_draw_results(draw_id):
 def check_bets_for_draw(draw_id):
     """
     Check all bets for a completed draw and determine winners
+    Bets are split into id-range shards settled in parallel by a chord,
+    then the draw totals are reduced once every shard has finished
     """
     try:
         draw = Draw.objects.get(id=draw_id)
@@ -113,26 +135,63 @@ def check_bets_for_draw(draw_id):
             logger.warning(f"Draw {draw.draw_number} not ready for bet checking")
             return f"Draw {draw.draw_number} not ready for bet checking"
         
-        active_bets = Bet.objects.filter(draw=draw, status='active')
-        total_bets = active_bets.count()
-        winners = 0
-        total_payout = Decimal('0.00')
+        shards = plan_shards(draw, settings.SETTLEMENT_SHARD_SIZE)
+        logger.info(f"Settling draw {draw.draw_number} in {len(shards)} shards")
         
-        logger.info(f"Checking {total_bets} bets for draw {draw.draw_number}")
+        if settings.SETTLEMENT_EXECUTOR == 'local':
+            result = run_shards_locally(draw, shards)
+            logger.info(f"Draw {draw.draw_number}: {result['winners']} winners, total payout: GH₵{result['total_payout']}")
+            return f"Checked {result['checked']} bets, {result['winners']} winners, GH₵{result['total_payout']} paid out"
         
-        for bet in active_bets:
-            won = bet.check_win()
-            if won:
-                winners += 1
-                total_payout += bet.actual_winnings
+        if not shards:
+            finalize_draw_settlement.delay([], draw_id)
+            return f"No active bets to check for draw {draw.draw_number}"
         
-        # Update draw statistics
-        draw.total_payout_amount = total_payout
-        draw.save()
+        chord(
+            settle_draw_shard.s(draw_id, min_id, max_id)
+            for min_id, max_id in shards
+        )(finalize_draw_settlement.s(draw_id))
+        
+        return f"Dispatched {len(shards)} settlement shards for draw {draw.draw_number}"
+        
+    except Draw.DoesNotExist:
+        logger.error(f"Draw with id {draw_id} not found")
+        return f"Draw with id {draw_id} not found"
+
+@shared_task(bind=True, acks_late=True, max_retries=3, default_retry_delay=30)
+def settle_draw_shard(self, draw_id, min_id, max_id):
+    """
+    Settle one id range of a draw's bets
+    Safe to retry: a re-run only picks up bets that are still active
+    """
+    draw = Draw.objects.get(id=draw_id)
+    
+    try:
+        result = settle_draw(draw, min_id=min_id, max_id=max_id)
+    except DatabaseError as exc:
+        raise self.retry(exc=exc)
+    
+    logger.info(f"Draw {draw.draw_number} shard {min_id}-{max_id}: {result['checked']} bets, {result['winners']} winners")
+    
+    return {
+        'checked': result['checked'],
+        'winners': result['winners'],
+        'total_payout': str(result['total_payout']),
+    }
+
+@shared_task
+def finalize_draw_settlement(shard_results, draw_id):
+    """
+    Reduce shard results into the draw's winner count and payout total
+    """
+    try:
+        draw = Draw.objects.get(id=draw_id)
+        checked = sum(result['checked'] for result in shard_results)
+        totals = finalize_draw_totals(draw)
         
-        logger.info(f"Draw {draw.draw_number}: {winners} winners, total payout: GH₵{total_payout}")
+        logger.info(f"Draw {draw.draw_number}: {totals['winners']} winners, total payout: GH₵{totals['total_payout']}")
         
-        return f"Checked {total_bets} bets, {winners} winners, GH₵{total_payout} paid out"
+        return f"Checked {checked} bets, {totals['winners']} winners, GH₵{totals['total_payout']} paid out"
         
     except Draw.DoesNotExist:
         logger.error(f"Draw with id {draw_id} not found")
@@ -172,26 +231,21 @@ def send_draw_opened_notification(draw_id):
     Send notifications when a draw opens for betting
     """
     try:
-        draw = Draw.objects.get(id=draw_id)
-        subscribers = UserSubscription.objects.filter(
-            game_type=draw.game_type,
-            is_active=True
-        ).select_related('user')
+        draw = Draw.objects.select_related('game_type').get(id=draw_id)
         
-        notification_count = 0
-        
-        for subscription in subscribers:
-            Notification.objects.create(
-                user=subscription.user,
-                game_type=draw.game_type,
-                notification_type='game_update',
-                title=f'{draw.game_type.name} - Betting Open',
-                message=f'Betting for {draw.draw_number} is now open! Closes at {draw.betting_closes_at.strftime("%H:%M")}'
-            )
-            notification_count += 1
+        stats = fan_out(
+            subscriber_ids(draw.game_type_id),
+            game_type=draw.game_type,
+            notification_type='game_update',
+            title=f'{draw.game_type.name} - Betting Open',
+            message=f'Betting for {draw.draw_number} is now open! Closes at {draw.betting_closes_at.strftime("%H:%M")}'
+        )
         
-        logger.info(f"Sent {notification_count} draw opened notifications")
-        return f"Sent {notification_count} draw opened notifications"
+        logger.info(
+            f"Sent {stats['rows']} draw opened notifications "
+            f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+        )
+        return f"Sent {stats['rows']} draw opened notifications"
         
     except Draw.DoesNotExist:
         logger.error(f"Draw with id {draw_id} not found")
@@ -203,27 +257,22 @@ def send_draw_results_notification(draw_id):
     Send notifications when draw results are published
     """
     try:
-        draw = Draw.objects.get(id=draw_id)
+        draw = Draw.objects.select_related('game_type').get(id=draw_id)
         
         # Notify all users who bet on this draw
-        users_with_bets = User.objects.filter(
-            bets__draw=draw
-        ).distinct()
-        
-        notification_count = 0
-        
-        for user in users_with_bets:
-            Notification.objects.create(
-                user=user,
-                game_type=draw.game_type,
-                notification_type='draw_result',
-                title=f'{draw.game_type.name} - Results Published',
-                message=f'Results for {draw.draw_number} are out! Winning numbers: {draw.winning_numbers}'
-            )
-            notification_count += 1
+        stats = fan_out(
+            bettor_ids(draw.id),
+            game_type=draw.game_type,
+            notification_type='draw_result',
+            title=f'{draw.game_type.name} - Results Published',
+            message=f'Results for {draw.draw_number} are out! Winning numbers: {draw.winning_numbers}'
+        )
         
-        logger.info(f"Sent {notification_count} draw results notifications")
-        return f"Sent {notification_count} draw results notifications"
+        logger.info(
+            f"Sent {stats['rows']} draw results notifications "
+            f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+        )
+        return f"Sent {stats['rows']} draw results notifications"
         
     except Draw.DoesNotExist:
         logger.error(f"Draw with id {draw_id} not found")
@@ -336,31 +385,22 @@ def cleanup_old_data():
 @shared_task
 def calculate_user_statistics(user_id):
     """
-    Calculate and cache user statistics
+    Recalculate a user's statistics row from their bets
     """
     try:
         user = User.objects.get(id=user_id)
         
-        bets = Bet.objects.filter(user=user)
-        total_bets = bets.count()
-        total_staked = bets.aggregate(Sum('stake_amount'))['stake_amount__sum'] or Decimal('0.00')
-        
-        won_bets = bets.filter(status='won')
-        total_won = won_bets.count()
-        total_winnings = won_bets.aggregate(Sum('actual_winnings'))['actual_winnings__sum'] or Decimal('0.00')
+        rebuild_user_statistics([user.id])
+        stats = UserStatistics.objects.get(pk=user.id)
         
-        win_rate = (total_won / total_bets * 100) if total_bets > 0 else Decimal('0.00')
-        active_bets = bets.filter(status='active').count()
-        
-        # Cache these statistics (you could store in user profile or cache)
         statistics = {
-            'total_bets': total_bets,
-            'total_staked': float(total_staked),
-            'total_won': total_won,
-            'total_winnings': float(total_winnings),
-            'win_rate': float(win_rate),
-            'active_bets': active_bets,
-            'calculated_at': timezone.now().isoformat()
+            'total_bets': stats.total_bets,
+            'total_staked': float(stats.total_staked),
+            'total_won': stats.total_won,
+            'total_winnings': float(stats.total_winnings),
+            'win_rate': float(stats.win_rate),
+            'active_bets': stats.active_bets,
+            'calculated_at': stats.updated_at.isoformat()
         }
         
         logger.info(f"Calculated statistics for user {user.username}")
@@ -396,4 +436,26 @@ def process_completed_draws():
             processed += 1
     
     logger.info(f"Processed {processed} draws")
-    return f"Processed {processed} draws"
\ No newline at end of file
+    return f"Processed {processed} draws"
+
+
+@shared_task
+def fold_draw_counters():
+    """
+    Fold buffered bet counter deltas into Draw totals
+    Runs every minute
+    """
+    folded = fold_draw_counter_deltas()
+    if folded:
+        logger.info(f"Folded {folded} draw counter deltas")
+    return f"Folded {folded} deltas"
+
+@shared_task
+def reconcile_unread_notifications():
+    """
+    Reset cached unread counters for users with recent notification changes
+    Runs every 10 minutes
+    """
+    checked = reconcile_unread_counts()
+    logger.info(f"Reconciled unread counters for {checked} users")
+    return f"Reconciled {checked} users"
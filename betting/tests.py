@@ -1,3 +1,628 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from users.models import User
+from users.services import BalanceService
+from wallet.models import WalletTransaction
+from .catalog import get_catalog
+from .counters import current_totals, fold_draw_counters
+from .draw_calendar import generate_draws, load_schedules, parse_draw_days
+from .events import DrawEventHub, _publish, draw_event, warn_if_events_stay_local
+from .models import (
+    Bet, BetType, Draw, DrawCounterDelta, GameOdds, GameType, Notification, NotificationEvent, UserStatistics,
+    UserSubscription
+)
+from .notifications import bettor_ids, fan_out, subscriber_ids
+from .pagination import BetKeysetPagination
+from .payouts import PayoutTable, get_payout_table
+from .schedule import next_transition_at, transition_draws
+from .serializers import BET_SLIP_MAX_BETS, BetSlipSerializer, PlaceBetSerializer
+from .settlement import DrawScorer, plan_shards, run_shards_locally, settle_draw
+from .stats import STATISTICS_FIELDS, rebuild_user_statistics, user_totals
+from .unread import add_unread, get_unread_count, reconcile_unread_counts, unread_key
+
+
+WINNING_NUMBERS = [10, 20, 30, 40, 50]
+
+# (bet type, min_numbers_required, selected, won, numbers_matched, multiplier)
+# Expected values are what Bet.check_win returned for the same bet before
+# scoring moved to DrawScorer.
+SCORING_CASES = [
+    ('direct_one', 1, [10], True, 1, '40.00'),
+    ('direct_one', 1, [20], False, 0, '0.00'),
+    ('direct_one', 1, [10, 20], False, 0, '0.00'),
+    ('direct_two', 2, [50, 10], True, 2, '240.00'),
+    ('direct_two', 2, [10, 11], False, 1, '0.00'),
+    ('direct_two', 2, [10, 20, 30], False, 0, '0.00'),
+    ('direct_three', 3, [10, 20, 30], True, 3, '2100.00'),
+    ('direct_three', 3, [10, 20, 31], False, 2, '0.00'),
+    ('direct_four', 4, [10, 20, 30, 40], True, 4, '6000.00'),
+    ('direct_four', 4, [10, 20, 30, 41], False, 3, '0.00'),
+    ('direct_five', 5, [50, 40, 30, 20, 10], True, 5, '44000.00'),
+    ('direct_five', 5, [10, 20, 30, 40, 51], False, 4, '0.00'),
+    ('perm_two', 2, [10, 20, 61, 62], True, 2, '240.00'),
+    ('perm_two', 2, [10, 61, 62], False, 1, '0.00'),
+    ('perm_three', 3, [10, 20, 30, 61], True, 3, '2100.00'),
+    ('perm_three', 3, [10, 20, 61, 62], False, 2, '0.00'),
+    ('perm_four', 4, [10, 20, 30, 40, 61], True, 4, '0.00'),
+    ('perm_four', 4, [10, 20, 30, 61, 62], False, 3, '0.00'),
+    ('against', 1, [1, 2, 3], True, 0, '10.00'),
+    ('against', 1, [1, 2, 10], False, 0, '0.00'),
+    ('banker', 1, [30], True, 1, '100.00'),
+    ('banker', 1, [31], False, 0, '0.00'),
+    ('lucky_pick', 2, [10, 20, 77], True, 2, '0.00'),
+    ('lucky_pick', 2, [10, 77], False, 1, '0.00'),
+]
+
+
+class DrawScorerTests(SimpleTestCase):
+    """DrawScorer must score every bet type exactly as Bet.check_win did"""
+
+    def make_scorer(self, odds=None, bet_types=None):
+        draw = SimpleNamespace(game_type_id=1, winning_numbers=WINNING_NUMBERS)
+        return DrawScorer(draw, PayoutTable(odds or {}, bet_types or {}))
+
+    def test_score_matches_check_win(self):
+        scorer = self.make_scorer()
+        for name, min_required, selected, won, matched, multiplier in SCORING_CASES:
+            with self.subTest(bet_type=name, selected=selected):
+                bet_type = SimpleNamespace(name=name, min_numbers_required=min_required)
+                self.assertEqual(
+                    scorer.score(bet_type, selected), (won, matched, Decimal(multiplier))
+                )
+
+    def test_payout_uses_rule_multiplier(self):
+        scorer = self.make_scorer()
+        bet = SimpleNamespace(stake_amount=Decimal('2.00'), selected_numbers=[30])
+        bet_type = SimpleNamespace(id=7)
+        self.assertEqual(scorer.payout(bet, bet_type, 1, Decimal('100.00')), Decimal('200.00'))
+
+    def test_payout_falls_back_to_game_odds_then_base_odds(self):
+        perm_four = SimpleNamespace(id=7, base_odds=Decimal('50.00'))
+        bet = SimpleNamespace(stake_amount=Decimal('2.00'), selected_numbers=[10, 20, 30, 40, 61])
+
+        scorer = self.make_scorer(odds={(1, 7, 5, 4): Decimal('900.00')}, bet_types={7: perm_four})
+        self.assertEqual(scorer.payout(bet, perm_four, 4, Decimal('0.00')), Decimal('1800.00'))
+
+        scorer = self.make_scorer(bet_types={7: perm_four})
+        self.assertEqual(scorer.payout(bet, perm_four, 4, Decimal('0.00')), Decimal('100.00'))
+
+
+class ProcessCacheTests(TestCase):
+
+    def test_payout_table_rebuilds_after_ttl(self):
+        # LocMem cannot carry version bumps between processes
+        with override_settings(LOCAL_CACHE_TTL_SECONDS=3600):
+            self.assertIs(get_payout_table(), get_payout_table())
+        with override_settings(LOCAL_CACHE_TTL_SECONDS=0):
+            self.assertIsNot(get_payout_table(), get_payout_table())
+
+    def test_catalog_rebuilds_after_ttl(self):
+        with override_settings(LOCAL_CACHE_TTL_SECONDS=3600):
+            self.assertIs(get_catalog(), get_catalog())
+        with override_settings(LOCAL_CACHE_TTL_SECONDS=0):
+            self.assertIsNot(get_catalog(), get_catalog())
+
+
+class KeysetCursorTests(TestCase):
+
+    def paginate(self, position):
+        paginator = BetKeysetPagination()
+        cursor = paginator.encode_cursor(position)
+        request = Request(APIRequestFactory().get('/bets/', {'cursor': cursor}))
+        return paginator.paginate_queryset(Bet.objects.all(), request)
+
+    def test_valid_cursor(self):
+        self.assertEqual(self.paginate([timezone.now().isoformat(), 10]), [])
+
+    def test_invalid_cursor_values_are_not_found(self):
+        now = timezone.now().isoformat()
+        for position in (['abc', 'x'], [now, 'x'], [{'a': 1}, 10], [now, [10]], [None, 10], [12, 10]):
+            with self.subTest(position=position), self.assertRaises(NotFound):
+                self.paginate(position)
+
+
+class BettingFixtures:
+    """An open direct_one draw and a punter holding GH₵10.00"""
+
+    def setUp(self):
+        cache.clear()
+        self.game_type = GameType.objects.create(
+            name='Test 5/90', code='TEST', category='other_games', description='Test game',
+            min_stake=Decimal('1.00'), max_stake=Decimal('100.00'), draw_time=time(hour=12), draw_days='Daily'
+        )
+        # Runs the payout table invalidation queued for commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bet_type = BetType.objects.create(
+                name='direct_one', display_name='Direct One', description='Direct One',
+                base_odds=Decimal('40.00'), min_numbers_required=1, max_numbers_allowed=1
+            )
+        self.draw = self.open_draw('TEST-1')
+        self.user = User.objects.create_user(username='punter')
+        BalanceService.credit(self.user.pk, Decimal('10.00'), 'deposit')
+
+    def open_draw(self, draw_number):
+        now = timezone.now()
+        return Draw.objects.create(
+            game_type=self.game_type, draw_number=draw_number, draw_date=now.date(), draw_time=time(hour=12),
+            status='open', betting_opens_at=now - timedelta(hours=1), betting_closes_at=now + timedelta(hours=1)
+        )
+
+    def place(self, stake, number=7, draw=None):
+        serializer = PlaceBetSerializer(data={
+            'draw_id': (draw or self.draw).pk, 'bet_type_id': self.bet_type.pk,
+            'selected_numbers': [number], 'stake_amount': stake,
+        }, context={'request': SimpleNamespace(user=self.user)})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def balance(self):
+        return BalanceService.current_balance(self.user.pk)
+
+    def place_slip(self, stake, numbers, draw=None):
+        serializer = BetSlipSerializer(data={'bets': [
+            {'draw_id': (draw or self.draw).pk, 'bet_type_id': self.bet_type.pk,
+             'selected_numbers': [number], 'stake_amount': stake}
+            for number in numbers
+        ]}, context={'request': SimpleNamespace(user=self.user)})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def cancel(self, draw):
+        draw_admin = admin.site._registry[Draw]
+        with mock.patch.object(draw_admin, 'message_user'):
+            draw_admin.cancel_draw(None, Draw.objects.filter(pk=draw.pk))
+
+    def complete_draw(self, winning_numbers):
+        self.draw.status = 'completed'
+        self.draw.winning_numbers = winning_numbers
+        self.draw.save()
+
+
+class AccountLedgerTests(BettingFixtures, TestCase):
+    """Stakes, winnings and refunds all move money through BalanceService"""
+
+    def test_stake_is_one_debit(self):
+        bet = self.place('4.00')
+        entry = WalletTransaction.objects.get(reference=f'STAKE-{bet.bet_number}')
+        self.assertEqual((entry.transaction_type, entry.amount, entry.bet_id), ('stake', Decimal('4.00'), bet.pk))
+        self.assertEqual((entry.balance_before, entry.balance_after), (Decimal('10.00'), Decimal('6.00')))
+        self.assertEqual(self.balance(), Decimal('6.00'))
+
+    def test_stake_over_balance_is_refused(self):
+        # A stale cached balance must not let the stake through
+        self.assertEqual(BalanceService.balance(self.user.pk), Decimal('10.00'))
+        BalanceService.debit(self.user.pk, Decimal('8.00'), 'debit')
+
+        with self.assertRaises(ValidationError) as raised:
+            self.place('5.00')
+        self.assertIn('GH₵2.00', str(raised.exception.detail['stake_amount']))
+        self.assertFalse(Bet.objects.exists())
+        self.assertEqual(self.balance(), Decimal('2.00'))
+
+    def test_slip_over_balance_is_refused(self):
+        with self.assertRaises(ValidationError):
+            self.place_slip('4.00', [1, 2, 3])
+        self.assertFalse(Bet.objects.exists())
+        self.assertEqual(self.balance(), Decimal('10.00'))
+
+    def test_winnings_are_credited_once_on_rerun(self):
+        bet = self.place('1.00', number=7)
+        self.complete_draw([7, 8, 9, 10, 11])
+
+        settle_draw(self.draw)
+        # A re-run after a failure part-way finds the bet active again
+        Bet.objects.filter(pk=bet.pk).update(status='active')
+        settle_draw(self.draw)
+
+        self.assertEqual(WalletTransaction.objects.filter(reference=f'WIN-{bet.bet_number}').count(), 1)
+        self.assertEqual(self.balance(), Decimal('49.00'))
+
+    def test_refunds_are_credited_once_on_rerun(self):
+        bet = self.place('3.00')
+        self.cancel(self.draw)
+        Bet.objects.filter(pk=bet.pk).update(status='active')
+        self.cancel(self.draw)
+
+        self.assertEqual(WalletTransaction.objects.filter(reference=f'REFUND-{bet.bet_number}').count(), 1)
+        self.assertEqual(self.balance(), Decimal('10.00'))
+
+
+class BetSlipTests(BettingFixtures, TestCase):
+
+    def slip(self, items):
+        return BetSlipSerializer(data={'bets': [
+            {'draw_id': draw.pk, 'bet_type_id': self.bet_type.pk, 'selected_numbers': [number], 'stake_amount': stake}
+            for draw, number, stake in items
+        ]}, context={'request': SimpleNamespace(user=self.user)})
+
+    def test_invalid_bets_are_reported_in_place(self):
+        closed = self.open_draw('TEST-2')
+        Draw.objects.filter(pk=closed.pk).update(status='closed')
+
+        serializer = self.slip([(self.draw, 7, '1.00'), (self.draw, 8, '0.50'), (closed, 9, '1.00')])
+        self.assertFalse(serializer.is_valid())
+        valid, low_stake, closed_draw = serializer.errors['bets']
+        self.assertEqual(valid, {})
+        self.assertEqual(list(low_stake), ['stake_amount'])
+        self.assertEqual(list(closed_draw), ['draw_id'])
+        self.assertFalse(Bet.objects.exists())
+
+    def test_slip_is_capped(self):
+        BalanceService.credit(self.user.pk, Decimal('100.00'), 'deposit')
+        numbers = [number % 90 + 1 for number in range(BET_SLIP_MAX_BETS + 1)]
+
+        self.assertFalse(self.slip([(self.draw, number, '1.00') for number in numbers]).is_valid())
+
+        serializer = self.slip([(self.draw, number, '1.00') for number in numbers[:BET_SLIP_MAX_BETS]])
+        serializer.is_valid(raise_exception=True)
+        self.assertEqual(len(serializer.save()), BET_SLIP_MAX_BETS)
+
+    def test_slip_is_one_debit(self):
+        bets = self.place_slip('2.00', [1, 2, 3])
+
+        entry, = WalletTransaction.objects.filter(reference__startswith='STAKE-')
+        self.assertEqual((entry.reference, entry.amount), (f'STAKE-{bets[0].bet_number}', Decimal('6.00')))
+        self.assertEqual(entry.metadata['bets'], [bet.bet_number for bet in bets])
+        self.assertEqual(self.balance(), Decimal('4.00'))
+
+
+class SettlementTotalsTests(BettingFixtures, TestCase):
+
+    def test_totals_are_written_once_after_all_shards(self):
+        for number in (7, 7, 8, 30):
+            self.place('1.00', number=number)
+        self.complete_draw([7, 8, 9, 10, 11])
+
+        shards = plan_shards(self.draw, shard_size=2)
+        self.assertEqual(len(shards), 2)
+        # Shards leave the draw row alone
+        settle_draw(self.draw, min_id=shards[0][0], max_id=shards[0][1])
+        self.draw.refresh_from_db()
+        self.assertEqual((self.draw.total_winners, self.draw.total_payout_amount), (0, Decimal('0.00')))
+
+        totals = run_shards_locally(self.draw, shards)
+        self.assertEqual((totals['winners'], totals['total_payout']), (2, Decimal('80.00')))
+        self.draw.refresh_from_db()
+        self.assertEqual((self.draw.total_winners, self.draw.total_payout_amount), (2, Decimal('80.00')))
+
+
+class UserStatisticsTests(BettingFixtures, TestCase):
+    """Incremental statistics must always equal a rebuild from the bets table"""
+
+    def assertMatchesRebuild(self, expected):
+        recorded = UserStatistics.objects.values(*STATISTICS_FIELDS).get(pk=self.user.pk)
+        self.assertEqual(recorded, user_totals(self.user.pk))
+        self.assertEqual(recorded, expected)
+
+        rebuild_user_statistics([self.user.pk])
+        self.assertEqual(UserStatistics.objects.values(*STATISTICS_FIELDS).get(pk=self.user.pk), recorded)
+
+    def test_placement_settlement_and_cancellation(self):
+        self.place('1.00', number=7)
+        self.place_slip('1.00', [7, 9])
+        self.assertMatchesRebuild({
+            'total_bets': 3, 'total_staked': Decimal('3.00'), 'total_won': 0,
+            'total_winnings': Decimal('0.00'), 'active_bets': 3,
+        })
+
+        self.complete_draw([7, 8, 9, 10, 11])
+        settle_draw(self.draw)
+        self.assertMatchesRebuild({
+            'total_bets': 3, 'total_staked': Decimal('3.00'), 'total_won': 2,
+            'total_winnings': Decimal('80.00'), 'active_bets': 0,
+        })
+
+        other = self.open_draw('TEST-2')
+        self.place_slip('2.00', [1, 2], draw=other)
+        self.cancel(other)
+        self.assertMatchesRebuild({
+            'total_bets': 5, 'total_staked': Decimal('7.00'), 'total_won': 2,
+            'total_winnings': Decimal('80.00'), 'active_bets': 0,
+        })
+
+
+class DrawStreamTests(SimpleTestCase):
+    """Drives the ASGI app the way a server would for GET /api/draws/stream/"""
+
+    def setUp(self):
+        # A fresh hub per test: the old one's tasks belong to a closed loop
+        self.hub = DrawEventHub()
+        for target in ('betting.events.hub', 'betting.sse.hub'):
+            patcher = mock.patch(target, self.hub)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def message(self, draw_id, game_type_id):
+        now = timezone.now()
+        return json.dumps(draw_event(Draw(
+            id=draw_id, draw_number=f'TEST-{draw_id}', game_type_id=game_type_id, status='closed',
+            betting_opens_at=now, betting_closes_at=now
+        )))
+
+    async def stream(self, query_string, messages):
+        with mock.patch('betting.events.warn_if_events_stay_local'):
+            from NLA.asgi import application
+
+        sent = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body', b'').startswith(b'id:'):
+                disconnected.set()
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/draws/stream/', 'query_string': query_string}
+        response = asyncio.ensure_future(application(scope, receive, send))
+        while not self.hub.subscribers:
+            await asyncio.sleep(0)
+        for message in messages:
+            _publish(message)
+        await asyncio.wait_for(response, 5)
+        return sent
+
+    def test_published_event_reaches_stream(self):
+        other, wanted = self.message(1, 2), self.message(3, 4)
+        start, retry, frame = asyncio.run(self.stream(b'game_type=4', [other, wanted]))
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertEqual(retry['body'], b'retry: 3000\n\n')
+        self.assertEqual(frame['body'], f'id: 2\nevent: draw.status\ndata: {wanted}\n\n'.encode())
+        self.assertFalse(self.hub.subscribers)
+
+    @override_settings(REDIS_URL='', CELERY_TASK_ALWAYS_EAGER=False)
+    def test_warns_when_worker_events_stay_local(self):
+        with self.assertLogs('betting.events', 'WARNING'):
+            warn_if_events_stay_local()
+
+        with override_settings(CELERY_TASK_ALWAYS_EAGER=True), self.assertNoLogs('betting.events'):
+            warn_if_events_stay_local()
+
+
+class DrawCalendarTests(TestCase):
+
+    def setUp(self):
+        self.game_type = GameType.objects.create(
+            name='Calendar', code='CAL', category='other_games', description='Test game',
+            draw_time=time(hour=12), draw_days='Monday, wed,FRIDAY'
+        )
+        # Monday 06:00, before that day's draw closes
+        self.now = timezone.make_aware(datetime(2030, 1, 7, 6, 0))
+
+    def test_draw_days_parsing(self):
+        self.assertEqual(parse_draw_days('Monday, wed,FRIDAY'), frozenset({0, 2, 4}))
+        self.assertEqual(parse_draw_days('sat,, Sunday '), frozenset({5, 6}))
+        self.assertEqual(parse_draw_days('Daily'), frozenset(range(7)))
+        self.assertEqual(parse_draw_days('every day'), frozenset(range(7)))
+        for draw_days in ('', ' , ', 'mo', 'Funday', 't'):
+            with self.subTest(draw_days=draw_days), self.assertRaises(ValueError):
+                parse_draw_days(draw_days)
+
+    def test_unparseable_schedule_is_skipped(self):
+        GameType.objects.create(
+            name='Broken', code='BAD', category='other_games', description='Test game',
+            draw_time=time(hour=12), draw_days='Someday'
+        )
+        self.assertEqual([schedule.code for schedule in load_schedules()], ['CAL'])
+
+    def test_reruns_create_nothing_new(self):
+        self.assertEqual(generate_draws(days=7, now=self.now), 4)
+        self.assertEqual(generate_draws(days=7, now=self.now), 0)
+        self.assertEqual(
+            list(Draw.objects.order_by('draw_date').values_list('draw_number', 'betting_closes_at')),
+            [
+                (f'CAL-203001{day:02}', timezone.make_aware(datetime(2030, 1, day, 11, 45)))
+                for day in (7, 9, 11, 14)
+            ]
+        )
+
+    def test_only_inserted_draws_are_counted(self):
+        # Another run got Wednesday's draw number in first
+        Draw.objects.create(
+            game_type=self.game_type, draw_number='CAL-20300109', draw_date=date(2030, 1, 1),
+            draw_time=time(hour=12), status='scheduled', betting_opens_at=self.now, betting_closes_at=self.now
+        )
+        self.assertEqual(generate_draws(days=7, now=self.now), 3)
+
+
+@override_settings(DRAW_COUNTER_MODE='buffered')
+class DrawCounterTests(BettingFixtures, TestCase):
+
+    def totals(self):
+        return tuple(Draw.objects.values_list('total_bets', 'total_stake_amount').get(pk=self.draw.pk))
+
+    def test_deltas_fold_once(self):
+        self.place('1.00')
+        self.place_slip('2.00', [1, 2])
+        self.assertEqual(DrawCounterDelta.objects.count(), 2)
+        self.assertEqual(self.totals(), (0, Decimal('0.00')))
+
+        # Batches smaller than the backlog keep folding until it is empty
+        self.assertEqual(fold_draw_counters(batch_size=1), 2)
+        self.assertEqual(self.totals(), (3, Decimal('5.00')))
+        self.assertFalse(DrawCounterDelta.objects.exists())
+
+        self.assertEqual(fold_draw_counters(), 0)
+        self.assertEqual(self.totals(), (3, Decimal('5.00')))
+
+    def test_listed_totals_include_unfolded_deltas(self):
+        self.place('1.00')
+        fold_draw_counters()
+        self.place_slip('2.00', [1, 2])
+
+        self.draw.refresh_from_db()
+        self.assertEqual(current_totals(self.draw), (3, Decimal('5.00')))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        listed, = client.get('/api/draws/').json()['results']
+        self.assertEqual((listed['total_bets'], listed['total_stake_amount']), (3, '5.00'))
+
+
+class NotificationFanOutTests(BettingFixtures, TestCase):
+
+    def broadcast(self, user_ids, **options):
+        return fan_out(
+            user_ids, game_type=self.game_type, notification_type='game_update',
+            title='Betting Open', message='Betting is now open!', **options
+        )
+
+    def test_one_event_and_a_row_per_subscriber(self):
+        subscribers = [self.user] + [User.objects.create_user(username=f'fan{n}') for n in range(2)]
+        for user in subscribers:
+            UserSubscription.objects.create(user=user, game_type=self.game_type)
+        UserSubscription.objects.create(
+            user=User.objects.create_user(username='lapsed'), game_type=self.game_type, is_active=False
+        )
+
+        # Event, streamed ids, then one INSERT per batch
+        with self.assertNumQueries(4):
+            stats = self.broadcast(subscriber_ids(self.game_type.pk), batch_size=2)
+
+        event = NotificationEvent.objects.get()
+        self.assertEqual((stats['event'], stats['rows']), (event, 3))
+        self.assertCountEqual(
+            Notification.objects.filter(event=event).values_list('user_id', flat=True),
+            [user.pk for user in subscribers]
+        )
+
+    def test_bettors_are_notified_once(self):
+        self.place('1.00', number=7)
+        self.place('1.00', number=8)
+
+        self.assertEqual(self.broadcast(bettor_ids(self.draw.pk))['rows'], 1)
+        self.assertEqual(Notification.objects.filter(event__isnull=False).count(), 1)
+
+
+class UnreadCounterTests(BettingFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread_count/').json()['unread_count']
+
+    def test_counter_follows_incr_and_decr(self):
+        self.assertEqual(self.unread_count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bet = self.place('1.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place_slip('1.00', [1, 2])
+        fan_out([self.user.pk], notification_type='promotion', title='Promotion', message='Double odds today')
+        self.assertEqual(cache.get(unread_key(self.user.pk)), 4)
+        self.assertEqual(self.unread_count(), 4)
+
+        read = bet.notifications.get()
+        self.client.post(f'/api/notifications/{read.pk}/mark_read/')
+        self.client.post(f'/api/notifications/{read.pk}/mark_read/')
+        self.assertEqual(self.unread_count(), 3)
+
+        self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_missing_counter_is_filled_on_read(self):
+        add_unread([self.user.pk])
+        self.assertIsNone(cache.get(unread_key(self.user.pk)))
+
+        Notification.objects.create(user=self.user, notification_type='system', title='Welcome')
+        self.assertEqual(get_unread_count(self.user.pk), 1)
+
+    def test_reconcile_repairs_drift(self):
+        self.assertEqual(get_unread_count(self.user.pk), 0)
+        # Written behind the counter's back, so it stays stale
+        Notification.objects.bulk_create([
+            Notification(user=self.user, notification_type='system', title='Maintenance') for _ in range(2)
+        ])
+        self.assertEqual(get_unread_count(self.user.pk), 0)
+
+        self.assertEqual(reconcile_unread_counts(), 1)
+        self.assertEqual(get_unread_count(self.user.pk), 2)
+
+
+class DrawTransitionTests(BettingFixtures, TestCase):
+
+    def make_draw(self, draw_number, status, opens_at, closes_at):
+        draw = self.open_draw(draw_number)
+        Draw.objects.filter(pk=draw.pk).update(status=status, betting_opens_at=opens_at, betting_closes_at=closes_at)
+        return draw
+
+    def test_only_due_draws_move(self):
+        now = timezone.now()
+        hour = timedelta(hours=1)
+        due = self.make_draw('TEST-2', 'scheduled', now - hour, now + hour)
+        due_now = self.make_draw('TEST-3', 'scheduled', now, now + hour)
+        self.make_draw('TEST-4', 'scheduled', now + hour, now + 2 * hour)
+        self.make_draw('TEST-5', 'closed', now - hour, now - hour)
+        Draw.objects.update(updated_at=now - hour)
+
+        opened = transition_draws('scheduled', 'open', 'betting_opens_at', now)
+        self.assertCountEqual(opened, [due.pk, due_now.pk])
+        self.assertEqual(transition_draws('scheduled', 'open', 'betting_opens_at', now), [])
+
+        self.assertEqual(
+            dict(Draw.objects.values_list('draw_number', 'status')),
+            {'TEST-1': 'open', 'TEST-2': 'open', 'TEST-3': 'open', 'TEST-4': 'scheduled', 'TEST-5': 'closed'}
+        )
+        self.assertCountEqual(Draw.objects.filter(updated_at=now).values_list('pk', flat=True), opened)
+
+        # Nothing open has closed yet; the fixture draw's close comes first
+        self.assertEqual(transition_draws('open', 'closed', 'betting_closes_at', now), [])
+        self.assertEqual(next_transition_at(now), self.draw.betting_closes_at)
+
+
+class CatalogEtagTests(BettingFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.odds = GameOdds.objects.create(
+                game_type=self.game_type, bet_type=self.bet_type,
+                numbers_count=1, numbers_matched=1, payout_multiplier=Decimal('40.00')
+            )
+        self.url = f'/api/games-types/{self.game_type.pk}/odds/'
+        self.client = APIClient()
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        for header in (etag, f'W/{etag}', f'"stale", {etag}', '*'):
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_odds_change_gives_new_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.odds.payout_multiplier = Decimal('50.00')
+            self.odds.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([row['payout_multiplier'] for row in response.json()], ['50.00'])
@@ -0,0 +1,105 @@
+"""
+Per-user unread notification counters.
+
+Counters live in the default cache (Redis when REDIS_URL is set, local
+memory otherwise) so the unread-count poll is a single cache read. Local
+memory is not shared between processes, so there counters only live for
+LOCAL_CACHE_TTL_SECONDS before being recounted. A missing
+counter is filled from the database on first read. Counters are only ever
+adjusted with atomic incr/decr on keys that already exist; anything a race
+leaves behind is repaired by reconcile_unread_counts().
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from NLA.caching import cache_is_shared
+from .models import Notification
+
+
+UNREAD_COUNT_TIMEOUT = 24 * 60 * 60
+RECONCILE_WINDOW = timedelta(minutes=15)
+
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count_timeout():
+    # Another process's incr/decr never reaches a process-local counter
+    return UNREAD_COUNT_TIMEOUT if cache_is_shared() else settings.LOCAL_CACHE_TTL_SECONDS
+
+
+def get_unread_count(user_id):
+    count = cache.get(unread_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.add(unread_key(user_id), count, unread_count_timeout())
+    return max(count, 0)
+
+
+def _adjust(user_id, delta):
+    try:
+        if delta > 0:
+            cache.incr(unread_key(user_id), delta)
+        else:
+            cache.decr(unread_key(user_id), -delta)
+    except ValueError:
+        # No counter cached; the next read computes it from the database
+        pass
+
+
+def add_unread(user_ids, count=1):
+    """Count new unread notifications for each of user_ids (one per id per call)"""
+    keys = {unread_key(user_id): user_id for user_id in user_ids}
+    # Only users with a live counter need touching
+    for key in cache.get_many(list(keys)):
+        _adjust(keys[key], count)
+
+
+def remove_unread(user_id, count=1):
+    if count:
+        _adjust(user_id, -count)
+
+
+def reconcile_unread_counts(since=None):
+    """
+    Reset counters for users whose notifications changed since `since`
+    (default: the last RECONCILE_WINDOW). Returns the number of users checked.
+    """
+    since = since or timezone.now() - RECONCILE_WINDOW
+    changed = Notification.objects.filter(
+        Q(created_at__gte=since) | Q(read_at__gte=since)
+    ).order_by().values_list('user_id', flat=True).distinct()
+
+    checked = 0
+    user_ids = []
+    for user_id in changed.iterator(chunk_size=1000):
+        user_ids.append(user_id)
+        if len(user_ids) == 1000:
+            checked += _reset(user_ids)
+            user_ids = []
+    if user_ids:
+        checked += _reset(user_ids)
+    return checked
+
+
+def _reset(user_ids):
+    counts = dict(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False)
+        .values('user_id').annotate(unread=Count('id')).order_by()
+        .values_list('user_id', 'unread')
+    )
+    cache.set_many(
+        {unread_key(user_id): counts.get(user_id, 0) for user_id in user_ids},
+        unread_count_timeout()
+    )
+    return len(user_ids)
+
+
+def forget_unread(user_ids):
+    """Drop cached counters so they are recomputed on next read"""
+    cache.delete_many([unread_key(user_id) for user_id in user_ids])
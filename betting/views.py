@@ -6,15 +6,26 @@ from rest_framework.decorators import permission_classes
 from rest_framework import permissions
 from rest_framework.viewsets import GenericViewSet,ModelViewSet
 from rest_framework.mixins import ListModelMixin,RetrieveModelMixin
-from .models import GameType,GameOdds,Draw,UserSubscription,Notification,Bet
-from .serializers import (GameTypeSerializer,UserSubscriptionSerializer,DrawListSerializer,DrawDetailSerializer,NotificationSerializer,
-                           GameOddsSerializer,SubscribeGameSerializer,BetSerializer,BetDetailSerializer,PlaceBetSerializer,UserStatisticsSerializer   )
+from .models import GameType,GameOdds,Draw,UserSubscription,Notification,Bet,UserStatistics
+from .serializers import (GameTypeSerializer,UserSubscriptionSerializer,DrawListSerializer,DrawDetailSerializer,DrawRowSerializer,NotificationSerializer,
+                           GameOddsSerializer,SubscribeGameSerializer,BetSerializer,BetRowSerializer,BetDetailSerializer,PlaceBetSerializer,BetSlipSerializer,UserStatisticsSerializer   )
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.decorators import action
 from rest_framework import viewsets,status,filters
 from rest_framework.permissions import IsAuthenticated,AllowAny
 from django.db.models import Q,Count,Sum 
 from decimal import Decimal
+from .catalog import etag_matches, get_catalog
+from .counters import with_pending_totals
+from .schedule import with_betting_window
+from .unread import get_unread_count, remove_unread
+from .pagination import (
+    BetKeysetPagination, DrawKeysetPagination, NotificationKeysetPagination,
+    UpcomingDrawKeysetPagination
+)
 
 
 
@@ -33,24 +44,48 @@ class GameTypeViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'category']
     
+    def catalog_response(self, *key):
+        """Serve a catalog resource from memory, or 304 if the client's ETag is current"""
+        entry = get_catalog().get(*key)
+        if entry is None:
+            raise NotFound()
+        data, etag = entry
+        
+        # The ETag describes the JSON rendering; other formats are served without one
+        if self.request.accepted_renderer.format != 'json':
+            return Response(data)
+        
+        if etag_matches(self.request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('search'):
+            return super().list(request, *args, **kwargs)
+        return self.catalog_response('list')
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.catalog_response('detail', self.catalog_pk())
+    
+    def catalog_pk(self):
+        try:
+            return int(self.kwargs['pk'])
+        except ValueError:
+            raise NotFound()
+    
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """Get all game categories"""
-        categories = GameType.objects.filter(
-            is_active=True
-        ).values('category').distinct()
-        
-        return Response({
-            'categories': [cat['category'] for cat in categories]
-        })
+        return self.catalog_response('categories')
     
     @action(detail=True, methods=['get'])
     def odds(self, request, pk=None):
         """Get odds for a specific game"""
-        game_type = self.get_object()
-        odds = GameOdds.objects.filter(game_type=game_type)
-        serializer = GameOddsSerializer(odds, many=True)
-        return Response(serializer.data)
+        return self.catalog_response('odds', self.catalog_pk())
 
 class DrawViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -64,6 +99,7 @@ class DrawViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     filter_backends = [filters.SearchFilter]
     search_fields = ['draw_number', 'game_type__name']
+    pagination_class = DrawKeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -71,8 +107,18 @@ class DrawViewSet(viewsets.ReadOnlyModelViewSet):
         return DrawListSerializer
     
     
+    @cached_property
+    def now(self):
+        """One clock reading for every time comparison in this request"""
+        return timezone.now()
+    
+    def annotated_draws(self):
+        return with_betting_window(
+            with_pending_totals(Draw.objects.select_related('game_type').all()), self.now
+        )
+    
     def get_queryset(self):
-        queryset = Draw.objects.select_related('game_type').all()
+        queryset = self.annotated_draws()
         
         # Filter by status
         status_param = self.request.query_params.get('status', None)
@@ -84,26 +130,40 @@ class DrawViewSet(viewsets.ReadOnlyModelViewSet):
         if game_type:
             queryset = queryset.filter(game_type_id=game_type)
         
-        # Filter upcoming
-        upcoming = self.request.query_params.get('upcoming', None)
-        if upcoming == 'true':
+        # Filter upcoming: served from the (status, betting_closes_at) index
+        if self.is_upcoming():
             queryset = queryset.filter(
-                draw_date__gte=timezone.now().date(),
-                status__in=['scheduled', 'open']
+                status__in=['scheduled', 'open'],
+                betting_closes_at__gt=self.now
             )
         
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        return self.paginated_rows(self.filter_queryset(self.get_queryset()))
+    
+    def paginated_rows(self, queryset):
+        page = self.paginate_queryset(DrawRowSerializer.rows(queryset))
+        return self.get_paginated_response(DrawRowSerializer(page, many=True).data)
+    
+    def is_upcoming(self):
+        return self.action == 'list' and self.request.query_params.get('upcoming') == 'true'
+    
+    @property
+    def paginator(self):
+        """Upcoming draws are paged soonest-closing first"""
+        if not hasattr(self, '_paginator'):
+            self._paginator = UpcomingDrawKeysetPagination() if self.is_upcoming() else DrawKeysetPagination()
+        return self._paginator
+    
     @action(detail=False, methods=['get'])
     def open(self, request):
         """Get all draws currently open for betting"""
-        draws = Draw.objects.filter(
+        return self.paginated_rows(self.annotated_draws().filter(
             status='open',
-            betting_opens_at__lte=timezone.now(),
-            betting_closes_at__gte=timezone.now()
-        )
-        serializer = self.get_serializer(draws, many=True)
-        return Response(serializer.data)
+            betting_opens_at__lte=self.now,
+            betting_closes_at__gte=self.now
+        ))
     
     @action(detail=True, methods=['get'])
     def results(self, request, pk=None):
@@ -122,7 +182,8 @@ class DrawViewSet(viewsets.ReadOnlyModelViewSet):
             'draw_date': draw.draw_date,
             'winning_numbers': draw.winning_numbers,
             'machine_number': draw.machine_number,
-            'total_bets': draw.total_bets,
+            'total_bets': draw.total_bets + draw.pending_bets,
+            'total_winners': draw.total_winners,
             'total_payout': str(draw.total_payout_amount)
         })
 
@@ -198,174 +259,6 @@ class SubscriptionViewSet(ModelViewSet):
         serializer = self.get_serializer(subscriptions, many=True)
         return Response(serializer.data)
 
-class NotificationViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
-    serializer_class = NotificationSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user)
-    
-    @action(detail=False, methods=['post'])
-    def mark_all_read(self, request):
-        """Mark all notifications as read"""
-        updated = Notification.objects.filter(
-            user=request.user, 
-            is_read=False
-        ).update(is_read=True)
-        
-        return Response
-    @action(detail=True, methods=['post'])
-    def mark_read(self, request, pk=None):
-        """Mark a specific notification as read"""
-        notification = self.get_object()
-        notification.is_read = True
-        notification.save()
-        
-        return Response({
-            'message': 'Notification marked as read'
-        })
-    
-    @action(detail=False, methods=['get'])
-    def unread_count(self, request):
-        """Get count of unread notifications"""
-        count = Notification.objects.filter(
-            user=request.user, 
-            is_read=False
-        ).count()
-        
-        return Response({'unread_count': count})
-
-# class BetViewSet(viewsets.ModelViewSet):
-    """
-    API endpoint for managing bets
-    
-    list: Get user's bets
-    retrieve: Get details of a specific bet
-    create: Place a new bet
-    """
-    
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        """Return only the current user's bets"""
-        user=self.request.user
-        print(f"[DEBUG] User:{user.username}, Superuser:{user.is_superuser}, Staff:{user.is_staff}")
-
-        # Superusers and staff can see all bets
-        if user.is_superuser or user.is_staff:
-            queryset = Bet.objects.all()
-            print(f"[DEBUG] Superuser/staff - showing ALL bets: {queryset.count()}")
-        else:
-            # Regular users only see their own bets
-            queryset = Bet.objects.filter(user=user)
-            print(f"[DEBUG] Regular user - showing user bets: {queryset.count()}")
-        
-        # Apply filters
-        status_param = self.request.query_params.get('status')
-        if status_param:
-            queryset = queryset.filter(status=status_param)
-            print(f"[DEBUG] After status filter: {queryset.count()}")
-        
-        game_type_id = self.request.query_params.get('game_type')
-        if game_type_id:
-            queryset = queryset.filter(draw__game_type_id=game_type_id)
-            print(f"[DEBUG] After game_type filter: {queryset.count()}")
-        
-        # Prefetch related data for performance
-        queryset = queryset.select_related(
-            'draw', 
-            'draw__game_type', 
-            'bet_type',
-            'user'
-        ).order_by('-placed_at')
-        
-        return queryset
-    
-    def get_serializer_class(self):
-        if self.action == 'create':
-            return PlaceBetSerializer
-        elif self.action == 'retrieve':
-            return BetDetailSerializer
-        return BetSerializer
-    
-    def get_queryset(self):
-        user = self.request.user
-        queryset = Bet.objects.filter(user=user).select_related(
-            'draw', 'draw__game_type', 'bet_type'
-        )
-        
-        # Filter by status
-        status_param = self.request.query_params.get('status', None)
-        if status_param:
-            queryset = queryset.filter(status=status_param)
-        
-        # Filter by game type
-        game_type = self.request.query_params.get('game_type', None)
-        if game_type:
-            queryset = queryset.filter(draw__game_type_id=game_type)
-        
-        return queryset
-    
-    def create(self, request, *args, **kwargs):
-        """Place a new bet"""
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        bet = serializer.save()
-        
-        return Response(
-            BetSerializer(bet).data,
-            status=status.HTTP_201_CREATED
-        )
-    
-    @action(detail=False, methods=['get'])
-    def active(self, request):
-        """Get user's active bets"""
-        bets = self.get_queryset().filter(status='active')
-        serializer = self.get_serializer(bets, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['get'])
-    def history(self, request):
-        """Get user's bet history"""
-        bets = self.get_queryset().filter(
-            status__in=['won', 'lost', 'paid']
-        )
-        serializer = self.get_serializer(bets, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=True, methods=['get'])
-    def check_result(self, request, pk=None):
-        """Check if a bet won or lost"""
-        bet = self.get_object()
-        
-        if bet.draw.status != 'completed':
-            return Response({
-                'message': 'Draw results not available yet',
-                'status': bet.status
-            })
-        
-        # Check if bet already processed
-        if bet.status in ['won', 'lost']:
-            return Response({
-                'bet_number': bet.bet_number,
-                'status': bet.status,
-                'selected_numbers': bet.selected_numbers,
-                'winning_numbers': bet.draw.winning_numbers,
-                'winnings': str(bet.actual_winnings)
-            })
-        
-        # Process bet
-        won = bet.check_win()
-        
-        return Response({
-            'bet_number': bet.bet_number,
-            'status': bet.status,
-            'selected_numbers': bet.selected_numbers,
-            'winning_numbers': bet.draw.winning_numbers,
-            'won': won,
-            'winnings': str(bet.actual_winnings)
-        })
-
 class BetViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing bets 
@@ -373,70 +266,51 @@ class BetViewSet(viewsets.ModelViewSet):
     
     permission_classes = [IsAuthenticated]
     serializer_class = BetSerializer
+    pagination_class = BetKeysetPagination
 
     def get_serializer_class(self):
         if self.action == 'create':
             return PlaceBetSerializer
+        elif self.action == 'slip':
+            return BetSlipSerializer
         elif self.action == 'retrieve':
             return BetDetailSerializer
         return BetSerializer
     
     def get_queryset(self):
-        """Return bets based on user role - PROPER FIX"""
+        """Return bets based on user role"""
         user = self.request.user
         
-        print(f"[DEBUG] User: {user.username} (ID: {user.id}), Superuser: {user.is_superuser}")
-        
-        # SUPERUSER FIX: Superusers and staff can see ALL bets
+        # Superusers and staff can see all bets; regular users only their own
         if user.is_superuser or user.is_staff:
             queryset = Bet.objects.all()
-            print(f"[DEBUG] SUPERUSER MODE - Showing ALL {queryset.count()} bets")
         else:
-            # Regular users only see their own bets
             queryset = Bet.objects.filter(user=user)
-            print(f"[DEBUG] REGULAR USER MODE - Showing user's {queryset.count()} bets")
         
         # Apply filters
         status_param = self.request.query_params.get('status')
         if status_param:
             queryset = queryset.filter(status=status_param)
-            print(f"[DEBUG] After status filter '{status_param}': {queryset.count()}")
         
         game_type_id = self.request.query_params.get('game_type')
         if game_type_id:
             queryset = queryset.filter(draw__game_type_id=game_type_id)
-            print(f"[DEBUG] After game_type filter '{game_type_id}': {queryset.count()}")
         
         # Prefetch related objects for performance
-        queryset = queryset.select_related(
+        return queryset.select_related(
             'draw', 
             'draw__game_type', 
             'bet_type',
             'user'
-        ).order_by('-placed_at')
-        
-        print(f"[DEBUG] Final queryset count: {queryset.count()}")
-        return queryset
+        ).order_by('-placed_at', '-id')
     
     def list(self, request, *args, **kwargs):
-        """List bets with proper superuser handling"""
-        try:
-            queryset = self.filter_queryset(self.get_queryset())
-            
-            page = self.paginate_queryset(queryset)
-            if page is not None:
-                serializer = self.get_serializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
-            
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
-            
-        except Exception as e:
-            print(f"[ERROR] List method failed: {str(e)}")
-            return Response(
-                {"error": "Failed to retrieve bets", "details": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """List bets, newest first, a keyset page at a time"""
+        return self.paginated_rows(self.filter_queryset(self.get_queryset()))
+    
+    def paginated_rows(self, queryset):
+        page = self.paginate_queryset(BetRowSerializer.rows(queryset))
+        return self.get_paginated_response(BetRowSerializer(page, many=True).data)
     
     def create(self, request, *args, **kwargs):
         """Place a new bet"""
@@ -455,22 +329,36 @@ class BetViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'])
+    def slip(self, request):
+        """Place a slip of bets in one all-or-nothing request"""
+        serializer = self.get_serializer(data=request.data)
+        
+        if serializer.is_valid():
+            bets = serializer.save()
+            response_serializer = BetSerializer(bets, many=True)
+            return Response(
+                response_serializer.data,
+                status=status.HTTP_201_CREATED
+            )
+        else:
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
     # Keep your existing actions
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get user's active bets"""
-        bets = self.get_queryset().filter(status='active')
-        serializer = self.get_serializer(bets, many=True)
-        return Response(serializer.data)
+        return self.paginated_rows(self.get_queryset().filter(status='active'))
     
     @action(detail=False, methods=['get'])
     def history(self, request):
         """Get user's bet history"""
-        bets = self.get_queryset().filter(
+        return self.paginated_rows(self.get_queryset().filter(
             status__in=['won', 'lost', 'paid']
-        )
-        serializer = self.get_serializer(bets, many=True)
-        return Response(serializer.data)
+        ))
     
     @action(detail=True, methods=['get'])
     def check_result(self, request, pk=None):
@@ -608,36 +496,46 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
+    pagination_class = NotificationKeysetPagination
     
     def get_queryset(self):
         return Notification.objects.filter(
             user=self.request.user
-        ).select_related('game_type')
+        ).select_related('game_type', 'event', 'event__game_type')
     
     @action(detail=False, methods=['get'])
     def unread(self, request):
         """Get unread notifications"""
         notifications = self.get_queryset().filter(is_read=False)
-        serializer = self.get_serializer(notifications, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(notifications)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Get count of unread notifications"""
+        return Response({'unread_count': get_unread_count(request.user.id)})
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark notification as read"""
         notification = self.get_object()
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save()
+        updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+            is_read=True,
+            read_at=timezone.now()
+        )
+        remove_unread(request.user.id, updated)
         
         return Response({'message': 'Notification marked as read'})
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read"""
-        self.get_queryset().filter(is_read=False).update(
+        updated = Notification.objects.filter(user=request.user, is_read=False).update(
             is_read=True,
             read_at=timezone.now()
         )
+        remove_unread(request.user.id, updated)
         return Response({'message': 'All notifications marked as read'})
 
 
@@ -653,26 +551,16 @@ class StatisticsViewSet(viewsets.ViewSet):
         """Get user's betting statistics"""
         user = request.user
         
-        # Get all user's bets
-        bets = Bet.objects.filter(user=user)
-        
-        # Calculate statistics
-        total_bets = bets.count()
-        total_staked = bets.aggregate(Sum('stake_amount'))['stake_amount__sum'] or Decimal('0')
-        won_bets = bets.filter(status='won')
-        total_won = won_bets.count()
-        total_winnings = won_bets.aggregate(Sum('actual_winnings'))['actual_winnings__sum'] or Decimal('0')
-        active_bets = bets.filter(status='active').count()
-        
-        win_rate = (total_won / total_bets * 100) if total_bets > 0 else Decimal('0')
+        # Totals are maintained at placement and settlement time
+        stats = UserStatistics.objects.filter(pk=user.pk).first() or UserStatistics(user=user)
         
         data = {
-            'total_bets': total_bets,
-            'total_staked': total_staked,
-            'total_won': total_won,
-            'total_winnings': total_winnings,
-            'win_rate': round(win_rate, 2),
-            'active_bets': active_bets,
+            'total_bets': stats.total_bets,
+            'total_staked': stats.total_staked,
+            'total_won': stats.total_won,
+            'total_winnings': stats.total_winnings,
+            'win_rate': stats.win_rate,
+            'active_bets': stats.active_bets,
             'account_balance': user.account_balance
         }
         
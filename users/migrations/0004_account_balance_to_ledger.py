@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:39
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def move_balances_to_ledger(apps, schema_editor):
+    """Open each user's GHS wallet with one ledger entry for their account_balance"""
+    User = apps.get_model('users', 'User')
+    Wallet = apps.get_model('wallet', 'Wallet')
+    WalletTransaction = apps.get_model('wallet', 'WalletTransaction')
+
+    now = timezone.now()
+    balances = User.objects.exclude(account_balance=0).order_by('pk').values_list('pk', 'account_balance')
+    batch = []
+    for row in balances.iterator(chunk_size=1000):
+        batch.append(row)
+        if len(batch) == 1000:
+            open_wallets(Wallet, WalletTransaction, batch, now)
+            batch = []
+    if batch:
+        open_wallets(Wallet, WalletTransaction, batch, now)
+
+
+def open_wallets(Wallet, WalletTransaction, batch, now):
+    user_ids = [user_id for user_id, _ in batch]
+    Wallet.objects.bulk_create(
+        [Wallet(user_id=user_id, currency='GHS') for user_id in user_ids], ignore_conflicts=True
+    )
+    wallets = dict(
+        Wallet.objects.filter(user_id__in=user_ids, currency='GHS').values_list('user_id', 'pk')
+    )
+    WalletTransaction.objects.bulk_create([
+        WalletTransaction(
+            wallet_id=wallets[user_id],
+            transaction_type='deposit' if balance > 0 else 'debit',
+            amount=abs(balance),
+            status='completed',
+            reference=f'OPENING-{user_id}',
+            description='Opening balance from users.account_balance',
+            completed_at=now,
+        )
+        for user_id, balance in batch
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_id_number'),
+        ('wallet', '0003_account_wallets'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_balances_to_ledger, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='user',
+            name='account_balance',
+        ),
+    ]
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.db.models.signals import post_save
@@ -47,13 +49,25 @@ class User(AbstractUser):
     id_number=models.CharField(max_length=30, default='000-0000-0000-0')
     region=models.CharField(max_length=20, choices=REGION_CHOICES,default='Greater Accra-Accra')
     id_verified = models.BooleanField(default=False)
-    account_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'users'
 
+    @property
+    def account_balance(self):
+        """Account wallet balance (users.services.BalanceService), read once per instance"""
+        if '_account_balance' not in self.__dict__:
+            from .services import BalanceService
+            self._account_balance = BalanceService.balance(self.pk) if self.pk else Decimal('0.00')
+        return self._account_balance
+
+    @account_balance.setter
+    def account_balance(self, value):
+        # Only updates this instance; move money through BalanceService
+        self._account_balance = value
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     security_question = models.CharField(max_length=255)
@@ -78,6 +78,9 @@ class UserLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Must include "username" and "password"')
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    # A property over the wallet ledger now; keep the DecimalField string format
+    account_balance = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name','id_type','id_number',
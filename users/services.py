@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from wallet.ledger import InsufficientFunds, bulk_credit, cached_balance, post_entry, wallet_balance
+from wallet.models import Wallet
+
+
+ACCOUNT_CURRENCY = 'GHS'
+
+
+class InsufficientBalance(Exception):
+    """Raised when a debit would take an account balance below zero"""
+
+
+def account_wallet_key(user_id):
+    return f'wallet:account:{user_id}'
+
+
+class BalanceService:
+    """
+    Account balances for betting and the wallet app alike. A user's balance is
+    their GHS wallet on the append-only ledger (wallet/ledger.py), so every
+    stake, payout and wallet movement is one ledger insert and there is no
+    second copy to drift.
+    """
+
+    @staticmethod
+    def wallet_ids(user_ids):
+        """{user_id: account wallet id}, creating missing wallets; ids are cached per user"""
+        keys = {account_wallet_key(user_id): user_id for user_id in set(user_ids)}
+        found = {keys[key]: wallet_id for key, wallet_id in cache.get_many(list(keys)).items()}
+
+        missing = set(keys.values()) - found.keys()
+        if missing:
+            wallets = Wallet.objects.filter(user_id__in=missing, currency=ACCOUNT_CURRENCY)
+            loaded = dict(wallets.values_list('user_id', 'pk'))
+            if len(loaded) < len(missing):
+                Wallet.objects.bulk_create([
+                    Wallet(user_id=user_id, currency=ACCOUNT_CURRENCY)
+                    for user_id in missing - loaded.keys()
+                ], ignore_conflicts=True)
+                loaded = dict(wallets.values_list('user_id', 'pk'))
+
+            # A wallet created here disappears if the caller rolls back
+            cached = {account_wallet_key(user_id): wallet_id for user_id, wallet_id in loaded.items()}
+            transaction.on_commit(lambda: cache.set_many(cached, None))
+            found.update(loaded)
+        return found
+
+    @staticmethod
+    def wallet_id(user_id):
+        return BalanceService.wallet_ids([user_id])[user_id]
+
+    @staticmethod
+    def balance(user_id):
+        """Account balance for display, served from the balance cache"""
+        return cached_balance(BalanceService.wallet_id(user_id))
+
+    @staticmethod
+    def current_balance(user_id):
+        """Account balance read from the ledger, bypassing the balance cache"""
+        return wallet_balance(BalanceService.wallet_id(user_id))
+
+    @staticmethod
+    def debit(user_id, amount, transaction_type='stake', reference='', description='', **fields):
+        """
+        Post a debit to the user's account; the entry carries balance_before
+        and balance_after. Call last inside transaction.atomic() so the
+        per-wallet debit lock is held only until commit.
+        """
+        try:
+            return post_entry(
+                BalanceService.wallet_id(user_id), transaction_type, amount,
+                reference, description, **fields
+            )
+        except InsufficientFunds:
+            raise InsufficientBalance(f"Balance does not cover GH₵{amount}")
+
+    @staticmethod
+    def credit(user_id, amount, transaction_type='credit', reference='', description='', **fields):
+        """Post a credit to the user's account and return the ledger entry"""
+        return post_entry(
+            BalanceService.wallet_id(user_id), transaction_type, amount,
+            reference, description, **fields
+        )
+
+    @staticmethod
+    def bulk_credit(credits, transaction_type='credit', description=''):
+        """
+        Credit many accounts from (user_id, amount, reference[, fields]) tuples
+        with one INSERT per ledger chunk; see wallet.ledger.bulk_credit
+        """
+        credits = list(credits)
+        wallet_ids = BalanceService.wallet_ids(credit[0] for credit in credits)
+        return bulk_credit(
+            [(wallet_ids[user_id], *rest) for user_id, *rest in credits],
+            transaction_type, description
+        )
@@ -1,3 +1,68 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from .models import User
+from .services import BalanceService
+
+
+class ProfileApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='profile')
+        BalanceService.credit(self.user.pk, Decimal('12.50'), 'deposit')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_account_balance_is_a_decimal_string(self):
+        response = self.client.get('/api/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['account_balance'], '12.50')
+
+    def test_account_balance_is_read_only(self):
+        response = self.client.put('/api/profile/', {'account_balance': '999.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['account_balance'], '12.50')
+        self.assertEqual(BalanceService.current_balance(self.user.pk), Decimal('12.50'))
+
+
+class AccountBalanceMigrationTests(TransactionTestCase):
+    """users.0004 moves account_balance onto the wallet ledger"""
+
+    before = [('users', '0003_user_id_number'), ('wallet', '0003_account_wallets')]
+    after = [('users', '0004_account_balance_to_ledger')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        # Leave the schema as the rest of the suite expects it
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_balances_become_opening_entries(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('users', 'User')
+        rich = User.objects.create(username='rich', account_balance=Decimal('125.50'))
+        owing = User.objects.create(username='owing', account_balance=Decimal('-3.00'))
+        empty = User.objects.create(username='empty', account_balance=Decimal('0.00'))
+
+        apps = self.migrate(self.after)
+        WalletTransaction = apps.get_model('wallet', 'WalletTransaction')
+
+        opening = WalletTransaction.objects.get(reference=f'OPENING-{rich.pk}')
+        self.assertEqual(
+            (opening.wallet.user_id, opening.wallet.currency, opening.transaction_type, opening.amount, opening.status),
+            (rich.pk, 'GHS', 'deposit', Decimal('125.50'), 'completed')
+        )
+        opening = WalletTransaction.objects.get(reference=f'OPENING-{owing.pk}')
+        self.assertEqual((opening.transaction_type, opening.amount), ('debit', Decimal('3.00')))
+        self.assertFalse(WalletTransaction.objects.filter(reference=f'OPENING-{empty.pk}').exists())
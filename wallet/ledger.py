@@ -0,0 +1,366 @@
+"""
+Append-only wallet ledger.
+
+Every movement is one inserted WalletTransaction; nothing rewrites the wallet
+row. A wallet's balance is its latest WalletSnapshot plus the completed
+entries after it, and snapshot_balances() periodically inserts fresh
+snapshots so that tail stays short.
+
+Ids are handed out before commit, so a lower id can commit after a higher
+one. Snapshots only fold entries up to ledger_watermark(), below which no
+open transaction still holds an id. On PostgreSQL every ledger write first
+takes its transaction id (_begin_ledger_write) and is bounded by
+LEDGER_TRANSACTION_TIMEOUT_SECONDS, so the watermark is the sequence position
+once the transactions open at that moment have ended.
+
+Credits never wait on anything. Debits take a per-wallet transaction-scoped
+advisory lock (PostgreSQL) so the funds check and the insert are atomic with
+respect to other debits; credits and reads carry on meanwhile. SQLite allows
+one writer at a time, so it needs no lock; other databases (MySQL, Oracle)
+lock the wallet row instead, which also holds back writes to that row.
+
+Entries count once they are inserted with status 'completed'. Record pending
+movements (e.g. unconfirmed deposits) when they complete rather than flipping
+an older row, or a snapshot taken in between would miss them.
+
+cached_balance() serves reads from the default cache for
+BALANCE_CACHE_SECONDS; every posting drops the wallet's entry when its
+transaction commits. Funds checks never use it.
+"""
+import logging
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    Case, DecimalField, Exists, F, Max, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Wallet, WalletSnapshot, WalletTransaction, generate_transaction_reference
+
+
+logger = logging.getLogger(__name__)
+
+BULK_CREDIT_CHUNK_SIZE = 2000
+WATERMARK_POLL_SECONDS = 0.05
+
+LEDGER_LOCK_NAMESPACE = 7311  # First key of pg_advisory_xact_lock(int, int) for wallet debits
+
+CENTS = Decimal('0.01')
+ZERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=15, decimal_places=2))
+
+
+class InsufficientFunds(Exception):
+    """Raised when a debit would take a wallet balance below zero"""
+
+
+def signed_amount():
+    """Ledger entry amount, negative for debit types"""
+    return Case(
+        When(transaction_type__in=WalletTransaction.DEBIT_TYPES, then=-F('amount')),
+        default=F('amount'),
+        output_field=DecimalField(max_digits=15, decimal_places=2)
+    )
+
+
+def with_balances(wallets, up_to_id=None):
+    """
+    Annotate wallets with snapshot_id, snapshot_balance and balance
+    up_to_id caps the ledger tail (used when taking snapshots)
+    """
+    latest = WalletSnapshot.objects.filter(wallet=OuterRef('pk')).order_by('-last_transaction_id')
+    wallets = wallets.annotate(
+        snapshot_id=Coalesce(Subquery(latest.values('last_transaction_id')[:1]), 0),
+        snapshot_balance=Coalesce(Subquery(latest.values('balance')[:1]), ZERO),
+    )
+
+    tail = WalletTransaction.objects.filter(
+        wallet=OuterRef('pk'), status='completed', id__gt=OuterRef('snapshot_id')
+    )
+    if up_to_id is not None:
+        tail = tail.filter(id__lte=up_to_id)
+    tail = tail.order_by().values('wallet').annotate(total=Sum(signed_amount())).values('total')
+
+    return wallets.annotate(balance_now=F('snapshot_balance') + Coalesce(Subquery(tail), ZERO))
+
+
+def wallet_balances(wallet_ids):
+    """{wallet_id: balance} in one query"""
+    return {
+        wallet_id: Decimal(balance).quantize(CENTS)
+        for wallet_id, balance in with_balances(
+            Wallet.objects.filter(pk__in=wallet_ids)
+        ).values_list('pk', 'balance_now')
+    }
+
+
+def wallet_balance(wallet_id):
+    return wallet_balances([wallet_id]).get(wallet_id, Decimal('0.00'))
+
+
+def balance_cache_key(wallet_id):
+    return f'wallet:balance:{wallet_id}'
+
+
+def cached_balance(wallet_id):
+    """Wallet balance for display; may trail a posting by up to BALANCE_CACHE_SECONDS"""
+    key = balance_cache_key(wallet_id)
+    balance = cache.get(key)
+    if balance is None:
+        balance = wallet_balance(wallet_id)
+        cache.set(key, balance, settings.BALANCE_CACHE_SECONDS)
+    return balance
+
+
+def _expire_balances(wallet_ids):
+    """Drop cached balances once the current transaction commits"""
+    keys = [balance_cache_key(wallet_id) for wallet_id in set(wallet_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _lock_debits(wallet_id):
+    """Serialize debits on one wallet until the current transaction ends"""
+    if connection.vendor == 'sqlite':
+        return
+    if connection.vendor != 'postgresql':
+        # No advisory locks; the wallet row stands in for one
+        list(Wallet.objects.select_for_update().filter(pk=wallet_id).values_list('pk', flat=True))
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(%s, %s)',
+            [LEDGER_LOCK_NAMESPACE, wallet_id & 0x7FFFFFFF]
+        )
+
+
+def _begin_ledger_write():
+    """
+    Take the current transaction's id before it takes any ledger ids, so
+    ledger_watermark() can wait for it, and cap how long it may stay open
+    """
+    if connection.vendor != 'postgresql':
+        return
+    # transaction_timeout is PostgreSQL 17+; older servers can only end
+    # transactions that sit idle
+    setting = 'transaction_timeout' if connection.pg_version >= 170000 else 'idle_in_transaction_session_timeout'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT txid_current(), set_config(%s, %s, true)',
+            [setting, f'{settings.LEDGER_TRANSACTION_TIMEOUT_SECONDS}s']
+        )
+
+
+def ledger_watermark(timeout=None):
+    """
+    Highest ledger id at or below which every entry has committed or rolled
+    back, or None if that could not be established within timeout seconds
+    """
+    if connection.vendor == 'sqlite':
+        # One writer at a time: ids held by an open transaction are above
+        # every committed id
+        return WalletTransaction.objects.aggregate(id=Max('id'))['id']
+
+    if connection.vendor != 'postgresql':
+        # No transaction ids to wait on; assume writers commit within the lag
+        return WalletTransaction.objects.filter(
+            created_at__lte=timezone.now() - timedelta(seconds=settings.WALLET_SNAPSHOT_LAG_SECONDS)
+        ).aggregate(id=Max('id'))['id']
+
+    timeout = settings.LEDGER_TRANSACTION_TIMEOUT_SECONDS if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    with connection.cursor() as cursor:
+        # Every id up to last_value was taken by a transaction that already
+        # had its xid, so it has ended or is in the snapshot taken next
+        cursor.execute(
+            "SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, 'id'))",
+            [WalletTransaction._meta.db_table]
+        )
+        last_value = cursor.fetchone()[0]
+        cursor.execute('SELECT txid_current_snapshot()::text')
+        snapshot = cursor.fetchone()[0]
+
+        while True:
+            cursor.execute(
+                "SELECT count(*) FROM txid_snapshot_xip(%s::txid_snapshot) AS xip (xid) "
+                "WHERE txid_status(xid) = 'in progress' AND xid IS DISTINCT FROM txid_current_if_assigned()",
+                [snapshot]
+            )
+            if not cursor.fetchone()[0]:
+                return last_value
+            if time.monotonic() >= deadline:
+                logger.warning(f"Ledger writers still open after {timeout}s; no watermark")
+                return None
+            time.sleep(WATERMARK_POLL_SECONDS)
+
+
+def post_entry(wallet_id, transaction_type, amount, reference='', description='', **fields):
+    """
+    Append one completed ledger entry; debits are refused if they would
+    overdraw, and record the balance they were checked against
+    """
+    now = timezone.now()
+    entry = WalletTransaction(
+        wallet_id=wallet_id,
+        transaction_type=transaction_type,
+        amount=amount,
+        status='completed',
+        reference=reference or generate_transaction_reference(),
+        description=description,
+        completed_at=now,
+        **fields
+    )
+
+    with transaction.atomic():
+        _begin_ledger_write()
+        if transaction_type in WalletTransaction.DEBIT_TYPES:
+            _lock_debits(wallet_id)
+            balance = wallet_balance(wallet_id)
+            if balance < amount:
+                raise InsufficientFunds(f"Balance does not cover GH₵{amount}")
+            entry.balance_before = balance
+            entry.balance_after = balance - amount
+        entry.save(force_insert=True)
+        _expire_balances([wallet_id])
+    return entry
+
+
+def bulk_credit(credits, transaction_type='credit', description='', chunk_size=BULK_CREDIT_CHUNK_SIZE):
+    """
+    Credit many wallets from (wallet_id, amount, reference) tuples, optionally
+    followed by a dict of extra WalletTransaction fields (e.g. bet_id)
+    Each chunk is one bulk INSERT; references already in the ledger are
+    skipped, so re-running a payout cannot pay anyone twice. Returns the
+    references this call attempted to insert: one that a concurrent run
+    recorded first is listed but was not credited again.
+    """
+    credits = list(credits)
+    attempted = []
+    now = timezone.now()
+
+    for start in range(0, len(credits), chunk_size):
+        chunk = credits[start:start + chunk_size]
+        seen = set(WalletTransaction.objects.filter(
+            reference__in=[credit[2] for credit in chunk]
+        ).values_list('reference', flat=True))
+
+        entries = []
+        for wallet_id, amount, reference, *extra in chunk:
+            if reference in seen:
+                continue
+            if amount <= 0:
+                raise ValueError(f"Credit {reference} must be positive, got {amount}")
+            seen.add(reference)
+            fields = {'description': description, **(extra[0] if extra else {})}
+            entries.append(WalletTransaction(
+                wallet_id=wallet_id,
+                transaction_type=transaction_type,
+                amount=amount,
+                status='completed',
+                reference=reference,
+                completed_at=now,
+                **fields
+            ))
+
+        # A concurrent run may insert the same references first; the unique
+        # column turns those rows into no-ops
+        with transaction.atomic():
+            _begin_ledger_write()
+            WalletTransaction.objects.bulk_create(entries, ignore_conflicts=True)
+            _expire_balances(entry.wallet_id for entry in entries)
+        attempted.extend(entry.reference for entry in entries)
+    return attempted
+
+
+def bulk_debit(debits, transaction_type='withdrawal', description=''):
+    """
+    Debit many wallets from (wallet_id, amount, reference[, fields]) tuples
+    Takes every wallet's debit lock in id order, reads all balances in one
+    query and inserts the covered debits in one bulk INSERT. Returns
+    {reference: entry}, with None for debits refused for insufficient funds;
+    references already in the ledger map to their existing entry.
+    """
+    debits = list(debits)
+    existing = WalletTransaction.objects.in_bulk([debit[2] for debit in debits], field_name='reference')
+    now = timezone.now()
+
+    with transaction.atomic():
+        _begin_ledger_write()
+        wallet_ids = sorted({debit[0] for debit in debits})
+        for wallet_id in wallet_ids:
+            _lock_debits(wallet_id)
+        balances = wallet_balances(wallet_ids)
+
+        results = {}
+        entries = []
+        for wallet_id, amount, reference, *extra in debits:
+            if reference in existing or reference in results:
+                results.setdefault(reference, existing.get(reference))
+                continue
+            balance = balances.get(wallet_id, Decimal('0.00'))
+            if amount <= 0:
+                raise ValueError(f"Debit {reference} must be positive, got {amount}")
+            if balance < amount:
+                results[reference] = None
+                continue
+            balances[wallet_id] = balance - amount
+            fields = {'description': description, **(extra[0] if extra else {})}
+            results[reference] = WalletTransaction(
+                wallet_id=wallet_id,
+                transaction_type=transaction_type,
+                amount=amount,
+                status='completed',
+                reference=reference,
+                balance_before=balance,
+                balance_after=balance - amount,
+                completed_at=now,
+                **fields
+            )
+            entries.append(results[reference])
+
+        WalletTransaction.objects.bulk_create(entries)
+        _expire_balances(entry.wallet_id for entry in entries)
+    return results
+
+
+def snapshot_balances(batch_size=500, timeout=None):
+    """
+    Insert a snapshot for every wallet with ledger entries since its last one
+    Only entries up to ledger_watermark() are folded, so an entry that
+    commits after a higher id is never skipped; returns the number of
+    snapshots written
+    """
+    up_to_id = ledger_watermark(timeout)
+    if up_to_id is None:
+        return 0
+
+    written = 0
+    last_id = 0
+    while True:
+        wallet_ids = list(
+            Wallet.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not wallet_ids:
+            break
+        last_id = wallet_ids[-1]
+
+        pending = WalletTransaction.objects.filter(
+            wallet=OuterRef('pk'), status='completed',
+            id__gt=OuterRef('snapshot_id'), id__lte=up_to_id
+        )
+        rows = with_balances(Wallet.objects.filter(pk__in=wallet_ids), up_to_id).filter(
+            Exists(pending)
+        ).values_list('pk', 'balance_now')
+
+        snapshots = [
+            WalletSnapshot(wallet_id=wallet_id, balance=balance, last_transaction_id=up_to_id)
+            for wallet_id, balance in rows
+        ]
+        WalletSnapshot.objects.bulk_create(snapshots)
+        written += len(snapshots)
+    return written
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from wallet.payouts import get_payout_provider
+from wallet.withdrawals import process_withdrawals, reconcile_withdrawals
+
+
+class Command(BaseCommand):
+    help = 'Submit approved withdrawals to the payout provider in batches, then reconcile their results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider',
+            help='Dotted path of the payout provider (default: WITHDRAWAL_PAYOUT_PROVIDER)',
+        )
+        parser.add_argument('--batch-size', type=int, help='Withdrawals per batch (default: WITHDRAWAL_BATCH_SIZE)')
+        parser.add_argument('--skip-submit', action='store_true', help='Only reconcile processing withdrawals')
+        parser.add_argument('--skip-reconcile', action='store_true', help='Only submit approved withdrawals')
+
+    def handle(self, *args, **options):
+        try:
+            provider = import_string(options['provider'])() if options['provider'] else get_payout_provider()
+        except ImportError as e:
+            raise CommandError(str(e))
+        if provider is None:
+            raise CommandError('No payout provider: set WITHDRAWAL_PAYOUT_PROVIDER or pass --provider')
+
+        if not options['skip_submit']:
+            counts = process_withdrawals(provider, options['batch_size'])
+            self.stdout.write(f'Submitted: {json.dumps(counts)}')
+        if not options['skip_reconcile']:
+            counts = reconcile_withdrawals(provider, options['batch_size'])
+            self.stdout.write(f'Reconciled: {json.dumps(counts)}')
@@ -0,0 +1,140 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:34
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('betting', '0011_draw_calendar_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentMethod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('method_type', models.CharField(choices=[('mobile_money', 'Mobile Money'), ('bank_transfer', 'Bank Transfer'), ('card', 'Card Payment'), ('cash', 'Cash')], max_length=20)),
+                ('provider', models.CharField(choices=[('mtn', 'MTN Mobile Money'), ('vodafone', 'Vodafone Cash'), ('airteltigo', 'AirtelTigo Money'), ('bank', 'Bank Transfer'), ('visa', 'Visa Card'), ('mastercard', 'Mastercard')], max_length=50)),
+                ('min_deposit', models.DecimalField(decimal_places=2, default=Decimal('1.00'), max_digits=10)),
+                ('max_deposit', models.DecimalField(decimal_places=2, default=Decimal('10000.00'), max_digits=10)),
+                ('min_withdrawal', models.DecimalField(decimal_places=2, default=Decimal('10.00'), max_digits=10)),
+                ('max_withdrawal', models.DecimalField(decimal_places=2, default=Decimal('5000.00'), max_digits=10)),
+                ('deposit_fee_percentage', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=5)),
+                ('deposit_fee_fixed', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('withdrawal_fee_percentage', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=5)),
+                ('withdrawal_fee_fixed', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'payment_methods',
+            },
+        ),
+        migrations.CreateModel(
+            name='Wallet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='GHS', max_length=3)),
+                ('pin_hash', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'wallets',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WalletTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('credit', 'Credit'), ('debit', 'Debit'), ('transfer_in', 'Transfer In'), ('transfer_out', 'Transfer Out')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('balance_before', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('balance_after', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('reverse', 'Reverse'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('reference', models.CharField(db_index=True, max_length=100, unique=True)),
+                ('payment_method', models.CharField(blank=True, max_length=50, null=True)),
+                ('payment_reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('description', models.TextField(blank=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('bet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wallet_transactions', to='betting.bet')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='wallet.wallet')),
+            ],
+            options={
+                'db_table': 'wallet_transactions',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WithdrawalRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('fee', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('net_amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('account_name', models.CharField(max_length=200)),
+                ('account_number', models.CharField(max_length=100)),
+                ('bank_name', models.CharField(blank=True, max_length=200, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('processing', 'Processing'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('reference', models.CharField(max_length=100, unique=True)),
+                ('admin_notes', models.TextField(blank=True)),
+                ('rejection_reason', models.TextField(blank=True)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('payment_method', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='wallet.paymentmethod')),
+                ('transaction', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='withdrawal_request', to='wallet.wallettransaction')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='withdrawal_requests', to='wallet.wallet')),
+            ],
+            options={
+                'db_table': 'withdrawal_requests',
+                'ordering': ['-requested_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WalletSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('last_transaction_id', models.BigIntegerField(help_text='Newest ledger entry included in balance')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='wallet.wallet')),
+            ],
+            options={
+                'db_table': 'wallet_snapshots',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'transaction_type'], name='wallet_tran_wallet__023ee0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'status', 'id'], name='wallet_tx_ledger_tail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['reference'], name='wallet_tran_referen_531c6d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['status'], name='wallet_tran_status_c987ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='walletsnapshot',
+            index=models.Index(fields=['wallet', '-last_transaction_id'], name='wallet_snapshots_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_winnings_transaction_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('credit', 'Credit'), ('debit', 'Debit'), ('transfer_in', 'Transfer In'), ('transfer_out', 'Transfer Out'), ('stake', 'Bet Stake'), ('winnings', 'Winnings'), ('refund', 'Refund')], max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='wallet',
+            constraint=models.UniqueConstraint(fields=('user', 'currency'), name='wallets_user_currency_uniq'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0003_account_wallets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='withdrawalrequest',
+            name='provider_reference',
+            field=models.CharField(blank=True, help_text="Payout provider's id for the transfer", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='withdrawalrequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('processing', 'Processing'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='withdrawalrequest',
+            index=models.Index(fields=['status', 'id'], name='withdrawals_status_idx'),
+        ),
+    ]
@@ -2,22 +2,21 @@ from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from decimal import Decimal
-import uuid
-from django.utils import timezone
+
+from NLA.references import new_reference
 
 User = get_user_model()
 
 class Wallet(models.Model):
-    """Enhanced User wallet model with multiple wallet types."""
+    """
+    Enhanced User wallet model with multiple wallet types.
+    A user has one wallet per currency; the GHS wallet holds their account
+    balance (users.services.BalanceService). The balance is not stored on the row: it is the latest WalletSnapshot plus
+    the ledger entries after it (see wallet/ledger.py).
+    """
     
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wallets')
-    balance = models.DecimalField(
-        max_digits=15,
-        decimal_places=2,
-        default=Decimal('0.00'),
-        validators=[MinValueValidator(Decimal('0.00'))]
-    )
     currency = models.CharField(max_length=3, default='GHS')
     
     # Security
@@ -30,59 +29,36 @@ class Wallet(models.Model):
     class Meta:
         db_table = 'wallets'
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'currency'], name='wallets_user_currency_uniq'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - GH₵{self.balance}"
+        return f"{self.user.username} - {self.currency} wallet"
     
+    @property
+    def balance(self):
+        from .ledger import wallet_balance
+        return wallet_balance(self.pk)
 
     def can_debit(self, amount):
-        """Check if wallet has sufficient available balance."""
-        return self.available_balance >= Decimal(str(amount)) and self.status == 'active'
+        """Check if wallet has sufficient balance."""
+        return self.balance >= Decimal(str(amount))
     
-    @transaction.atomic
     def credit(self, amount, description="", reference="", transaction_type='credit'):
         """Add funds to wallet."""
-        amount_decimal = Decimal(str(amount))
-        old_balance = self.balance
-        self.balance += amount_decimal
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            transaction_type=transaction_type,
-            amount=amount_decimal,
-            balance_before=old_balance,
-            balance_after=self.balance,
-            description=description,
-            reference=reference
-        )
-        
-        return self.balance
+        from .ledger import post_entry, wallet_balance
+        post_entry(self.pk, transaction_type, Decimal(str(amount)), reference, description)
+        return wallet_balance(self.pk)
     
-    @transaction.atomic
     def debit(self, amount, description="", reference="", transaction_type='debit'):
         """Remove funds from wallet."""
-        if not self.can_debit(amount):
-            raise ValueError("Insufficient balance or inactive wallet")
-        
-        amount_decimal = Decimal(str(amount))
-        old_balance = self.balance
-        self.balance -= amount_decimal
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            transaction_type=transaction_type,
-            amount=amount_decimal,
-            balance_before=old_balance,
-            balance_after=self.balance,
-            description=description,
-            reference=reference
-        )
-        
-        return self.balance
+        from .ledger import InsufficientFunds, post_entry, wallet_balance
+        try:
+            post_entry(self.pk, transaction_type, Decimal(str(amount)), reference, description)
+        except InsufficientFunds:
+            raise ValueError("Insufficient balance")
+        return wallet_balance(self.pk)
     
     def transfer_to(self, target_wallet, amount, description=""):
         """Transfer funds to another wallet."""
@@ -92,20 +68,22 @@ class Wallet(models.Model):
         if self.user != target_wallet.user:
             raise ValueError("Can only transfer between own wallets")
         
-        reference = f"TRF{timezone.now().strftime('%Y%m%d%H%M%S')}"
+        reference = generate_transaction_reference()
         
         with transaction.atomic():
             # Debit from source
             self.debit(
                 amount, 
-                reference=reference,
+                description=description,
+                reference=f"{reference}-OUT",
                 transaction_type='transfer_out'
             )
             
             # Credit to target
             target_wallet.credit(
                 amount,
-                reference=reference,
+                description=description,
+                reference=f"{reference}-IN",
                 transaction_type='transfer_in'
             )
         
@@ -117,9 +95,18 @@ class WalletTransaction(models.Model):
     TRANSACTION_TYPES = [
         ('deposit', 'Deposit'),
         ('withdrawal', 'Withdrawal'),
-
+        ('credit', 'Credit'),
+        ('debit', 'Debit'),
+        ('transfer_in', 'Transfer In'),
+        ('transfer_out', 'Transfer Out'),
+        ('stake', 'Bet Stake'),
+        ('winnings', 'Winnings'),
+        ('refund', 'Refund'),
     ]
     
+    # Types that take money out of the wallet; every other type adds to it
+    DEBIT_TYPES = ['withdrawal', 'debit', 'transfer_out', 'stake']
+    
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('completed', 'Completed'),
@@ -132,9 +119,10 @@ class WalletTransaction(models.Model):
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     
-    # Balances before and after transaction
-    balance_before = models.DecimalField(max_digits=15, decimal_places=2)
-    balance_after = models.DecimalField(max_digits=15, decimal_places=2)
+    # Balances before and after transaction; not set by ledger postings,
+    # whose balance is the snapshot plus the entries after it
+    balance_before = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    balance_after = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     reference = models.CharField(max_length=100, unique=True, db_index=True)
@@ -164,6 +152,7 @@ class WalletTransaction(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['wallet', 'transaction_type']),
+            models.Index(fields=['wallet', 'status', 'id'], name='wallet_tx_ledger_tail_idx'),
             models.Index(fields=['reference']),
             models.Index(fields=['status']),
         ]
@@ -172,6 +161,24 @@ class WalletTransaction(models.Model):
         return f"{self.transaction_type} - GH₵{self.amount} - {self.wallet.user.username}"
 
 
+class WalletSnapshot(models.Model):
+    """A wallet's balance as of a ledger entry; later entries are added on read"""
+    
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='snapshots')
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    last_transaction_id = models.BigIntegerField(help_text="Newest ledger entry included in balance")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'wallet_snapshots'
+        indexes = [
+            models.Index(fields=['wallet', '-last_transaction_id'], name='wallet_snapshots_latest_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.wallet_id} GH₵{self.balance} @ {self.last_transaction_id}"
+
+
 class PaymentMethod(models.Model):
     """Available payment methods"""
     
@@ -236,6 +243,7 @@ class WithdrawalRequest(models.Model):
         ('processing', 'Processing'),
         ('completed', 'Completed'),
         ('rejected', 'Rejected'),
+        ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
     ]
     
@@ -253,6 +261,7 @@ class WithdrawalRequest(models.Model):
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     reference = models.CharField(max_length=100, unique=True)
+    provider_reference = models.CharField(max_length=100, blank=True, help_text="Payout provider's id for the transfer")
     
     # Related transaction
     transaction = models.OneToOneField(
@@ -274,6 +283,9 @@ class WithdrawalRequest(models.Model):
     class Meta:
         db_table = 'withdrawal_requests'
         ordering = ['-requested_at']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='withdrawals_status_idx'),
+        ]
     
     def __str__(self):
         return f"Withdrawal - GH₵{self.amount} - {self.wallet.user.username}"
@@ -281,13 +293,9 @@ class WithdrawalRequest(models.Model):
 
 def generate_transaction_reference():
     """Generate unique transaction reference"""
-    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-    random_part = str(uuid.uuid4().hex)[:8].upper()
-    return f"TXN{timestamp}{random_part}"
+    return new_reference('TXN')
 
 
 def generate_withdrawal_reference():
     """Generate unique withdrawal reference"""
-    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-    random_part = str(uuid.uuid4().hex)[:8].upper()
-    return f"WD{timestamp}{random_part}"
\ No newline at end of file
+    return new_reference('WD')
@@ -0,0 +1,57 @@
+"""
+Payout providers for withdrawal batches.
+
+A provider takes a whole batch in one submit() call and answers per
+reference without waiting for the money to move; final outcomes are
+collected later by fetch_results() from the reconcile task. Both are keyed
+on the withdrawal reference, which providers must treat as an idempotency
+key. WITHDRAWAL_PAYOUT_PROVIDER names the class to use.
+
+Results are dicts with a 'status' and, where relevant, 'provider_reference'
+and 'reason':
+  submit():        accepted | rejected
+  fetch_results(): completed | failed | pending | unknown (never received)
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class PayoutProvider:
+    """Interface for a payment gateway's bulk transfer API"""
+
+    def submit(self, payouts):
+        """Queue payouts (see withdrawals.payout_request); returns {reference: result}"""
+        raise NotImplementedError
+
+    def fetch_results(self, payouts):
+        """Current outcome of earlier submissions, by reference; returns {reference: result}"""
+        raise NotImplementedError
+
+
+class FakePayoutProvider(PayoutProvider):
+    """
+    Stateless local provider for development and tests. Accepts every payout
+    and reports it settled on the first fetch_results(); account numbers
+    starting with FAIL are refused by the 'bank' at that point.
+    """
+
+    def submit(self, payouts):
+        return {
+            payout['reference']: {'status': 'accepted', 'provider_reference': f"FAKE-{payout['reference']}"}
+            for payout in payouts
+        }
+
+    def fetch_results(self, payouts):
+        return {
+            payout['reference']: (
+                {'status': 'failed', 'reason': 'Account rejected by receiving institution'}
+                if payout['account_number'].startswith('FAIL') else {'status': 'completed'}
+            )
+            for payout in payouts
+        }
+
+
+def get_payout_provider():
+    """The configured provider, or None if WITHDRAWAL_PAYOUT_PROVIDER is unset"""
+    path = settings.WITHDRAWAL_PAYOUT_PROVIDER
+    return import_string(path)() if path else None
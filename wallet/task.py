@@ -0,0 +1,47 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from .ledger import snapshot_balances
+from .payouts import get_payout_provider
+from .withdrawals import process_withdrawals, reconcile_withdrawals
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def snapshot_wallet_balances():
+    """Fold recent ledger entries into fresh wallet snapshots"""
+    written = snapshot_balances()
+    logger.info(f"Wrote {written} wallet snapshots")
+    return f"Wrote {written} wallet snapshots"
+
+
+@shared_task
+def process_withdrawal_batches():
+    """Debit and submit approved withdrawals to the payout provider in batches"""
+    provider = get_payout_provider()
+    if provider is None:
+        logger.warning("WITHDRAWAL_PAYOUT_PROVIDER is not set; approved withdrawals are waiting")
+        return "No payout provider configured"
+
+    counts = process_withdrawals(provider)
+    logger.info(
+        f"Submitted {counts['submitted']} withdrawals ({counts['accepted']} accepted), "
+        f"rejected {counts['rejected']}"
+    )
+    return f"Submitted {counts['submitted']} withdrawals, rejected {counts['rejected']}"
+
+
+@shared_task
+def reconcile_withdrawal_payouts():
+    """Close or reverse processing withdrawals from the payout provider's results"""
+    provider = get_payout_provider()
+    if provider is None:
+        return "No payout provider configured"
+
+    counts = reconcile_withdrawals(provider)
+    logger.info(
+        f"Reconciled withdrawals: {counts['completed']} completed, {counts['failed']} failed, "
+        f"{counts['pending']} pending, {counts['resubmitted']} resubmitted"
+    )
+    return f"Completed {counts['completed']} withdrawals, failed {counts['failed']}"
@@ -1,3 +1,197 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from users.models import User
+from users.services import BalanceService
+from .ledger import ledger_watermark, post_entry, snapshot_balances, wallet_balance
+from .models import (
+    PaymentMethod, WalletSnapshot, WalletTransaction, WithdrawalRequest,
+    generate_transaction_reference, generate_withdrawal_reference
+)
+from .payouts import FakePayoutProvider
+from .withdrawals import claim_batch, process_withdrawals, reconcile_withdrawals
+
+
+class LedgerSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.wallet_id = BalanceService.wallet_id(User.objects.create_user(username='snap').pk)
+
+    def entry(self, amount, **fields):
+        return WalletTransaction.objects.create(
+            wallet_id=self.wallet_id, transaction_type='deposit', amount=Decimal(amount),
+            status='completed', reference=generate_transaction_reference(), **fields
+        )
+
+    def test_snapshot_folds_late_committing_entry(self):
+        first = self.entry('10.00')
+        # The next id belongs to a writer that commits only after the snapshot
+        later = self.entry('5.00', id=first.pk + 2)
+
+        # While that writer is open the watermark stops below its id
+        with mock.patch('wallet.ledger.ledger_watermark', return_value=first.pk):
+            self.assertEqual(snapshot_balances(), 1)
+        self.entry('20.00', id=first.pk + 1)
+
+        self.assertEqual(snapshot_balances(), 1)
+        snapshot = WalletSnapshot.objects.filter(wallet_id=self.wallet_id).latest('last_transaction_id')
+        self.assertEqual(snapshot.last_transaction_id, later.pk)
+        self.assertEqual(snapshot.balance, Decimal('35.00'))
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('35.00'))
+
+    def test_snapshot_without_watermark_writes_nothing(self):
+        self.entry('10.00')
+        with mock.patch('wallet.ledger.ledger_watermark', return_value=None):
+            self.assertEqual(snapshot_balances(), 0)
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('10.00'))
+
+
+class UnreachablePayoutProvider(FakePayoutProvider):
+    """Loses every submission, as if the provider never received it"""
+
+    def fetch_results(self, payouts):
+        return {payout['reference']: {'status': 'unknown'} for payout in payouts}
+
+
+class WithdrawalProcessingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.wallet_id = BalanceService.wallet_id(User.objects.create_user(username='payee').pk)
+        post_entry(self.wallet_id, 'deposit', Decimal('100.00'))
+        self.method = PaymentMethod.objects.create(
+            name='MTN', method_type='mobile_money', provider='mtn',
+            withdrawal_fee_percentage=Decimal('1.50'), withdrawal_fee_fixed=Decimal('0.50')
+        )
+        self.provider = FakePayoutProvider()
+
+    def withdrawal(self, amount, account_number='0240000000', **fields):
+        return WithdrawalRequest.objects.create(
+            wallet_id=self.wallet_id, amount=Decimal(amount), net_amount=Decimal(amount),
+            payment_method=fields.pop('payment_method', self.method), account_name='Payee',
+            account_number=account_number, status='approved',
+            reference=generate_withdrawal_reference(), **fields
+        )
+
+    def test_claim_debits_then_submits(self):
+        request = self.withdrawal('50.00')
+        with mock.patch.object(self.provider, 'submit', wraps=self.provider.submit) as submit:
+            counts = process_withdrawals(self.provider)
+        self.assertEqual(counts, {'submitted': 1, 'accepted': 1, 'rejected': 0})
+
+        request.refresh_from_db()
+        self.assertEqual((request.status, request.fee, request.net_amount), ('processing', Decimal('1.25'), Decimal('48.75')))
+        self.assertEqual(request.provider_reference, f'FAKE-{request.reference}')
+        self.assertEqual(
+            (request.transaction.transaction_type, request.transaction.amount, request.transaction.reference),
+            ('withdrawal', Decimal('50.00'), request.reference)
+        )
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('50.00'))
+
+        payout, = submit.call_args.args[0]
+        self.assertEqual((payout['reference'], payout['amount'], payout['currency']), (request.reference, '48.75', 'GHS'))
+
+        self.assertEqual(reconcile_withdrawals(self.provider)['completed'], 1)
+        request.refresh_from_db()
+        self.assertEqual(request.status, 'completed')
+
+    def test_insufficient_balance_is_rejected(self):
+        request = self.withdrawal('150.00', payment_method=PaymentMethod.objects.create(
+            name='Bank', method_type='bank_transfer', provider='bank'
+        ))
+        self.assertEqual(claim_batch(10, timezone.now()), ([], 1))
+
+        request.refresh_from_db()
+        self.assertEqual((request.status, request.rejection_reason), ('rejected', 'Insufficient balance'))
+        self.assertIsNone(request.transaction)
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('100.00'))
+
+    def test_payment_method_rules_are_rejected(self):
+        inactive = PaymentMethod.objects.create(name='Old', method_type='cash', provider='bank', is_active=False)
+        requests = [
+            self.withdrawal('20.00', payment_method=inactive),
+            self.withdrawal('5.00'),
+            self.withdrawal('6000.00'),
+        ]
+        self.assertEqual(claim_batch(10, timezone.now()), ([], 3))
+        self.assertEqual(
+            [WithdrawalRequest.objects.get(pk=request.pk).rejection_reason for request in requests],
+            [
+                'Payment method not available for withdrawals',
+                'Minimum withdrawal amount is GH₵10.00',
+                'Maximum withdrawal amount is GH₵5000.00',
+            ]
+        )
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('100.00'))
+
+    def test_failed_payout_is_reversed_once(self):
+        request = self.withdrawal('40.00', account_number='FAIL-123')
+        process_withdrawals(self.provider)
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('60.00'))
+
+        self.assertEqual(reconcile_withdrawals(self.provider)['failed'], 1)
+        self.assertEqual(reconcile_withdrawals(self.provider)['failed'], 0)
+
+        request.refresh_from_db()
+        self.assertEqual(request.status, 'failed')
+        self.assertEqual(WalletTransaction.objects.filter(reference=f'{request.reference}-REVERSAL').count(), 1)
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('100.00'))
+
+    def test_unknown_payout_is_resubmitted(self):
+        request = self.withdrawal('30.00')
+        other = self.withdrawal('25.00')
+        process_withdrawals(self.provider)
+
+        provider = UnreachablePayoutProvider()
+        # Batch, savepoint, locked re-select, release, provider references, empty batch:
+        # resubmitting reads each wallet's currency without a query per request
+        with mock.patch.object(provider, 'submit', wraps=provider.submit) as submit, self.assertNumQueries(6):
+            counts = reconcile_withdrawals(provider)
+        self.assertEqual(counts['resubmitted'], 2)
+        self.assertCountEqual(
+            [payout['reference'] for payout in submit.call_args.args[0]], [request.reference, other.reference]
+        )
+
+        # Still processing and debited once; the provider settles it later
+        request.refresh_from_db()
+        self.assertEqual(request.status, 'processing')
+        self.assertEqual(WalletTransaction.objects.filter(reference=request.reference).count(), 1)
+        self.assertEqual(reconcile_withdrawals(self.provider)['completed'], 2)
+        self.assertEqual(wallet_balance(self.wallet_id), Decimal('45.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'transaction ids are PostgreSQL-only')
+class PostgresWatermarkTests(TransactionTestCase):
+
+    def test_watermark_waits_for_open_writer(self):
+        cache.clear()
+        wallet_id = BalanceService.wallet_id(User.objects.create_user(username='snap').pk)
+        inserted = threading.Event()
+        release = threading.Event()
+
+        def slow_writer():
+            with transaction.atomic():
+                post_entry(wallet_id, 'deposit', Decimal('20.00'))
+                inserted.set()
+                release.wait(10)
+            connection.close()
+
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        inserted.wait(10)
+        post_entry(wallet_id, 'deposit', Decimal('5.00'))
+
+        self.assertIsNone(ledger_watermark(timeout=0.2))
+        self.assertEqual(snapshot_balances(timeout=0.2), 0)
+
+        release.set()
+        writer.join()
+        self.assertEqual(snapshot_balances(), 1)
+        self.assertEqual(WalletSnapshot.objects.get(wallet_id=wallet_id).balance, Decimal('25.00'))
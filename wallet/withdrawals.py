@@ -0,0 +1,227 @@
+"""
+Batched withdrawal processing.
+
+process_withdrawals() claims approved requests in id-ordered chunks. For each
+chunk it works out fees in memory, debits every wallet with one ledger
+bulk_debit and marks the requests processing in one short transaction, then
+hands the whole chunk to the payout provider in a single submit() call.
+
+reconcile_withdrawals() later asks the provider how processing requests
+ended: completed ones are closed, failed ones are marked failed and their
+debit is reversed with one bulk_credit, and ones the provider never received
+are submitted again. No worker waits on an individual transfer.
+"""
+import logging
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger import bulk_credit, bulk_debit
+from .models import WithdrawalRequest
+
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal('0.01')
+
+
+def apply_fees(requests):
+    """Set fee and net_amount on each request from its (preloaded) payment method"""
+    for request in requests:
+        request.fee = request.payment_method.calculate_withdrawal_fee(request.amount).quantize(
+            CENTS, ROUND_HALF_UP
+        )
+        request.net_amount = request.amount - request.fee
+
+
+def payout_request(request):
+    """What a provider needs to pay one withdrawal"""
+    return {
+        'reference': request.reference,
+        'amount': str(request.net_amount),
+        'currency': request.wallet.currency,
+        'method': request.payment_method.method_type,
+        'provider': request.payment_method.provider,
+        'account_name': request.account_name,
+        'account_number': request.account_number,
+        'bank_name': request.bank_name or '',
+    }
+
+
+def rejection_reason(request):
+    """Why a request cannot be paid under its payment method's rules, or None"""
+    method = request.payment_method
+    if not method.is_active:
+        return 'Payment method not available for withdrawals'
+    if request.amount < method.min_withdrawal:
+        return f'Minimum withdrawal amount is GH₵{method.min_withdrawal}'
+    if request.amount > method.max_withdrawal:
+        return f'Maximum withdrawal amount is GH₵{method.max_withdrawal}'
+    if request.net_amount <= 0:
+        return 'Withdrawal fee exceeds the amount'
+    return None
+
+
+def claim_batch(batch_size, now):
+    """
+    Move up to batch_size approved requests to processing, debiting their
+    wallets; returns (claimed requests, number rejected). Requests that break
+    their payment method's rules (see rejection_reason) or that their wallet
+    cannot cover are rejected instead.
+    """
+    with transaction.atomic():
+        requests = list(
+            WithdrawalRequest.objects.filter(status='approved')
+            .select_related('payment_method', 'wallet')
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('id')[:batch_size]
+        )
+        if not requests:
+            return [], 0
+
+        apply_fees(requests)
+        reasons = {request.pk: rejection_reason(request) for request in requests}
+        payable = [request for request in requests if reasons[request.pk] is None]
+        debits = bulk_debit([
+            (
+                request.wallet_id, request.amount, request.reference,
+                {'payment_method': request.payment_method.provider, 'description': f"Withdrawal {request.reference}"}
+            )
+            for request in payable
+        ], transaction_type='withdrawal')
+
+        claimed = []
+        for request in requests:
+            request.processed_at = now
+            entry = debits.get(request.reference)
+            if reasons[request.pk]:
+                request.status = 'rejected'
+                request.rejection_reason = reasons[request.pk]
+            elif entry is None:
+                request.status = 'rejected'
+                request.rejection_reason = 'Insufficient balance'
+            else:
+                request.status = 'processing'
+                request.transaction = entry
+                claimed.append(request)
+
+        WithdrawalRequest.objects.bulk_update(
+            requests, ['status', 'fee', 'net_amount', 'transaction', 'processed_at', 'rejection_reason']
+        )
+    return claimed, len(requests) - len(claimed)
+
+
+def submit_batch(provider, requests, now):
+    """Send claimed requests to the provider in one call; returns how many it accepted"""
+    try:
+        results = provider.submit([payout_request(request) for request in requests])
+    except Exception:
+        # Left in processing without a provider reference: reconcile resubmits
+        logger.exception(f"Payout provider failed on a batch of {len(requests)} withdrawals")
+        return 0
+
+    accepted = []
+    refused = []
+    for request in requests:
+        result = results.get(request.reference, {})
+        if result.get('status') == 'accepted':
+            request.provider_reference = result.get('provider_reference', '')
+            accepted.append(request)
+        elif result.get('status') == 'rejected':
+            refused.append((request, result.get('reason') or 'Rejected by payout provider'))
+
+    WithdrawalRequest.objects.bulk_update(accepted, ['provider_reference'])
+    fail_withdrawals(refused, now)
+    return len(accepted)
+
+
+def fail_withdrawals(failures, now):
+    """Mark (request, reason) pairs failed and return their money with one bulk_credit"""
+    if not failures:
+        return
+    with transaction.atomic():
+        for request, reason in failures:
+            request.status = 'failed'
+            request.rejection_reason = reason
+            request.completed_at = now
+        WithdrawalRequest.objects.bulk_update(
+            [request for request, _ in failures], ['status', 'rejection_reason', 'completed_at']
+        )
+        bulk_credit([
+            (
+                request.wallet_id, request.amount, f"{request.reference}-REVERSAL",
+                {'description': f"Reversal of withdrawal {request.reference}"}
+            )
+            for request, _ in failures
+        ], transaction_type='refund')
+
+
+def process_withdrawals(provider, batch_size=None, max_batches=None):
+    """Claim and submit approved withdrawals chunk by chunk; returns counts by outcome"""
+    batch_size = batch_size or settings.WITHDRAWAL_BATCH_SIZE
+    counts = {'submitted': 0, 'accepted': 0, 'rejected': 0}
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        now = timezone.now()
+        claimed, rejected = claim_batch(batch_size, now)
+        if not claimed and not rejected:
+            break
+        batches += 1
+        counts['submitted'] += len(claimed)
+        counts['rejected'] += rejected
+        if claimed:
+            counts['accepted'] += submit_batch(provider, claimed, now)
+    return counts
+
+
+def reconcile_withdrawals(provider, batch_size=None):
+    """Apply provider outcomes to processing withdrawals; returns counts by outcome"""
+    batch_size = batch_size or settings.WITHDRAWAL_BATCH_SIZE
+    counts = {'completed': 0, 'failed': 0, 'pending': 0, 'resubmitted': 0}
+
+    last_id = 0
+    while True:
+        batch = list(
+            WithdrawalRequest.objects.filter(status='processing', pk__gt=last_id)
+            .select_related('payment_method', 'wallet').order_by('id')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].pk
+
+        results = provider.fetch_results([payout_request(request) for request in batch])
+        now = timezone.now()
+
+        with transaction.atomic():
+            requests = list(
+                WithdrawalRequest.objects.filter(pk__in=[request.pk for request in batch], status='processing')
+                .select_related('payment_method', 'wallet')
+                .select_for_update(of=('self',))
+            )
+            completed = []
+            failures = []
+            unknown = []
+            for request in requests:
+                result = results.get(request.reference, {'status': 'pending'})
+                if result['status'] == 'completed':
+                    request.status = 'completed'
+                    request.completed_at = now
+                    completed.append(request)
+                elif result['status'] == 'failed':
+                    failures.append((request, result.get('reason') or 'Payout failed'))
+                elif result['status'] == 'unknown':
+                    unknown.append(request)
+                else:
+                    counts['pending'] += 1
+
+            WithdrawalRequest.objects.bulk_update(completed, ['status', 'completed_at'])
+            fail_withdrawals(failures, now)
+
+        counts['completed'] += len(completed)
+        counts['failed'] += len(failures)
+        if unknown:
+            counts['resubmitted'] += submit_batch(provider, unknown, now)
+    return counts